@@ -24,46 +24,218 @@ To Do:
   this would be useful for taking .fea or a subset object and going back to binary.
 - the ignore support in the remove glyph/should be removed process in the
   GSUB subtable object may be fragile. maybe set a special substitution Ignore value? 
-- make a fontTools object writer
 - make a compositor object writer
 """
 
 class FeaToolsError(Exception): pass
 
 
-def decompileBinaryToObject(pathOrFile, compress=True, excludeFeatures=None):
+def decompileBinaryToObject(pathOrFile, compress=True, excludeFeatures=None, includeFeatures=None, excludeScripts=None, includeScripts=None, excludeLanguages=None, includeLanguages=None, backend="fontTools", cache=None, lazy=False, glyphIDs=False):
+    """
+    cache is an optional feaTools2.cache.DecompileCache.
+    If the same font data has been decompiled with the
+    same options, the tables are loaded from the cache
+    without loading the font.
+
+    If lazy is True, each table is decompiled the first
+    time that it is requested from the returned Tables.
+    The font is kept open until then.
+
+    If glyphIDs is True, the glyphs in the GSUB classes are
+    stored as glyph IDs. The names are only resolved when
+    the tables are written.
+    """
+    # look in the cache
+    if cache is not None:
+        options = dict(
+            compress=compress,
+            excludeFeatures=_normalizeTags(excludeFeatures), includeFeatures=_normalizeTags(includeFeatures),
+            excludeScripts=_normalizeTags(excludeScripts), includeScripts=_normalizeTags(includeScripts),
+            excludeLanguages=_normalizeTags(excludeLanguages), includeLanguages=_normalizeTags(includeLanguages),
+            backend=backend
+        )
+        cacheKey = cache.makeKey(pathOrFile, options)
+        data = cache.get(cacheKey)
+        if data is not None:
+            glyphOrder, data = _unpackCacheEntry(data)
+            tables = deserializeTables(data)
+            if glyphIDs:
+                tables["GSUB"].useGlyphIDs(glyphOrder)
+            return tables
     from fontTools.ttLib import TTFont
     from feaTools2.objects import Tables
     from feaTools2.parsers.binaryParser import parseTable
     # load font
+    # the table data is only read when it is needed
     closeFont = True
     if isinstance(pathOrFile, TTFont):
         font = pathOrFile
         closeFont = False
     else:
-        font = TTFont(pathOrFile)
+        font = TTFont(pathOrFile, lazy=True)
     # decompile
-    tables = Tables()
-    if "GSUB" in font:
-        table = tables["GSUB"]
-        parseTable(table, font["GSUB"].table, "GSUB", excludeFeatures=excludeFeatures)
-        if compress:
-            table.compress()
-    # close
-    if closeFont:
-        font.close()
+    # the glyph order is stored in the cache so that
+    # the glyph IDs of a cached table are the same
+    glyphOrder = []
+    def loadGSUB(table):
+        if cache is not None:
+            glyphOrder[:] = font.getGlyphOrder()
+        if "GSUB" in font:
+            parseTable(table, _getTable(font, "GSUB", backend), "GSUB",
+                excludeFeatures=excludeFeatures, includeFeatures=includeFeatures,
+                excludeScripts=excludeScripts, includeScripts=includeScripts,
+                excludeLanguages=excludeLanguages, includeLanguages=includeLanguages
+            )
+            if glyphIDs:
+                table.useGlyphIDs(font.getGlyphOrder())
+            if compress:
+                table.compress()
+        # close
+        # GSUB is the only table that is read from the font.
+        # if loading failed, the loader is still registered
+        # and the font is kept open for the next request.
+        if closeFont:
+            font.close()
+    tables = Tables(loaders=dict(GSUB=loadGSUB))
+    if not lazy or cache is not None:
+        tables["GSUB"]
+    # store in the cache
+    if cache is not None:
+        cache.set(cacheKey, _packCacheEntry(glyphOrder, serializeTables(tables)))
     # done
     return tables
 
 
-def decompileBinaryToFeaSyntax(pathOrFile, excludeFeatures=None):
+def iterDecompileBinaryToFeatures(pathOrFile, compress=True, excludeFeatures=None, includeFeatures=None, excludeScripts=None, includeScripts=None, excludeLanguages=None, includeLanguages=None, backend="fontTools"):
+    """
+    Decompile the GSUB features one at a time. Each Feature
+    object is yielded as soon as its lookups have been parsed.
+    Lookups can't be promoted to global lookups, so compression
+    only happens within each feature.
+    """
+    from fontTools.ttLib import TTFont
+    from feaTools2.objects import Table
+    from feaTools2.parsers.binaryParser import iterFeatures
+    # load font
+    closeFont = True
+    if isinstance(pathOrFile, TTFont):
+        font = pathOrFile
+        closeFont = False
+    else:
+        font = TTFont(pathOrFile, lazy=True)
+    # decompile
+    try:
+        if "GSUB" in font:
+            features = iterFeatures(_getTable(font, "GSUB", backend), "GSUB",
+                excludeFeatures=excludeFeatures, includeFeatures=includeFeatures,
+                excludeScripts=excludeScripts, includeScripts=includeScripts,
+                excludeLanguages=excludeLanguages, includeLanguages=includeLanguages
+            )
+            for feature in features:
+                if compress:
+                    table = Table()
+                    table.tag = "GSUB"
+                    table.append(feature)
+                    table.compress()
+                yield feature
+    # close
+    finally:
+        if closeFont:
+            font.close()
+
+
+def decompileBinaryToFeaSyntax(pathOrFile, excludeFeatures=None, includeFeatures=None, excludeScripts=None, includeScripts=None, excludeLanguages=None, includeLanguages=None, backend="fontTools", cache=None, stream=None):
+    """
+    stream is an optional file-like object. If it is given,
+    the text is written to it as it is created and None
+    is returned.
+    """
     from feaTools2.writers.feaSyntaxWriter import FeaSyntaxWriter
     # decompile
-    tables = decompileBinaryToObject(pathOrFile, excludeFeatures=excludeFeatures)
+    tables = decompileBinaryToObject(pathOrFile,
+        excludeFeatures=excludeFeatures, includeFeatures=includeFeatures,
+        excludeScripts=excludeScripts, includeScripts=includeScripts,
+        excludeLanguages=excludeLanguages, includeLanguages=includeLanguages,
+        backend=backend, cache=cache
+    )
     # write
-    writer = FeaSyntaxWriter(filterRedundancies=True)
+    writer = FeaSyntaxWriter(filterRedundancies=True, stream=stream)
     tables["GSUB"].write(writer)
     tables["GPOS"].write(writer)
+    if stream is not None:
+        writer.finish()
+        return None
     text = writer.write()
     # done
     return text
+
+
+def parseFeaSyntaxToObject(text):
+    """
+    Parse the GSUB statements in the .fea text. The tables
+    are not compressed since the compression expects the
+    lookups to be arranged like they are in a binary.
+    """
+    from feaTools2.objects import Tables
+    from feaTools2.parsers.feaSyntaxParser import parseFeaSyntax
+    tables = Tables()
+    parseFeaSyntax(tables["GSUB"], text)
+    return tables
+
+
+def serializeTables(tables):
+    """
+    Serialize the tables to a compact byte string. The data
+    is written with marshal, so it can only be read by the
+    same version of Python.
+    """
+    import marshal
+    from feaTools2.writers.dataWriter import DataWriter
+    data = {}
+    for tableTag in ("GSUB", "GPOS"):
+        writer = DataWriter()
+        tables[tableTag].write(writer)
+        data[tableTag] = writer.getData()
+    return marshal.dumps(data)
+
+
+def deserializeTables(data):
+    import marshal
+    from feaTools2.objects import Tables
+    from feaTools2.parsers.dataParser import parseData
+    # the tables are rebuilt when they are requested
+    loaders = {}
+    for tableTag, tableData in marshal.loads(data).items():
+        loaders[tableTag] = lambda table, tableData=tableData: parseData(table, tableData)
+    return Tables(loaders=loaders)
+
+
+def _packCacheEntry(glyphOrder, data):
+    import marshal
+    return marshal.dumps((list(glyphOrder), data))
+
+
+def _unpackCacheEntry(data):
+    import marshal
+    return marshal.loads(data)
+
+
+def _normalizeTags(tags):
+    if tags is None:
+        return None
+    return sorted(set(tags))
+
+
+def _getTable(font, tableTag, backend):
+    """
+    Get the table object that the binary parser reads.
+    The "fontTools" backend uses the table as decompiled
+    by fontTools. The "sfnt" backend reads the table data
+    directly and skips the fontTools decompilation.
+    """
+    if backend == "fontTools":
+        return font[tableTag].table
+    elif backend == "sfnt":
+        from feaTools2.parsers.sfntParser import readTable
+        return readTable(font.getTableData(tableTag), tableTag, font.getGlyphOrder())
+    raise FeaToolsError("Unknown backend %s." % backend)
@@ -0,0 +1,147 @@
+"""
+Decompile many fonts in parallel.
+
+The fonts are handed to a pool of processes and the results
+are given back in the order that they are completed. Each
+font is decompiled in isolation, so a font that fails or
+takes too long does not stop the others.
+
+This can also be used from the command line:
+
+    python -m feaTools2.batch --jobs 8 --output-directory fea path1.otf path2.otf
+"""
+
+import os
+import sys
+import traceback
+
+
+class DecompileTimeoutError(Exception): pass
+
+
+def batchDecompile(paths, jobs=None, timeout=None, output="fea", **kwargs):
+    """
+    Decompile the fonts at paths with a pool of jobs processes.
+    If jobs is None, the number of CPUs is used.
+
+    This yields (path, result, error) as each font is completed.
+    If output is "fea" the result is .fea text. If output is
+    "data" the result is the compact byte string created by
+    serializeTables. It can be loaded with deserializeTables.
+    When the font could not be decompiled, result is None and
+    error is a description of the problem.
+
+    timeout is the number of seconds that may be spent
+    decompiling a single font. It is only supported on
+    platforms that have signal.SIGALRM.
+
+    Any other keyword arguments are passed to
+    decompileBinaryToObject.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    if output not in ("fea", "data"):
+        raise ValueError("Unknown output %s." % output)
+    if jobs is None:
+        import multiprocessing
+        jobs = multiprocessing.cpu_count()
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        futures = {}
+        for path in paths:
+            future = executor.submit(_decompileWorker, path, output, timeout, kwargs)
+            futures[future] = path
+        for future in as_completed(futures):
+            path = futures.pop(future)
+            try:
+                path, result, error = future.result()
+            # the worker process itself failed
+            except Exception as e:
+                result = None
+                error = "%s: %s" % (e.__class__.__name__, e)
+            yield path, result, error
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _decompileWorker(path, output, timeout, kwargs):
+    from feaTools2 import decompileBinaryToObject, serializeTables
+    from feaTools2.writers.feaSyntaxWriter import FeaSyntaxWriter
+    alarm = False
+    try:
+        # the alarm can go off right away, so it is started in here
+        if timeout is not None:
+            alarm = _startAlarm(timeout)
+        tables = decompileBinaryToObject(path, **kwargs)
+        if output == "fea":
+            writer = FeaSyntaxWriter(filterRedundancies=True)
+            tables["GSUB"].write(writer)
+            tables["GPOS"].write(writer)
+            result = writer.write()
+        else:
+            result = serializeTables(tables)
+        return path, result, None
+    except DecompileTimeoutError:
+        return path, None, "Decompiling took more than %s seconds." % timeout
+    except Exception:
+        return path, None, traceback.format_exc()
+    finally:
+        if alarm:
+            _stopAlarm()
+
+
+def _startAlarm(timeout):
+    import signal
+    if not hasattr(signal, "SIGALRM"):
+        return False
+    def handler(signum, frame):
+        raise DecompileTimeoutError
+    signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    return True
+
+
+def _stopAlarm():
+    import signal
+    signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# ------------
+# Command Line
+# ------------
+
+def main(args=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Decompile the features in many fonts to .fea.")
+    parser.add_argument("paths", nargs="+", help="The fonts to decompile.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="The number of processes. The default is the number of CPUs.")
+    parser.add_argument("-t", "--timeout", type=float, default=None, help="The number of seconds allowed for each font.")
+    parser.add_argument("-o", "--output-directory", default=None, help="The directory for the .fea files. The default is the directory of each font.")
+    parser.add_argument("-x", "--exclude-features", nargs="*", default=None, help="Features that should not be decompiled.")
+    options = parser.parse_args(args)
+    if options.output_directory is not None and not os.path.exists(options.output_directory):
+        os.makedirs(options.output_directory)
+    failed = 0
+    results = batchDecompile(options.paths, jobs=options.jobs, timeout=options.timeout, excludeFeatures=options.exclude_features)
+    for path, text, error in results:
+        if error is not None:
+            failed += 1
+            sys.stderr.write("%s failed:\n%s\n" % (path, error))
+            continue
+        directory = options.output_directory
+        if directory is None:
+            directory = os.path.dirname(path)
+        fileName = os.path.splitext(os.path.basename(path))[0] + ".fea"
+        outputPath = os.path.join(directory, fileName)
+        f = open(outputPath, "w")
+        f.write(text)
+        f.close()
+        sys.stdout.write("%s\n" % outputPath)
+    if failed:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
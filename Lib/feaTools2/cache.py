@@ -0,0 +1,186 @@
+"""
+A persistent cache of decompiled tables.
+
+The entries are keyed by a hash of the font tables that
+determine the decompiled result and the decompile options.
+The entries are stored in the compact form created by
+serializeTables, along with the glyph order of the font.
+When the cache grows beyond its limits, the least
+recently used entries are removed.
+"""
+
+import os
+import hashlib
+import marshal
+import tempfile
+from feaTools2.parsers.sfntParser import readTableData
+
+# bump this when the decompiled result changes
+cacheFormatVersion = 2
+
+# the GSUB data and the tables that define the glyph names
+# cmap and maxp are used for the names when post is format 3
+keyTableTags = ("GSUB", "post", "CFF ", "cmap", "maxp")
+
+entryExtension = ".feaTools2"
+
+# the tables in these can't be located directly
+woffSignatures = (b"wOFF", b"wOF2")
+
+
+class DecompileCache(object):
+
+    def __init__(self, directory, maxSize=None, maxEntries=None):
+        """
+        directory is where the entries are stored. maxSize is
+        the maximum total size of the entries in bytes and
+        maxEntries is the maximum number of entries. None
+        means that there is no limit.
+        """
+        self.directory = directory
+        self.maxSize = maxSize
+        self.maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    # keys
+
+    def makeKey(self, pathOrFile, options):
+        """
+        Make a key for the font and the decompile options.
+        The font can be a path, a file object or a TTFont.
+        """
+        # read the file only once
+        font = pathOrFile
+        if not isFontObject(font):
+            font = readFontData(pathOrFile)
+            if font[:4] in woffSignatures:
+                from io import BytesIO
+                from fontTools.ttLib import TTFont
+                font = TTFont(BytesIO(font))
+        digest = hashlib.sha1()
+        digest.update(("%d %d" % (cacheFormatVersion, marshal.version)).encode("ascii"))
+        for tableTag in keyTableTags:
+            tableData = getTableData(font, tableTag)
+            if tableData is None:
+                continue
+            digest.update(("%s %d" % (tableTag, len(tableData))).encode("ascii"))
+            digest.update(tableData)
+        options = sorted(options.items())
+        digest.update(repr(options).encode("utf-8"))
+        return digest.hexdigest()
+
+    # access
+
+    def _entryPath(self, key):
+        return os.path.join(self.directory, key + entryExtension)
+
+    def get(self, key):
+        path = self._entryPath(key)
+        try:
+            f = open(path, "rb")
+        except (IOError, OSError):
+            self.misses += 1
+            return None
+        data = f.read()
+        f.close()
+        # mark the entry as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def set(self, key, data):
+        # write to a temporary file and move it into place
+        # so that readers never see a partial entry
+        handle, tempPath = tempfile.mkstemp(dir=self.directory)
+        f = os.fdopen(handle, "wb")
+        f.write(data)
+        f.close()
+        path = self._entryPath(key)
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(tempPath, path)
+        self.evict()
+
+    def clear(self):
+        for path, size, modified in self._entries():
+            os.remove(path)
+
+    # eviction
+
+    def _entries(self):
+        entries = []
+        for fileName in os.listdir(self.directory):
+            if not fileName.endswith(entryExtension):
+                continue
+            path = os.path.join(self.directory, fileName)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self):
+        """
+        Remove the least recently used entries until
+        the cache is within the size and entry limits.
+        """
+        if self.maxSize is None and self.maxEntries is None:
+            return
+        entries = self._entries()
+        totalSize = sum([size for (path, size, modified) in entries])
+        entries.sort(key=lambda entry: entry[2])
+        while entries:
+            tooBig = self.maxSize is not None and totalSize > self.maxSize
+            tooMany = self.maxEntries is not None and len(entries) > self.maxEntries
+            if not tooBig and not tooMany:
+                break
+            path, size, modified = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            totalSize -= size
+
+
+# -------------
+# Reading Fonts
+# -------------
+
+def getTableData(font, tableTag):
+    """
+    Get the raw data for a table without decompiling
+    anything. font is either a TTFont or the raw font
+    data. None is returned if the table is not in the font.
+    """
+    if isFontObject(font):
+        if tableTag not in font:
+            return None
+        return font.getTableData(tableTag)
+    tableData = readTableData(font, tableTag)
+    if tableData is None:
+        return None
+    return tableData.tobytes()
+
+
+def isFontObject(font):
+    # TTFont, without needing to import fontTools
+    return hasattr(font, "getTableData")
+
+
+def readFontData(pathOrFile):
+    if hasattr(pathOrFile, "read"):
+        position = pathOrFile.tell()
+        data = pathOrFile.read()
+        pathOrFile.seek(position)
+        return data
+    f = open(pathOrFile, "rb")
+    data = f.read()
+    f.close()
+    return data
@@ -0,0 +1,145 @@
+"""
+A GSUB glyph closure engine that uses NumPy.
+
+The substitutions in a Table are compiled once into arrays
+of glyph IDs. Closing a set of glyphs is then a few array
+operations per iteration until no glyphs are added.
+
+The rules are compiled into three kinds of arrays:
+
+- Each glyph group is stored as a run of glyph IDs in a
+  flat member array. A group is hit when any of its members
+  is in the closure.
+- Each rule is a run of groups in a flat rule array. A rule
+  applies when all of its groups are hit. These are the
+  context and target groups of ligatures and contextual
+  substitutions.
+- Each output is (source glyph, substituted glyph, rule).
+  The substituted glyph is added when the source glyph is in
+  the closure and the rule applies. Outputs that don't depend
+  on a particular source glyph or rule point to a slot that
+  is always True.
+
+This follows the same rules as Table.glyphClosure.
+"""
+
+from feaTools2.objects import GlyphOrder, GlyphIDClass, expandGroup, isPositional
+
+
+class GlyphClosure(object):
+
+    def __init__(self, table, lookups=None):
+        """
+        Compile the lookups in table. If lookups is None,
+        all of the lookups in the table are compiled.
+        """
+        import numpy
+        self._numpy = numpy
+        self.glyphOrder = table.glyphOrder
+        if self.glyphOrder is None:
+            self.glyphOrder = GlyphOrder()
+        if lookups is None:
+            lookups = table._uniqueLookups()
+        self._compile(table, lookups)
+
+    # compiling
+
+    def _compile(self, table, lookups):
+        numpy = self._numpy
+        classes = table._allClasses()
+        groups = []
+        ruleGroups = []
+        ruleLengths = []
+        outputSources = []
+        outputGlyphs = []
+        outputRules = []
+        def addRule(sequence):
+            ruleGroups.extend(range(len(groups), len(groups) + len(sequence)))
+            ruleLengths.append(len(sequence))
+            groups.extend(sequence)
+            return len(ruleLengths) - 1
+        for lookup in lookups:
+            for subtable in lookup.subtables:
+                context = [self._groupIDs(group, classes) for group in subtable.backtrack + subtable.lookahead]
+                for index, targetSequence in enumerate(subtable.target):
+                    if index >= len(subtable.substitution):
+                        break
+                    targetSequence = [self._groupIDs(group, classes) for group in targetSequence]
+                    substitutionSequence = [self._groupIDs(group, classes) for group in subtable.substitution[index]]
+                    sequence = context + targetSequence
+                    if isPositional(targetSequence, substitutionSequence):
+                        # a single group without context only
+                        # needs the source glyph to be present
+                        if len(sequence) == 1:
+                            ruleIndex = -1
+                        else:
+                            ruleIndex = addRule(sequence)
+                        outputSources.extend(targetSequence)
+                        outputGlyphs.extend(substitutionSequence)
+                    else:
+                        ruleIndex = addRule(sequence)
+                        outputSources.extend([numpy.full(len(group), -1, dtype=numpy.intp) for group in substitutionSequence])
+                        outputGlyphs.extend(substitutionSequence)
+                    outputRules.extend([numpy.full(len(group), ruleIndex, dtype=numpy.intp) for group in substitutionSequence])
+        self._glyphCount = len(self.glyphOrder)
+        self._groupCount = len(groups)
+        self._ruleCount = len(ruleLengths)
+        groupLengths = [len(group) for group in groups]
+        self._groupMembers = concatenate(numpy, groups)
+        self._groupIndexes = numpy.repeat(numpy.arange(len(groups), dtype=numpy.intp), groupLengths)
+        self._ruleGroups = numpy.array(ruleGroups, dtype=numpy.intp)
+        self._ruleIndexes = numpy.repeat(numpy.arange(len(ruleLengths), dtype=numpy.intp), ruleLengths)
+        self._outputSources = concatenate(numpy, outputSources)
+        self._outputGlyphs = concatenate(numpy, outputGlyphs)
+        self._outputRules = concatenate(numpy, outputRules)
+
+    def _groupIDs(self, group, classes):
+        numpy = self._numpy
+        # glyph ID classes that use the same glyph
+        # order can be used without converting names
+        if isinstance(group, GlyphIDClass) and group.glyphOrder is self.glyphOrder:
+            if not group:
+                return numpy.zeros(0, dtype=numpy.intp)
+            return numpy.frombuffer(group, dtype=numpy.uint16).astype(numpy.intp)
+        glyphIDs = self.glyphOrder.getGlyphIDs(expandGroup(group, classes))
+        return numpy.array(glyphIDs, dtype=numpy.intp)
+
+    # closing
+
+    def close(self, glyphNames):
+        """
+        Get the set of glyph names that can be
+        reached from glyphNames.
+        """
+        numpy = self._numpy
+        glyphNames = set(glyphNames)
+        glyphOrder = self.glyphOrder
+        # the mask has an extra slot at the end that is
+        # always True. -1 points to it.
+        mask = numpy.zeros(self._glyphCount + 1, dtype=bool)
+        mask[-1] = True
+        knownIDs = glyphOrder.findGlyphIDs(glyphNames)
+        mask[numpy.array(sorted(knownIDs), dtype=numpy.intp)] = True
+        ruleMask = numpy.ones(self._ruleCount + 1, dtype=bool)
+        count = mask.sum()
+        while 1:
+            if self._ruleCount:
+                groupHits = numpy.bincount(self._groupIndexes, weights=mask[self._groupMembers], minlength=self._groupCount) > 0
+                groupMisses = numpy.bincount(self._ruleIndexes, weights=~groupHits[self._ruleGroups], minlength=self._ruleCount)
+                ruleMask[:-1] = groupMisses == 0
+            applies = mask[self._outputSources] & ruleMask[self._outputRules]
+            mask[self._outputGlyphs[applies]] = True
+            newCount = mask.sum()
+            if newCount == count:
+                break
+            count = newCount
+        closure = set(glyphOrder.getGlyphNames(numpy.nonzero(mask[:-1])[0]))
+        # glyphs that don't occur in the table are kept
+        closure.update(glyphNames)
+        return closure
+
+
+def concatenate(numpy, arrays):
+    if not arrays:
+        return numpy.zeros(0, dtype=numpy.intp)
+    return numpy.concatenate(arrays)
@@ -0,0 +1,316 @@
+"""
+Apply the substitutions in a GSUB Table to glyph runs.
+
+This is not a shaper. It is a way to see what the lookups
+in a decompiled table do to a sequence of glyph names.
+GSUB lookup types 1, 3, 4 and 6 are supported.
+
+The lookups are applied in the order in which they are
+first written by the table, which is the order that they
+have in the lookup list of a compiled font. A language uses
+its own lookups, the lookups of the default language of its
+script and the lookups of the default script and language
+when includeDefault is set. This is the way that compressed
+tables are written to .fea.
+
+The lookup flags can only be respected if the GDEF glyph
+classes are given. The mark attachment type is not stored
+by the objects, so it is ignored.
+"""
+
+from feaTools2 import FeaToolsError
+from feaTools2.objects import LookupReference, expandGroup, isPositional
+
+# GDEF glyph classes
+baseGlyphClass = 1
+ligatureGlyphClass = 2
+markGlyphClass = 3
+
+supportedTypes = (1, 3, 4, 6)
+
+
+class SubstitutionEngine(object):
+
+    def __init__(self, table, glyphClasses=None, alternateIndex=0):
+        """
+        glyphClasses is an optional dict of glyph names to
+        GDEF glyph classes. alternateIndex is the index of the
+        alternate that type 3 substitutions select.
+        """
+        self.table = table
+        self.glyphClasses = glyphClasses or {}
+        self.alternateIndex = alternateIndex
+        self._classes = table._allClasses()
+        self._lookupOrder = {}
+        self._namedLookups = {}
+        self._findLookupOrder()
+        self._compiledLookups = {}
+        self._featureLookups = {}
+
+    # lookup selection
+
+    def _findLookupOrder(self):
+        lookups = list(self.table.lookups)
+        for feature in self.table:
+            for script in feature.scripts:
+                for language in script.languages:
+                    lookups.extend(language.lookups)
+        for lookup in lookups:
+            if isinstance(lookup, LookupReference):
+                continue
+            if id(lookup) in self._lookupOrder:
+                continue
+            self._lookupOrder[id(lookup)] = len(self._lookupOrder)
+            if lookup.name is not None and lookup.name not in self._namedLookups:
+                self._namedLookups[lookup.name] = lookup
+
+    def getLookups(self, script="DFLT", language=None, features=None):
+        """
+        Get the lookups that are applied for script, language
+        and the feature tags in features, in the order that
+        they are applied. If features is None, all features
+        are used. language None is the default language.
+        """
+        if features is not None:
+            features = frozenset(features)
+        key = (script, language, features)
+        if key not in self._featureLookups:
+            lookups = {}
+            for feature in self.table:
+                if features is not None and feature.tag not in features:
+                    continue
+                for lookup in self._getFeatureLookups(feature, script, language):
+                    if isinstance(lookup, LookupReference):
+                        if lookup.name not in self._namedLookups:
+                            raise FeaToolsError("Unknown lookup %s." % lookup.name)
+                        lookup = self._namedLookups[lookup.name]
+                    lookups[id(lookup)] = lookup
+            lookups = sorted(lookups.values(), key=lambda lookup: self._lookupOrder[id(lookup)])
+            self._featureLookups[key] = lookups
+        return self._featureLookups[key]
+
+    def _getFeatureLookups(self, feature, scriptTag, languageTag):
+        scripts = dict([(script.tag, script) for script in feature.scripts])
+        script = scripts.get(scriptTag)
+        if script is None:
+            script = scripts.get("DFLT")
+        if script is None:
+            return []
+        languages = dict([(language.tag, language) for language in script.languages])
+        language = languages.get(languageTag)
+        if language is None:
+            language = languages.get(None)
+        if language is None:
+            return []
+        lookups = list(language.lookups)
+        if language.tag is not None and language.includeDefault and None in languages:
+            lookups += languages[None].lookups
+        if script.tag != "DFLT" and language.includeDefault and "DFLT" in scripts:
+            defaultLanguages = [language for language in scripts["DFLT"].languages if language.tag is None]
+            if defaultLanguages:
+                lookups += defaultLanguages[0].lookups
+        return lookups
+
+    # compiling
+
+    def _getCompiledLookup(self, lookup):
+        compiled = self._compiledLookups.get(id(lookup))
+        if compiled is None:
+            compiled = CompiledLookup(lookup, self._classes, self.glyphClasses, self.alternateIndex)
+            # the lookup is kept so that the id stays unique
+            self._compiledLookups[id(lookup)] = (lookup, compiled)
+        else:
+            compiled = compiled[1]
+        return compiled
+
+    # application
+
+    def apply(self, glyphNames, script="DFLT", language=None, features=None):
+        """
+        Apply the lookups to a list of glyph names.
+        The new list of glyph names is returned.
+        """
+        glyphNames = list(glyphNames)
+        for lookup in self.getLookups(script, language, features):
+            self._getCompiledLookup(lookup).apply(glyphNames)
+        return glyphNames
+
+    def applyBatch(self, glyphRuns, script="DFLT", language=None, features=None):
+        """
+        Apply the lookups to each list of glyph names in
+        glyphRuns. The results are yielded in order.
+        """
+        lookups = [self._getCompiledLookup(lookup) for lookup in self.getLookups(script, language, features)]
+        for glyphNames in glyphRuns:
+            glyphNames = list(glyphNames)
+            for lookup in lookups:
+                lookup.apply(glyphNames)
+            yield glyphNames
+
+
+class CompiledLookup(object):
+
+    """
+    A lookup converted to dicts and sets of glyph names.
+    """
+
+    def __init__(self, lookup, classes, glyphClasses, alternateIndex):
+        flag = lookup.flag
+        ignoredClasses = set()
+        if flag.ignoreBaseGlyphs:
+            ignoredClasses.add(baseGlyphClass)
+        if flag.ignoreLigatures:
+            ignoredClasses.add(ligatureGlyphClass)
+        if flag.ignoreMarks:
+            ignoredClasses.add(markGlyphClass)
+        self.skip = set([glyphName for glyphName, glyphClass in glyphClasses.items() if glyphClass in ignoredClasses])
+        self.subtables = []
+        # the first glyphs that any subtable can act on
+        self.coverage = set()
+        for subtable in lookup.subtables:
+            if subtable.type not in supportedTypes:
+                raise FeaToolsError("GSUB lookup type %s can not be applied." % subtable.type)
+            rules = {}
+            for index, targetSequence in enumerate(subtable.target):
+                targetSequence = [expandGroup(group, classes) for group in targetSequence]
+                if not targetSequence:
+                    continue
+                # ignore rules match without doing anything
+                if index >= len(subtable.substitution):
+                    action = None
+                else:
+                    substitutionSequence = [expandGroup(group, classes) for group in subtable.substitution[index]]
+                    action = compileAction(subtable.type, targetSequence, substitutionSequence, alternateIndex)
+                rule = (
+                    [frozenset(group) for group in targetSequence[1:]],
+                    action
+                )
+                for glyphName in targetSequence[0]:
+                    if glyphName not in rules:
+                        rules[glyphName] = []
+                    rules[glyphName].append(rule)
+            backtrack = [frozenset(expandGroup(group, classes)) for group in reversed(subtable.backtrack)]
+            lookahead = [frozenset(expandGroup(group, classes)) for group in subtable.lookahead]
+            self.subtables.append((rules, backtrack, lookahead))
+            self.coverage.update(rules.keys())
+
+    def apply(self, glyphNames):
+        """
+        Apply the lookup to glyphNames in place.
+        """
+        coverage = self.coverage
+        skip = self.skip
+        index = 0
+        while index < len(glyphNames):
+            glyphName = glyphNames[index]
+            if glyphName not in coverage or glyphName in skip:
+                index += 1
+                continue
+            index = self._applyAt(glyphNames, index)
+
+    def _applyAt(self, glyphNames, index):
+        # the first subtable that matches is used
+        glyphName = glyphNames[index]
+        for rules, backtrack, lookahead in self.subtables:
+            if glyphName not in rules:
+                continue
+            if backtrack and not self._matchBacktrack(glyphNames, index, backtrack):
+                continue
+            for inputGroups, action in rules[glyphName]:
+                positions = self._matchInput(glyphNames, index, inputGroups)
+                if positions is None:
+                    continue
+                if lookahead and not self._matchLookahead(glyphNames, positions[-1], lookahead):
+                    continue
+                if action is None:
+                    return positions[-1] + 1
+                return action(glyphNames, positions)
+        return index + 1
+
+    def _nextIndex(self, glyphNames, index, step):
+        skip = self.skip
+        index += step
+        while 0 <= index < len(glyphNames) and glyphNames[index] in skip:
+            index += step
+        return index
+
+    def _matchInput(self, glyphNames, index, groups):
+        positions = [index]
+        for group in groups:
+            index = self._nextIndex(glyphNames, index, 1)
+            if index >= len(glyphNames) or glyphNames[index] not in group:
+                return None
+            positions.append(index)
+        return positions
+
+    def _matchBacktrack(self, glyphNames, index, groups):
+        for group in groups:
+            index = self._nextIndex(glyphNames, index, -1)
+            if index < 0 or glyphNames[index] not in group:
+                return False
+        return True
+
+    def _matchLookahead(self, glyphNames, index, groups):
+        for group in groups:
+            index = self._nextIndex(glyphNames, index, 1)
+            if index >= len(glyphNames) or glyphNames[index] not in group:
+                return False
+        return True
+
+
+# -------
+# Actions
+# -------
+
+def compileAction(type, targetSequence, substitutionSequence, alternateIndex):
+    """
+    Get a function that performs the substitution
+    for the glyphs matched by targetSequence.
+    """
+    # the substitution was emptied by glyph removal
+    if not substitutionSequence or not all(substitutionSequence):
+        return None
+    if len(targetSequence) == 1:
+        targetGroup = targetSequence[0]
+        # sub a from [a.alt1 a.alt2];
+        if type == 3:
+            alternates = substitutionSequence[0]
+            substitutions = [alternates[min(alternateIndex, len(alternates) - 1)]]
+            mapping = dict([(glyphName, substitutions) for glyphName in targetGroup])
+        # sub [a b] by [a.alt b.alt];
+        elif isPositional(targetSequence, substitutionSequence):
+            mapping = dict([(t, [s]) for t, s in zip(targetGroup, substitutionSequence[0])])
+        # sub [a b] by c; and sub a by b c;
+        else:
+            substitutions = [group[0] for group in substitutionSequence]
+            mapping = dict([(glyphName, substitutions) for glyphName in targetGroup])
+        return SingleAction(mapping)
+    # sub f i by f_i;
+    ligature = substitutionSequence[0][0]
+    return LigatureAction(ligature)
+
+
+class SingleAction(object):
+
+    def __init__(self, mapping):
+        self.mapping = mapping
+
+    def __call__(self, glyphNames, positions):
+        index = positions[0]
+        substitutions = self.mapping[glyphNames[index]]
+        glyphNames[index:index + 1] = substitutions
+        return index + len(substitutions)
+
+
+class LigatureAction(object):
+
+    def __init__(self, ligature):
+        self.ligature = ligature
+
+    def __call__(self, glyphNames, positions):
+        # skipped glyphs between the components
+        # are moved after the ligature
+        for index in reversed(positions[1:]):
+            del glyphNames[index]
+        glyphNames[positions[0]] = self.ligature
+        return positions[0] + 1
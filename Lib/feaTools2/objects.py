@@ -1,20 +1,87 @@
+import copy
+import hashlib
+from array import array
+from collections import OrderedDict
 from feaTools2 import FeaToolsError
 
+# array.tostring was renamed to tobytes in Python 3
+if hasattr(array, "tobytes"):
+    arrayBytes = array.tobytes
+else:
+    arrayBytes = array.tostring
+
+# the number of times the digest of a lookup flag or
+# a subtable has been reset. a lookup only checks its
+# cached digest against theirs when this has changed.
+_digestResets = 0
+
 
 class Tables(object):
 
-    def __init__(self):
-        self._gsub = Table()
-        self._gsub.tag = "GSUB"
-        self._gpos = Table()
-        self._gpos.tag = "GPOS"
+    tableTags = ("GSUB", "GPOS")
+
+    def __init__(self, loaders=None):
+        """
+        loaders is an optional dict of table tags and functions.
+        The Table is not created until it is first requested.
+        At that time the function is called with the empty Table
+        and it should fill the table.
+        """
+        self._tables = {}
+        self._loaders = {}
+        if loaders is not None:
+            self._loaders.update(loaders)
 
     def __getitem__(self, key):
-        if key == "GSUB":
-            return self._gsub
-        if key == "GPOS":
-            return self._gpos
-        raise KeyError("Unknonw table %s." % key)
+        if key not in self.tableTags:
+            raise KeyError("Unknonw table %s." % key)
+        table = self._tables.get(key)
+        if table is None:
+            table = Table()
+            table.tag = key
+            loader = self._loaders.get(key)
+            if loader is not None:
+                loader(table)
+                del self._loaders[key]
+            self._tables[key] = table
+        return table
+
+    def isLoaded(self, key):
+        return key in self._tables
+
+    def subset(self, keepGlyphs, compress=True):
+        """
+        Subset the tables to keepGlyphs and the glyphs that
+        GSUB can reach from them. The complete set of kept
+        glyphs is returned.
+        """
+        keepGlyphs = self["GSUB"].subset(keepGlyphs, compress=compress)
+        self["GPOS"].subset(keepGlyphs, compress=compress)
+        return keepGlyphs
+
+    def copySubset(self, keepGlyphs):
+        """
+        Get a subset of the tables without changing them.
+        See Table.copySubset. A tuple of the new Tables and
+        the complete set of kept glyphs is returned.
+        """
+        gsub, keepGlyphs = self["GSUB"].copySubset(keepGlyphs)
+        return self._makeSubset(gsub, keepGlyphs)
+
+    def iterSubsets(self, glyphSets):
+        """
+        Yield (tables, keepGlyphs) for each set of glyph
+        names in glyphSets. See copySubset.
+        """
+        for gsub, keepGlyphs in self["GSUB"].iterSubsets(glyphSets):
+            yield self._makeSubset(gsub, keepGlyphs)
+
+    def _makeSubset(self, gsub, keepGlyphs):
+        gpos, keepGlyphs = self["GPOS"].copySubset(keepGlyphs)
+        tables = self.__class__()
+        tables._tables["GSUB"] = gsub
+        tables._tables["GPOS"] = gpos
+        return tables, keepGlyphs
 
 
 class Table(list):
@@ -23,6 +90,12 @@ class Table(list):
         self.tag = None
         self.classes = Classes()
         self.lookups = []
+        self.glyphOrder = None
+        self._glyphIndex = None
+        self._pool = ValuePool()
+        # the lookups and classes are shared with
+        # the table that this is a subset of
+        self._copyOnWrite = False
 
     # writing
 
@@ -43,7 +116,7 @@ class Table(list):
             writer.addLanguageSystem(scriptTag, languageTag)
         # classes
         for name, members in sorted(self.classes.items()):
-            writer.addClassDefinition(name, members)
+            writer.addClassDefinition(name, resolveGlyphNames(members))
         # lookups
         for lookup in self.lookups:
             lookupWriter = writer.addLookup(lookup.name)
@@ -56,20 +129,101 @@ class Table(list):
     # manipulation
 
     def removeGlyphs(self, glyphNames):
-        self.classes.removeGlyphs(glyphNames)
+        self._unshare()
+        glyphNames = set(glyphNames)
+        # shared values are only edited once
+        memo = {}
+        if self._glyphIndex is not None:
+            for owner, lookup in self._glyphIndex.removeGlyphs(glyphNames):
+                if lookup is None:
+                    classes, name = owner
+                    if name in classes:
+                        classes[name] = editValue(classes[name], "removeGlyphs", glyphNames, memo)
+                else:
+                    owner.removeGlyphs(glyphNames, memo)
+                    lookup._digest = None
+            return
+        self.classes.removeGlyphs(glyphNames, memo)
         for lookup in self.lookups:
-            lookup.removeGlyphs(glyphNames)
+            lookup.removeGlyphs(glyphNames, memo)
         for feature in self:
-            feature.removeGlyphs(glyphNames)
+            feature.classes.removeGlyphs(glyphNames, memo)
+        for lookup in iterUniqueLookups(self._languages()):
+            lookup.removeGlyphs(glyphNames, memo)
 
     def renameGlyphs(self, glyphMapping):
-        self.classes.renameGlyphs(glyphMapping)
+        self._unshare()
+        # shared values are only edited once
+        memo = {}
+        if self._glyphIndex is not None:
+            for owner, lookup in self._glyphIndex.renameGlyphs(glyphMapping):
+                if lookup is None:
+                    classes, name = owner
+                    if name in classes:
+                        classes[name] = editValue(classes[name], "renameGlyphs", glyphMapping, memo)
+                else:
+                    owner.renameGlyphs(glyphMapping, memo)
+                    lookup._digest = None
+            return
+        self.classes.renameGlyphs(glyphMapping, memo)
         for lookup in self.lookups:
-            lookup.renameGlyphs(glyphMapping)
+            lookup.renameGlyphs(glyphMapping, memo)
+        for feature in self:
+            feature.classes.renameGlyphs(glyphMapping, memo)
+        # lookups shared by more than one feature
+        # must only be renamed once
+        for lookup in iterUniqueLookups(self._languages()):
+            lookup.renameGlyphs(glyphMapping, memo)
+
+    def _languages(self):
+        languages = []
+        for feature in self:
+            languages += feature._languages()
+        return languages
+
+    def indexGlyphs(self):
+        """
+        Build an index of the places that each glyph occurs.
+        removeGlyphs and renameGlyphs will then only touch the
+        classes that contain the glyphs. The index is kept up to
+        date by those methods and by cleanup. It is discarded by
+        compress and by the writer API of the table. Call this
+        again after adding anything to the features directly.
+        """
+        self._unshare()
+        index = GlyphIndex()
+        index.addClasses(self.classes)
         for feature in self:
-            feature.renameGlyphs(glyphMapping)
+            index.addClasses(feature.classes)
+        for lookup in self.lookups:
+            index.addLookup(lookup)
+        for lookup in iterUniqueLookups(self._languages()):
+            index.addLookup(lookup)
+        self._glyphIndex = index
+
+    def useGlyphIDs(self, glyphOrder=None):
+        """
+        Store the glyphs in the classes as glyph IDs. glyphOrder
+        is a list of glyph names or a GlyphOrder. If it is None,
+        an order is built from the glyphs that are found.
+        Glyph names are only resolved when the table is written.
+        """
+        self._unshare()
+        if not isinstance(glyphOrder, GlyphOrder):
+            glyphOrder = GlyphOrder(glyphOrder)
+        self.glyphOrder = glyphOrder
+        self._glyphIndex = None
+        memo = {}
+        self.classes._useGlyphIDs(glyphOrder, memo)
+        for lookup in self.lookups:
+            lookup._useGlyphIDs(glyphOrder, memo)
+        for feature in self:
+            feature.classes._useGlyphIDs(glyphOrder, memo)
+        for lookup in iterUniqueLookups(self._languages()):
+            lookup._useGlyphIDs(glyphOrder, memo)
 
     def cleanup(self):
+        self._unshare()
         # remove empty classes
         removedClasses = set()
         for name, members in self.classes.items():
@@ -106,6 +260,186 @@ class Table(list):
         for index in reversed(toRemove):
             del self[index]
 
+    # subsetting
+
+    def subset(self, keepGlyphs, compress=True):
+        """
+        Keep only keepGlyphs and the glyphs that can be reached
+        from them through the substitutions. Subtables, lookups,
+        languages, scripts and features that can no longer do
+        anything are removed. Class references are replaced by
+        the class members before the glyphs are removed. If
+        compress is True, the classes are compressed again.
+        The complete set of kept glyphs is returned.
+        """
+        self._unshare()
+        self._glyphIndex = None
+        lookups = self._uniqueLookups()
+        self._flattenClasses(lookups)
+        keepGlyphs = self._glyphClosure(keepGlyphs, lookups)
+        # global lookups
+        removedLookups = set()
+        newLookups = []
+        for lookup in self.lookups:
+            if lookup._subset(keepGlyphs):
+                newLookups.append(lookup)
+            else:
+                removedLookups.add(lookup.name)
+        self.lookups = newLookups
+        # features
+        # shared lookups are only subset once.
+        # the names of the removed feature lookups
+        # are added to removedLookups.
+        subsetLookups = {}
+        newFeatures = []
+        for feature in self:
+            if feature._subset(keepGlyphs, removedLookups, subsetLookups):
+                newFeatures.append(feature)
+        self[:] = newFeatures
+        # compress
+        if compress:
+            self._compressClasses()
+        return keepGlyphs
+
+    def copySubset(self, keepGlyphs):
+        """
+        Get a subset of the table without changing the table.
+        The subset shares the lookups, subtables and classes
+        that subsetting doesn't change with this table. The
+        changed subtables have their class references replaced
+        by the class members. The shared objects are copied
+        the first time that the subset or this table is changed
+        with one of the table methods. Don't change the features
+        or the lookups of either table directly. A tuple of the
+        subset and the complete set of kept glyphs is returned.
+        """
+        lookups = self._uniqueLookups()
+        keepGlyphs = self._glyphClosure(keepGlyphs, lookups)
+        return self._copySubset(keepGlyphs), keepGlyphs
+
+    def iterSubsets(self, glyphSets):
+        """
+        Yield (subset, keepGlyphs) for each set of glyph names
+        in glyphSets. See copySubset. The substitutions are
+        only prepared for computing the glyph closure once.
+        """
+        lookups = self._uniqueLookups()
+        closure = self._makeGlyphClosure(lookups)
+        for glyphNames in glyphSets:
+            keepGlyphs = self._glyphClosure(glyphNames, lookups, closure)
+            yield self._copySubset(keepGlyphs), keepGlyphs
+
+    def _copySubset(self, keepGlyphs):
+        classes = self._allClasses()
+        table = self.__class__()
+        table.tag = self.tag
+        table.glyphOrder = self.glyphOrder
+        # both tables copy the shared objects
+        # before they change them
+        table._copyOnWrite = True
+        self._copyOnWrite = True
+        # the names of the classes used by shared subtables
+        usedClasses = set()
+        # global lookups
+        removedLookups = set()
+        for lookup in self.lookups:
+            newLookup = lookup._copySubset(keepGlyphs, classes, self.glyphOrder, usedClasses)
+            if newLookup is None:
+                removedLookups.add(lookup.name)
+            else:
+                table.lookups.append(newLookup)
+        # features
+        # shared lookups are only subset once.
+        # the names of the removed feature lookups
+        # are added to removedLookups.
+        subsetLookups = {}
+        for feature in self:
+            newFeature = feature._copySubset(keepGlyphs, classes, self.glyphOrder, removedLookups, subsetLookups, usedClasses)
+            if newFeature is not None:
+                newFeature._pool = table._pool
+                table.append(newFeature)
+        # classes
+        usedClasses = findUsedClasses(usedClasses, classes)
+        table.classes = selectClasses(self.classes, usedClasses)
+        for feature in table:
+            feature.classes = selectClasses(feature.classes, usedClasses)
+        return table
+
+    def _unshare(self):
+        """
+        Copy the lookups, subtables and classes that are
+        shared with another table before they are changed.
+        The groups and sequences are immutable, so they
+        stay shared.
+        """
+        if not self._copyOnWrite:
+            return
+        self._copyOnWrite = False
+        copiedLookups = {}
+        self.classes = Classes(self.classes)
+        self.lookups = copyLookups(self.lookups, copiedLookups)
+        for feature in self:
+            feature.classes = Classes(feature.classes)
+            for language in feature._languages():
+                language.lookups = copyLookups(language.lookups, copiedLookups)
+        # the index points at the shared objects
+        if self._glyphIndex is not None:
+            self.indexGlyphs()
+
+    def glyphClosure(self, glyphNames):
+        """
+        Get the set of glyphs that can be reached from
+        glyphNames through the substitutions in the table.
+        """
+        return self._glyphClosure(glyphNames, self._uniqueLookups())
+
+    def _makeGlyphClosure(self, lookups):
+        # use the NumPy engine if it is available
+        try:
+            from feaTools2.closure import GlyphClosure
+            return GlyphClosure(self, lookups)
+        except ImportError:
+            return False
+
+    def _glyphClosure(self, glyphNames, lookups, closure=None):
+        if closure is None:
+            closure = self._makeGlyphClosure(lookups)
+        if closure:
+            return closure.close(glyphNames)
+        classes = self._allClasses()
+        subtables = [subtable for lookup in lookups for subtable in lookup.subtables]
+        closure = set(glyphNames)
+        # repeat until no glyphs are added
+        while 1:
+            count = len(closure)
+            for subtable in subtables:
+                subtable._closeGlyphs(closure, classes)
+            if len(closure) == count:
+                break
+        return closure
+
+    def _uniqueLookups(self):
+        return list(self.lookups) + list(iterUniqueLookups(self._languages()))
+
+    def _allClasses(self):
+        classes = dict(self.classes)
+        for feature in self:
+            classes.update(feature.classes)
+        return classes
+
+    def _flattenClasses(self, lookups):
+        # class names are unique across the table
+        # so the feature classes can be merged
+        classes = self._allClasses()
+        memo = {}
+        for lookup in lookups:
+            lookup._flattenClasses(classes)
+            if self.glyphOrder is not None:
+                lookup._useGlyphIDs(self.glyphOrder, memo)
+        self.classes.clear()
+        for feature in self:
+            feature.classes.clear()
+
     # writer API
 
     def addLanguageSystem(self, script, language):
@@ -113,25 +447,58 @@ class Table(list):
         pass
 
     def addClassDefinition(self, name, members):
-        self.classes[name] = Class(members)
+        self._glyphIndex = None
+        self.classes[name] = self._pool.internClass(members)
 
     def addFeature(self, name):
+        self._glyphIndex = None
         feature = Feature()
         feature.tag = name
+        feature._pool = self._pool
         self.append(feature)
         return feature
 
     def addLookup(self, name):
+        self._glyphIndex = None
         lookup = Lookup()
         lookup.name = name
+        lookup._pool = self._pool
         self.lookups.append(lookup)
         return lookup
 
+    # interning
+
+    def internValues(self):
+        """
+        Replace equal classes and sequences in the table
+        with a single shared object. The values are already
+        interned when the table is filled through the writer
+        API. Call this after changing the table to share the
+        values that the changes created.
+        """
+        self._unshare()
+        self._glyphIndex = None
+        self._pool = ValuePool()
+        pool = self._pool
+        for classes in [self.classes] + [feature.classes for feature in self]:
+            for name, group in list(classes.items()):
+                classes[name] = pool.internClass(group)
+        for lookup in self._uniqueLookups():
+            lookup._pool = pool
+            for subtable in lookup.subtables:
+                subtable._internValues(pool)
+        for feature in self:
+            feature._pool = pool
+
     # compression
 
     def compress(self):
+        self._unshare()
+        # the groups are replaced
+        self._glyphIndex = None
         self._compressLookups()
         self._compressClasses()
+        self.internValues()
 
     def _compressLookups(self):
         """
@@ -139,20 +506,23 @@ class Table(list):
         These can be promoted to global lookups.
         """
         # find all potential lookups
-        lookupOrder = []
+        # equal lookups have equal digests, so the first
+        # occurrence of each can be kept in a dict
+        lookupOrder = OrderedDict()
         candidates = {}
         for feature in self:
             lookups = feature._findLookups()
             for lookup in lookups:
-                if lookup not in lookupOrder:
-                    lookupOrder.append(lookup)
+                digest = lookup._getDigest()
+                if digest not in lookupOrder:
+                    lookupOrder[digest] = lookup
                 if lookup not in candidates:
                     candidates[lookup] = set()
                 candidates[lookup].add(feature.tag)
         # store all lookups that occur in > 1 features
         usedNames = set()
         lookups = {}
-        for lookup in lookupOrder:
+        for lookup in lookupOrder.values():
             features = candidates[lookup]
             if len(features) == 1:
                 continue
@@ -210,9 +580,17 @@ class Table(list):
                     className = name
                     usedNames.add(className)
                     break
-            classes[members] = className
+            # each use of the class shares one reference group
+            classReference = ClassReference()
+            classReference.name = className
+            classes[members] = Class([classReference])
+            if self.glyphOrder is None:
+                if not isinstance(members, Class):
+                    members = Class(members)
+            else:
+                members = GlyphIDClass(members, self.glyphOrder)
             if len(features) > 1:
-                self.classes[className] = Class(members)
+                self.classes[className] = members
             else:
                 feature = features[0]
                 if feature not in featureClasses:
@@ -229,13 +607,15 @@ class Feature(object):
         self.tag = None
         self.classes = Classes()
         self.scripts = []
+        # the ValuePool of the table
+        self._pool = None
 
     # writing
 
     def write(self, writer):
         # classes
         for name, members in sorted(self.classes.items()):
-            writer.addClassDefinition(name, members)
+            writer.addClassDefinition(name, resolveGlyphNames(members))
         # scripts
         for script in self.scripts:
             script.write(writer)
@@ -243,7 +623,11 @@ class Feature(object):
     # writer API
 
     def addClassDefinition(self, name, members):
-        self.classes[name] = Class(members)
+        if self._pool is None:
+            members = Class(members)
+        else:
+            members = self._pool.internClass(members)
+        self.classes[name] = members
 
     def addScript(self, name):
         # prevent direct duplication
@@ -262,7 +646,9 @@ class Feature(object):
             raise FeaToolsError("A script must be defined before adding a lookup.")
         if not self.scripts[-1].languages:
             raise FeaToolsError("A language must be defined before adding a lookup.")
-        return self.scripts[-1].languages[-1].addLookup(name)
+        lookup = self.scripts[-1].languages[-1].addLookup(name)
+        lookup._pool = self._pool
+        return lookup
 
     def addLookupReference(self, name):
         if not self.scripts:
@@ -271,17 +657,30 @@ class Feature(object):
             raise FeaToolsError("A language must be defined before adding a lookup reference.")
         self.scripts[-1].languages[-1].addLookupReference(name)
 
+    def addSharedLookup(self, lookup):
+        if not self.scripts:
+            raise FeaToolsError("A script must be defined before adding a lookup.")
+        if not self.scripts[-1].languages:
+            raise FeaToolsError("A language must be defined before adding a lookup.")
+        self.scripts[-1].languages[-1].addSharedLookup(lookup)
+
     # manipulation
 
     def removeGlyphs(self, glyphNames):
         self.classes.removeGlyphs(glyphNames)
-        for script in self.scripts:
-            script.removeGlyphs(glyphNames)
+        for lookup in iterUniqueLookups(self._languages()):
+            lookup.removeGlyphs(glyphNames)
 
     def renameGlyphs(self, glyphMapping):
         self.classes.renameGlyphs(glyphMapping)
+        for lookup in iterUniqueLookups(self._languages()):
+            lookup.renameGlyphs(glyphMapping)
+
+    def _languages(self):
+        languages = []
         for script in self.scripts:
-            script.renameGlyphs(glyphMapping)
+            languages += script.languages
+        return languages
 
     def cleanup(self):
         # remove empty local classes
@@ -318,15 +717,46 @@ class Feature(object):
                 return False
         return True
 
+    def _subset(self, keepGlyphs, removedLookups, subsetLookups):
+        newScripts = []
+        for script in self.scripts:
+            newLanguages = []
+            for language in script.languages:
+                if language._subset(keepGlyphs, removedLookups, subsetLookups):
+                    newLanguages.append(language)
+            script.languages = newLanguages
+            if newLanguages:
+                newScripts.append(script)
+        self.scripts = newScripts
+        return bool(newScripts)
+
+    def _copySubset(self, keepGlyphs, classes, glyphOrder, removedLookups, subsetLookups, usedClasses):
+        feature = self.__class__()
+        feature.tag = self.tag
+        # the unused classes are removed by the table
+        feature.classes = self.classes
+        for script in self.scripts:
+            newScript = Script()
+            newScript.tag = script.tag
+            for language in script.languages:
+                newLanguage = language._copySubset(keepGlyphs, classes, glyphOrder, removedLookups, subsetLookups, usedClasses)
+                if newLanguage is not None:
+                    newScript.languages.append(newLanguage)
+            if newScript.languages:
+                feature.scripts.append(newScript)
+        if not feature.scripts:
+            return None
+        return feature
+
     # compress lookups
 
     def _findLookups(self):
-        lookups = []
-        for script in self.scripts:
-            for lookup in script._findLookups():
-                if lookup not in lookups:
-                    lookups.append(lookup)
-        return lookups
+        lookups = OrderedDict()
+        for lookup in iterUniqueLookups(self._languages()):
+            digest = lookup._getDigest()
+            if digest not in lookups:
+                lookups[digest] = lookup
+        return list(lookups.values())
 
     def _populateGlobalLookups(self, flippedLookups):
         for script in self.scripts:
@@ -413,24 +843,24 @@ class Feature(object):
     # compress classes
 
     def _findPotentialClasses(self):
-        candidates = []
-        for script in self.scripts:
-            for candidate in script._findPotentialClasses():
-                if candidate not in candidates:
-                    candidates.append(candidate)
-        return candidates
+        # the candidates are gathered in one pass over
+        # the lookups. the keys of the ordered dict keep
+        # the order in which the candidates are found.
+        candidates = OrderedDict()
+        for lookup in iterUniqueLookups(self._languages()):
+            lookup._findPotentialClasses(candidates)
+        return list(candidates.keys())
 
     def _populateClasses(self, allClasses, featureClasses):
-        new = {}
-        for name, members in featureClasses.items():
-            new[name] = Class(members)
-        self.classes.update(new)
+        self.classes.update(featureClasses)
         for script in self.scripts:
             script._populateClasses(allClasses)
 
 
 class Script(object):
 
+    __slots__ = ("tag", "languages")
+
     def __init__(self):
         self.tag = None
         self.languages = []
@@ -456,12 +886,12 @@ class Script(object):
     # manipulation
 
     def removeGlyphs(self, glyphNames):
-        for language in self.languages:
-            language.removeGlyphs(glyphNames)
+        for lookup in iterUniqueLookups(self.languages):
+            lookup.removeGlyphs(glyphNames)
 
     def renameGlyphs(self, glyphMapping):
-        for language in self.languages:
-            language.renameGlyphs(glyphMapping)
+        for lookup in iterUniqueLookups(self.languages):
+            lookup.renameGlyphs(glyphMapping)
 
     def cleanup(self):
         # handle the languages
@@ -493,14 +923,12 @@ class Script(object):
     # compression
 
     def _findLookups(self):
-        lookups = []
-        for language in self.languages:
-            for lookup in language.lookups:
-                if isinstance(lookup, LookupReference):
-                    continue
-                if lookup not in lookups:
-                    lookups.append(lookup)
-        return lookups
+        lookups = OrderedDict()
+        for lookup in iterUniqueLookups(self.languages):
+            digest = lookup._getDigest()
+            if digest not in lookups:
+                lookups[digest] = lookup
+        return list(lookups.values())
 
     def _populateGlobalLookups(self, flippedLookups):
         for language in self.languages:
@@ -510,14 +938,6 @@ class Script(object):
         for language in self.languages:
             language._populateFeatureLookups(flippedLookups, haveSeen)
 
-    def _findPotentialClasses(self):
-        candidates = []
-        for language in self.languages:
-            for candidate in language._findPotentialClasses():
-                if candidate not in candidates:
-                    candidates.append(candidate)
-        return candidates
-
     def _populateClasses(self, classes):
         for language in self.languages:
             language._populateClasses(classes)
@@ -525,6 +945,8 @@ class Script(object):
 
 class Language(object):
 
+    __slots__ = ("tag", "includeDefault", "lookups")
+
     def __init__(self):
         self.tag = None
         self.includeDefault = True
@@ -555,6 +977,12 @@ class Language(object):
         lookupReference.name = name
         self.lookups.append(lookupReference)
 
+    def addSharedLookup(self, lookup):
+        # the lookup object is now referenced
+        # by more than one language
+        lookup._shared = True
+        self.lookups.append(lookup)
+
     # manipulation
 
     def removeGlyphs(self, glyphNames):
@@ -606,6 +1034,47 @@ class Language(object):
                 return False
         return True
 
+    def _subset(self, keepGlyphs, removedLookups, subsetLookups):
+        newLookups = []
+        for lookup in self.lookups:
+            if isinstance(lookup, LookupReference):
+                keep = lookup.name not in removedLookups
+            else:
+                keep = subsetLookups.get(id(lookup))
+                if keep is None:
+                    keep = lookup._subset(keepGlyphs)
+                    subsetLookups[id(lookup)] = keep
+                # the references that follow the lookup
+                # are removed with it
+                if not keep and lookup.name is not None:
+                    removedLookups.add(lookup.name)
+            if keep:
+                newLookups.append(lookup)
+        self.lookups = newLookups
+        return bool(newLookups)
+
+    def _copySubset(self, keepGlyphs, classes, glyphOrder, removedLookups, subsetLookups, usedClasses):
+        language = self.__class__()
+        language.tag = self.tag
+        language.includeDefault = self.includeDefault
+        for lookup in self.lookups:
+            if isinstance(lookup, LookupReference):
+                if lookup.name not in removedLookups:
+                    language.lookups.append(lookup)
+                continue
+            if id(lookup) not in subsetLookups:
+                subsetLookups[id(lookup)] = lookup._copySubset(keepGlyphs, classes, glyphOrder, usedClasses)
+            newLookup = subsetLookups[id(lookup)]
+            if newLookup is not None:
+                language.lookups.append(newLookup)
+            # the references that follow the lookup
+            # are removed with it
+            elif lookup.name is not None:
+                removedLookups.add(lookup.name)
+        if not language.lookups:
+            return None
+        return language
+
     # compress lookups
 
     def _populateGlobalLookups(self, flippedLookups):
@@ -635,16 +1104,6 @@ class Language(object):
 
     # compress classes
 
-    def _findPotentialClasses(self):
-        candidates = []
-        for lookup in self.lookups:
-            if isinstance(lookup, LookupReference):
-                continue
-            for candidate in lookup._findPotentialClasses():
-                if candidate not in candidates:
-                    candidates.append(candidate)
-        return candidates
-
     def _populateClasses(self, classes):
         for lookup in self.lookups:
             if isinstance(lookup, LookupReference):
@@ -654,10 +1113,16 @@ class Language(object):
 
 class Lookup(object):
 
+    __slots__ = ("name", "flag", "subtables", "_shared", "_digest", "_pool")
+
     def __init__(self):
         self.name = None
         self.flag = LookupFlag()
         self.subtables = []
+        self._shared = False
+        self._digest = None
+        # the ValuePool of the table
+        self._pool = None
 
     # writing
 
@@ -680,26 +1145,22 @@ class Lookup(object):
         self.flag = lookupFlag
 
     def _convertSequence(self, sequence):
-        newSequence = Sequence()
-        for group in sequence:
-            newGroup = Class()
-            for member in group:
-                if member.startswith("@"):
-                    m = ClassReference()
-                    m.name = member
-                    member = m
-                newGroup.append(member)
-            newSequence.append(newGroup)
-        return newSequence
+        if self._pool is None:
+            return Sequence([Class(makeClassReferences(members)) for members in sequence])
+        return self._pool.internNamedSequence(sequence)
 
     def addGSUBSubtable(self, target, substitution, type, backtrack=[], lookahead=[]):
+        convertSequence = self._convertSequence
+        if self._pool is not None:
+            convertSequence = self._pool.internNamedSequence
         subtable = GSUBSubtable()
         subtable.type = type
-        subtable.target = [self._convertSequence(i) for i in target]
-        subtable.substitution = [self._convertSequence(i) for i in substitution]
-        subtable.backtrack = self._convertSequence(backtrack)
-        subtable.lookahead = self._convertSequence(lookahead)
+        subtable.target = [convertSequence(i) for i in target]
+        subtable.substitution = [convertSequence(i) for i in substitution]
+        subtable.backtrack = convertSequence(backtrack)
+        subtable.lookahead = convertSequence(lookahead)
         self.subtables.append(subtable)
+        self._digest = None
 
     def addGPOSSubtable(self, target, positioning, backtrack=[], lookahead=[], type=None):
         raise NotImplementedError
@@ -709,15 +1170,18 @@ class Lookup(object):
 
     # manipulation
 
-    def removeGlyphs(self, glyphNames):
+    def removeGlyphs(self, glyphNames, memo=None):
         for subtable in self.subtables:
-            subtable.removeGlyphs(glyphNames)
+            subtable.removeGlyphs(glyphNames, memo)
+        self._digest = None
 
-    def renameGlyphs(self, glyphMapping):
+    def renameGlyphs(self, glyphMapping, memo=None):
         for subtable in self.subtables:
-            subtable.renameGlyphs(glyphMapping)
+            subtable.renameGlyphs(glyphMapping, memo)
+        self._digest = None
 
     def cleanup(self):
+        self._digest = None
         # handle the subtables
         toRemove = []
         for index, subtable in enumerate(self.subtables):
@@ -733,6 +1197,12 @@ class Lookup(object):
     def _removeClassReferences(self, removedClasses):
         for subtable in self.subtables:
             subtable._removeClassReferences(removedClasses)
+        self._digest = None
+
+    def _useGlyphIDs(self, glyphOrder, memo=None):
+        for subtable in self.subtables:
+            subtable._useGlyphIDs(glyphOrder, memo)
+        self._digest = None
 
     def _shouldBeRemoved(self):
         for subtable in self.subtables:
@@ -740,43 +1210,103 @@ class Lookup(object):
                 return False
         return True
 
+    def _flattenClasses(self, classes):
+        for subtable in self.subtables:
+            subtable._flattenClasses(classes)
+        self._digest = None
+
+    def _subset(self, keepGlyphs):
+        self.subtables = [subtable for subtable in self.subtables if subtable._subset(keepGlyphs)]
+        return bool(self.subtables)
+
+    def _copySubset(self, keepGlyphs, classes, glyphOrder, usedClasses):
+        """
+        Get this lookup if subsetting doesn't change it,
+        a new lookup if it does or None if it is removed.
+        """
+        subtables = []
+        changed = False
+        for subtable in self.subtables:
+            newSubtable = subtable._copySubset(keepGlyphs, classes, glyphOrder, usedClasses)
+            if newSubtable is not subtable:
+                changed = True
+            if newSubtable is not None:
+                subtables.append(newSubtable)
+        if not subtables:
+            return None
+        if not changed:
+            return self
+        lookup = self.__class__()
+        lookup.name = self.name
+        lookup.flag = self.flag
+        lookup.subtables = subtables
+        lookup._shared = self._shared
+        lookup._pool = self._pool
+        return lookup
+
+    def _copy(self):
+        lookup = self.__class__()
+        lookup.name = self.name
+        lookup.flag = self.flag._copy()
+        lookup.subtables = [subtable._copy() for subtable in self.subtables]
+        lookup._shared = self._shared
+        lookup._pool = self._pool
+        return lookup
+
     # compression
 
-    def _findPotentialClasses(self):
-        candidates = []
+    def _findPotentialClasses(self, candidates):
         for subtable in self.subtables:
-            for candidate in subtable._findPotentialClasses():
-                if candidate not in candidates:
-                    candidates.append(candidate)
-        return candidates
+            subtable._findPotentialClasses(candidates)
 
     def _populateClasses(self, classes):
         for subtable in self.subtables:
             subtable._populateClasses(classes)
+        self._digest = None
+
+    # comparison
+
+    def _getDigest(self):
+        """
+        A digest of the flag and the subtables. The name is not
+        included. This is cached until the lookup is changed.
+        The flag and the subtables can be changed directly, so
+        their digests are collected again after the digest of
+        any flag or subtable has been reset and when the list
+        of subtables has been replaced or resized. Replacing an
+        item of the list with another subtable that has not been
+        changed since the last check requires resetting _digest.
+        """
+        cached = self._digest
+        subtables = self.subtables
+        if cached is not None and cached[0] == _digestResets and cached[1] is subtables and cached[2] == len(subtables):
+            return cached[4]
+        data = (self.flag._getDigest(), [subtable._getDigest() for subtable in subtables])
+        if cached is not None and cached[3] == data:
+            digest = cached[4]
+        else:
+            digest = hashlib.sha1(repr(data).encode("utf-8")).digest()
+        types = tuple([subtable.type for subtable in subtables])
+        self._digest = (_digestResets, subtables, len(subtables), data, digest, types)
+        return digest
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
-        if self.flag != other.flag:
-            return False
-        if self.subtables != other.subtables:
-            return False
-        return True
+        return self._getDigest() == other._getDigest()
 
     def __ne__(self, other):
         return not self == other
 
     def __hash__(self):
-        s = "Lookup | name=%s flag=%s subtables=%s" % (
-            self.name,
-            str(hash(self.flag)),
-            " ".join([str(hash(i)) for i in self.subtables])
-        )
-        return hash(s)
+        # the types of the subtables are cached with the digest
+        return hash((self.name, self._getDigest(), self._digest[5]))
 
 
 class LookupReference(object):
 
+    __slots__ = ("name",)
+
     def __init__(self):
         self.name = None
 
@@ -798,6 +1328,8 @@ class LookupReference(object):
 
 class LookupFlag(object):
 
+    __slots__ = ("rightToLeft", "ignoreBaseGlyphs", "ignoreLigatures", "ignoreMarks", "markAttachmentType", "_digest")
+
     def __init__(self):
         self.rightToLeft = False
         self.ignoreBaseGlyphs = False
@@ -805,6 +1337,12 @@ class LookupFlag(object):
         self.ignoreMarks = False
         self.markAttachmentType = False
 
+    def __setattr__(self, attr, value):
+        global _digestResets
+        object.__setattr__(self, attr, value)
+        object.__setattr__(self, "_digest", None)
+        _digestResets += 1
+
     def write(self, writer):
         writer.addLookupFlag(
             rightToLeft=self.rightToLeft,
@@ -814,44 +1352,52 @@ class LookupFlag(object):
             markAttachmentType=self.markAttachmentType
         )
 
+    def _copy(self):
+        flag = self.__class__()
+        flag.rightToLeft = self.rightToLeft
+        flag.ignoreBaseGlyphs = self.ignoreBaseGlyphs
+        flag.ignoreLigatures = self.ignoreLigatures
+        flag.ignoreMarks = self.ignoreMarks
+        flag.markAttachmentType = self.markAttachmentType
+        return flag
+
+    # comparison
+
+    def _getDigest(self):
+        if self._digest is None:
+            object.__setattr__(self, "_digest", (
+                self.rightToLeft,
+                self.ignoreBaseGlyphs,
+                self.ignoreLigatures,
+                self.ignoreMarks,
+                self.markAttachmentType
+            ))
+        return self._digest
+
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
-        if self.rightToLeft != other.rightToLeft:
-            return False
-        if self.ignoreBaseGlyphs != other.ignoreBaseGlyphs:
-            return False
-        if self.ignoreLigatures != other.ignoreLigatures:
-            return False
-        if self.ignoreMarks != other.ignoreMarks:
-            return False
-        if self.markAttachmentType != other.markAttachmentType:
-            return False
-        return True
+        return self._getDigest() == other._getDigest()
 
     def __ne__(self, other):
         return not self == other
 
     def __hash__(self):
-        s = "LookupFlag | rightToLeft=%s ignoreBaseGlyphs=%s ignoreLigatures=%s ignoreMarks=%s markAttachmentType=%s" % (
-            self.rightToLeft,
-            self.ignoreBaseGlyphs,
-            self.ignoreLigatures,
-            self.ignoreMarks,
-            self.markAttachmentType
-        )
-        return hash(s)
+        return hash(self._getDigest())
 
 
 class GSUBSubtable(object):
 
+    __slots__ = ("type", "_backtrack", "_lookahead", "_target", "_substitution", "_manipulationResultedInEmptySubstitution", "_digest")
+
     def __init__(self):
         self.type = None
         self._backtrack = Sequence()
         self._lookahead = Sequence()
-        self._target = Sequence()
-        self._substitution = Sequence()
+        self._target = []
+        self._substitution = []
         self._manipulationResultedInEmptySubstitution = False
+        self._digest = None
 
     # attribute setting
 
@@ -859,7 +1405,12 @@ class GSUBSubtable(object):
         return self._backtrack
 
     def _set_backtrack(self, value):
-        self._backtrack = Sequence(value)
+        global _digestResets
+        if not isinstance(value, Sequence):
+            value = Sequence(value)
+        self._backtrack = value
+        self._digest = None
+        _digestResets += 1
 
     backtrack = property(_get_backtrack, _set_backtrack)
 
@@ -867,7 +1418,12 @@ class GSUBSubtable(object):
         return self._lookahead
 
     def _set_lookahead(self, value):
-        self._lookahead = Sequence(value)
+        global _digestResets
+        if not isinstance(value, Sequence):
+            value = Sequence(value)
+        self._lookahead = value
+        self._digest = None
+        _digestResets += 1
 
     lookahead = property(_get_lookahead, _set_lookahead)
 
@@ -875,7 +1431,10 @@ class GSUBSubtable(object):
         return self._target
 
     def _set_target(self, value):
+        global _digestResets
         self._target = value
+        self._digest = None
+        _digestResets += 1
 
     target = property(_get_target, _set_target)
 
@@ -883,10 +1442,13 @@ class GSUBSubtable(object):
         return self._substitution
 
     def _set_substitution(self, value):
+        global _digestResets
         # any setting of the value causes the flag
         # as a result of a manipulation to go away
         self._manipulationResultedInEmptySubstitution = False
         self._substitution = value
+        self._digest = None
+        _digestResets += 1
 
     substitution = property(_get_substitution, _set_substitution)
 
@@ -902,8 +1464,8 @@ class GSUBSubtable(object):
     def _flattenClassReferences(self, sequence):
         newSequence = []
         for group in sequence:
-            newGroup = Class()
-            for member in group:
+            newGroup = []
+            for member in resolveGlyphNames(group):
                 if isinstance(member, ClassReference):
                     member = member.name
                 newGroup.append(member)
@@ -912,8 +1474,7 @@ class GSUBSubtable(object):
 
     # compression
 
-    def _findPotentialClasses(self):
-        candidates = []
+    def _findPotentialClasses(self, candidates):
         self._findPotentialClassesInSequence(self.backtrack, candidates)
         self._findPotentialClassesInSequence(self.lookahead, candidates)
         for sequence in self.target:
@@ -921,13 +1482,13 @@ class GSUBSubtable(object):
         if self.type != 3:
             for sequence in self.substitution:
                 self._findPotentialClassesInSequence(sequence, candidates)
-        return candidates
 
     def _findPotentialClassesInSequence(self, sequence, candidates):
+        # candidates is an ordered dict. setting a key
+        # that is already present doesn't change the order.
         for member in sequence:
-            if member not in candidates:
-                if len(member) > 1:
-                    candidates.append(tuple(member))
+            if len(member) > 1:
+                candidates[member] = None
 
     def _populateClasses(self, classes):
         self.backtrack = self._populateClassesInSequence(self.backtrack, classes)
@@ -937,101 +1498,87 @@ class GSUBSubtable(object):
             self.substitution = [self._populateClassesInSequence(i, classes) for i in self.substitution]
 
     def _populateClassesInSequence(self, sequence, classes):
-        newSequence = Sequence()
-        for member in sequence:
-            m = tuple(member)
-            if m in classes:
-                classReference = ClassReference()
-                classReference.name = classes[m]
-                member = Class([classReference])
-            newSequence.append(member)
-        return newSequence
+        # classes maps the members of each
+        # class to a group that references it
+        newSequence = [classes.get(member, member) for member in sequence]
+        return sequence._replaceGroups(newSequence)
+
+    # comparison
+
+    def _getDigest(self):
+        """
+        A digest of the sequences. The type is not included.
+        This is cached until the subtable is changed.
+        """
+        if self._digest is None:
+            data = [
+                sequenceDigestData(self.backtrack),
+                sequenceDigestData(self.lookahead),
+                "".join([sequenceDigestData(i) + "\x05" for i in self.target]),
+                "".join([sequenceDigestData(i) + "\x05" for i in self.substitution])
+            ]
+            self._digest = hashlib.sha1("\x04".join(data).encode("utf-8")).digest()
+        return self._digest
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
-        if self.backtrack != other.backtrack:
-            return False
-        if self.lookahead != other.lookahead:
-            return False
-        if self.target != other.target:
-            return False
-        if self.substitution != other.substitution:
-            return False
-        return True
+        return self._getDigest() == other._getDigest()
 
     def __ne__(self, other):
         return not self == other
 
     def __hash__(self):
-        s = "GSUBSubtable | type=%d backtrack=%s lookahead=%s target=%s substitution=%s" % (
-            self.type,
-            " ".join([str(i) for i in self.backtrack]),
-            " ".join([str(i) for i in self.lookahead]),
-            " ".join([str(i) for i in self.target]),
-            " ".join([str(i) for i in self.substitution])
-        )
-        return hash(s)
+        return hash((self.type, self._getDigest()))
 
     # manipulation
 
-    def removeGlyphs(self, glyphNames):
-        self._removeGlyphsFromSequence(self.backtrack, glyphNames)
-        self._removeGlyphsFromSequence(self.lookahead, glyphNames)
-        for sequence in self.target:
-            self._removeGlyphsFromSequence(sequence, glyphNames)
+    def _editSequences(self, methodName, argument, memo):
+        global _digestResets
+        # the sequences are replaced with edited copies
+        if memo is None:
+            memo = {}
+        self._backtrack = editValue(self._backtrack, methodName, argument, memo)
+        self._lookahead = editValue(self._lookahead, methodName, argument, memo)
+        self._target = [editValue(i, methodName, argument, memo) for i in self._target]
+        self._substitution = [editValue(i, methodName, argument, memo) for i in self._substitution]
+        self._digest = None
+        _digestResets += 1
+
+    def removeGlyphs(self, glyphNames, memo=None):
         hadSubstitution = bool(self.substitution)
-        for sequence in self.substitution:
-            self._removeGlyphsFromSequence(sequence, glyphNames)
+        self._editSequences("removeGlyphs", glyphNames, memo)
         if not self.substitution and hadSubstitution:
             self._manipulationResultedInEmptySubstitution = True
 
-    def _removeGlyphsFromSequence(self, sequence, glyphNames):
-        for member in sequence:
-            member.removeGlyphs(glyphNames)
-
-    def renameGlyphs(self, glyphMapping):
-        self._renameGlyphsInSequence(self.backtrack, glyphMapping)
-        self._renameGlyphsInSequence(self.lookahead, glyphMapping)
-        for sequence in self.target:
-            self._renameGlyphsInSequence(sequence, glyphMapping)
-        for sequence in self.substitution:
-            self._renameGlyphsInSequence(sequence, glyphMapping)
-
-    def _renameGlyphsInSequence(self, sequence, glyphMapping):
-        for member in sequence:
-            member.renameGlyphs(glyphMapping)
+    def renameGlyphs(self, glyphMapping, memo=None):
+        self._editSequences("renameGlyphs", glyphMapping, memo)
 
     def cleanup(self):
-        self.backtrack.cleanup()
-        self.lookahead.cleanup()
+        self._digest = None
+        self.backtrack = self.backtrack.cleanup()
+        self.lookahead = self.lookahead.cleanup()
         new = []
         for sequence in self.target:
-            sequence.cleanup()
+            sequence = sequence.cleanup()
             if sequence:
                 new.append(sequence)
         self.target = new
         new = []
         for sequence in self.substitution:
-            sequence.cleanup()
+            sequence = sequence.cleanup()
             if sequence:
                 new.append(sequence)
         self.substitution = new
 
-    def _removeClassReferences(self, removedClasses):
-        self._removeClassReferencesInSequence(self.backtrack, removedClasses)
-        self._removeClassReferencesInSequence(self.lookahead, removedClasses)
-        for sequence in self.target:
-            self._removeClassReferencesInSequence(sequence, removedClasses)
+    def _removeClassReferences(self, removedClasses, memo=None):
         hadSubstitution = bool(self.substitution)
-        for sequence in self.substitution:
-            self._removeClassReferencesInSequence(sequence, removedClasses)
+        self._editSequences("_removeClassReferences", removedClasses, memo)
         if not self.substitution and hadSubstitution:
             self._manipulationResultedInEmptySubstitution = True
 
-    def _removeClassReferencesInSequence(self, sequence, removedClasses):
-        for member in sequence:
-            member._removeClassReferences(removedClasses)
+    def _useGlyphIDs(self, glyphOrder, memo=None):
+        self._editSequences("_useGlyphIDs", glyphOrder, memo)
 
     def _shouldBeRemoved(self):
         if not self.target:
@@ -1040,54 +1587,215 @@ class GSUBSubtable(object):
             return True
         return False
 
+    # subsetting
+
+    def _flattenClasses(self, classes):
+        self.backtrack = flattenSequence(self.backtrack, classes)
+        self.lookahead = flattenSequence(self.lookahead, classes)
+        self.target = [flattenSequence(i, classes) for i in self.target]
+        self.substitution = [flattenSequence(i, classes) for i in self.substitution]
+
+    def _closeGlyphs(self, glyphNames, classes):
+        """
+        Add the glyphs that this subtable can
+        substitute for glyphNames to glyphNames.
+        """
+        for sequence in (self.backtrack, self.lookahead):
+            for group in sequence:
+                if not groupIntersects(group, glyphNames, classes):
+                    return
+        for index, targetSequence in enumerate(self.target):
+            if index >= len(self.substitution):
+                break
+            targetSequence = [expandGroup(group, classes) for group in targetSequence]
+            matched = True
+            for group in targetSequence:
+                if not groupIntersects(group, glyphNames, classes):
+                    matched = False
+                    break
+            if not matched:
+                continue
+            substitutionSequence = [expandGroup(group, classes) for group in self.substitution[index]]
+            if isPositional(targetSequence, substitutionSequence):
+                for targetGroup, substitutionGroup in zip(targetSequence, substitutionSequence):
+                    for t, s in zip(targetGroup, substitutionGroup):
+                        if t in glyphNames:
+                            glyphNames.add(s)
+            else:
+                for group in substitutionSequence:
+                    glyphNames.update(group)
+
+    def _subset(self, keepGlyphs):
+        """
+        Remove the glyphs that are not in keepGlyphs. Pairs of
+        target and substitution glyphs are removed together.
+        False is returned if the subtable can't do anything.
+        """
+        self._digest = None
+        backtrack = Sequence([subsetGroup(group, keepGlyphs) for group in self.backtrack])
+        lookahead = Sequence([subsetGroup(group, keepGlyphs) for group in self.lookahead])
+        for group in backtrack + lookahead:
+            if not group:
+                return False
+        newTarget = []
+        newSubstitution = []
+        for index, targetSequence in enumerate(self.target):
+            substitutionSequence = None
+            if index < len(self.substitution):
+                substitutionSequence = self.substitution[index]
+            if substitutionSequence is not None and isPositional(targetSequence, substitutionSequence):
+                targetSequence, substitutionSequence = subsetPositionalSequences(targetSequence, substitutionSequence, keepGlyphs)
+            else:
+                targetSequence = Sequence([subsetGroup(group, keepGlyphs) for group in targetSequence])
+                if substitutionSequence is not None:
+                    substitutionSequence = Sequence([subsetGroup(group, keepGlyphs) for group in substitutionSequence])
+            groups = list(targetSequence)
+            if substitutionSequence is not None:
+                groups += substitutionSequence
+            if not targetSequence or not all(groups):
+                continue
+            newTarget.append(targetSequence)
+            if substitutionSequence is not None:
+                newSubstitution.append(substitutionSequence)
+        if not newTarget:
+            return False
+        self.backtrack = backtrack
+        self.lookahead = lookahead
+        self.target = newTarget
+        self.substitution = newSubstitution
+        return True
+
+    def _copySubset(self, keepGlyphs, classes, glyphOrder, usedClasses):
+        """
+        Get this subtable if subsetting doesn't change it,
+        a new subtable if it does or None if it is removed.
+        The names of the classes used by this subtable are
+        added to usedClasses when it is not changed.
+        """
+        if self._isKept(keepGlyphs, classes):
+            for sequence in self._sequences():
+                for group in sequence:
+                    usedClasses.update(findClassNames(group))
+            return self
+        subtable = self.__class__()
+        subtable.type = self.type
+        subtable.backtrack = flattenSequence(self.backtrack, classes)
+        subtable.lookahead = flattenSequence(self.lookahead, classes)
+        subtable.target = [flattenSequence(i, classes) for i in self.target]
+        subtable.substitution = [flattenSequence(i, classes) for i in self.substitution]
+        if glyphOrder is not None:
+            subtable._useGlyphIDs(glyphOrder)
+        if not subtable._subset(keepGlyphs):
+            return None
+        return subtable
+
+    def _isKept(self, keepGlyphs, classes):
+        # subsetting removes empty sequences and groups
+        for sequence in self.target:
+            if not sequence:
+                return False
+        for sequence in self._sequences():
+            for group in sequence:
+                glyphNames = expandGroup(group, classes)
+                if not glyphNames:
+                    return False
+                for glyphName in glyphNames:
+                    if glyphName not in keepGlyphs:
+                        return False
+        return True
+
+    def _sequences(self):
+        return [self.backtrack, self.lookahead] + list(self.target) + list(self.substitution)
+
+    def _internValues(self, pool):
+        self._backtrack = pool.internSequence(self._backtrack)
+        self._lookahead = pool.internSequence(self._lookahead)
+        self._target = [pool.internSequence(i) for i in self._target]
+        self._substitution = [pool.internSequence(i) for i in self._substitution]
+
+    def _copy(self):
+        subtable = self.__class__()
+        subtable.type = self.type
+        # the sequences are immutable
+        subtable.backtrack = self.backtrack
+        subtable.lookahead = self.lookahead
+        subtable.target = list(self.target)
+        subtable.substitution = list(self.substitution)
+        subtable._manipulationResultedInEmptySubstitution = self._manipulationResultedInEmptySubstitution
+        return subtable
+
 
 class Classes(dict):
 
-    def removeGlyphs(self, glyphNames):
-        for group in self.values():
-            group.removeGlyphs(glyphNames)
+    def removeGlyphs(self, glyphNames, memo=None):
+        for name, group in list(self.items()):
+            self[name] = editValue(group, "removeGlyphs", glyphNames, memo)
 
-    def renameGlyphs(self, glyphMapping):
-        for group in self.values():
-            group.renameGlyphs(glyphMapping)
+    def renameGlyphs(self, glyphMapping, memo=None):
+        for name, group in list(self.items()):
+            self[name] = editValue(group, "renameGlyphs", glyphMapping, memo)
 
+    def _useGlyphIDs(self, glyphOrder, memo=None):
+        for name, group in list(self.items()):
+            self[name] = editValue(group, "_useGlyphIDs", glyphOrder, memo)
 
-class Sequence(list):
 
-    def removeGlyphs(self, glyphNames):
-        for group in self:
-            group.removeGlyphs(glyphNames)
+class Sequence(tuple):
 
-    def renameGlyphs(self, glyphMapping):
-        for group in self:
-            group.removeGlyphs(glyphMapping)
+    """
+    An immutable sequence of groups. The methods that
+    change the groups return a new Sequence, or this
+    Sequence if nothing is changed.
+    """
+
+    __slots__ = ()
+
+    def removeGlyphs(self, glyphNames, memo=None):
+        return self._replaceGroups([editValue(group, "removeGlyphs", glyphNames, memo) for group in self])
+
+    def renameGlyphs(self, glyphMapping, memo=None):
+        return self._replaceGroups([editValue(group, "renameGlyphs", glyphMapping, memo) for group in self])
 
     def cleanup(self):
-        new = []
-        for group in self:
-            if group:
-                new.append(group)
-        del self[:]
-        self.extend(new)
+        return self._replaceGroups([group for group in self if group])
+
+    def _removeClassReferences(self, removedClasses, memo=None):
+        return self._replaceGroups([editValue(group, "_removeClassReferences", removedClasses, memo) for group in self])
+
+    def _useGlyphIDs(self, glyphOrder, memo=None):
+        return self._replaceGroups([editValue(group, "_useGlyphIDs", glyphOrder, memo) for group in self])
+
+    def _replaceGroups(self, groups):
+        if len(groups) == len(self):
+            for old, new in zip(self, groups):
+                if old is not new:
+                    break
+            else:
+                return self
+        return self.__class__(groups)
 
-    def _removeClassReferences(self, removedClasses):
-        for group in self:
-            group._removeClassReferences(removedClasses)
 
+class Class(tuple):
 
-class Class(list):
+    """
+    An immutable group of glyph names and class references.
+    The methods that change the members return a new Class,
+    or this Class if nothing is changed.
+    """
+
+    __slots__ = ()
 
     def removeGlyphs(self, glyphNames):
         new = [member for member in self if member not in glyphNames]
-        if new != self:
-            del self[:]
-            self.extend(new)
+        if len(new) == len(self):
+            return self
+        return self.__class__(new)
 
     def renameGlyphs(self, glyphMapping):
-        new = [glyphMapping.get(member, member) for member in self]
-        if new != self:
-            del self[:]
-            self.extend(new)
+        new = tuple([glyphMapping.get(member, member) for member in self])
+        if new == self:
+            return self
+        return self.__class__(new)
 
     def _removeClassReferences(self, removedClasses):
         new = []
@@ -1095,13 +1803,248 @@ class Class(list):
             if isinstance(member, ClassReference) and member.name in removedClasses:
                 continue
             new.append(member)
-        if new != self:
-            del self[:]
-            self.extend(new)
+        if len(new) == len(self):
+            return self
+        return self.__class__(new)
+
+    def _useGlyphIDs(self, glyphOrder):
+        return makeGlyphIDClass(self, glyphOrder)
+
+
+class GlyphIDClass(array):
+
+    """
+    A class stored as glyph IDs. The names are
+    looked up in glyphOrder, a GlyphOrder. This is
+    not changed once it is in a table. Like Class,
+    the editing methods return a new GlyphIDClass.
+    It is hashed by the bytes of the glyph IDs.
+    """
+
+    __slots__ = ("glyphOrder", "_hash")
+
+    def __new__(cls, glyphIDs=(), glyphOrder=None):
+        self = array.__new__(cls, "H", glyphIDs)
+        self.glyphOrder = glyphOrder
+        self._hash = None
+        return self
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(arrayBytes(self))
+        return self._hash
+
+    # array copies and pickles as a plain array
+
+    def __reduce__(self):
+        return (self.__class__, (list(self), self.glyphOrder))
+
+    def __reduce_ex__(self, protocol):
+        return self.__reduce__()
+
+    def __copy__(self):
+        return self.__class__(self, self.glyphOrder)
+
+    def __deepcopy__(self, memo):
+        return self.__class__(self, copy.deepcopy(self.glyphOrder, memo))
+
+    def glyphNames(self):
+        return self.glyphOrder.getGlyphNames(self)
+
+    def removeGlyphs(self, glyphNames):
+        glyphIDs = self.glyphOrder.findGlyphIDs(glyphNames)
+        new = [member for member in self if member not in glyphIDs]
+        if len(new) == len(self):
+            return self
+        return self.__class__(new, self.glyphOrder)
+
+    def renameGlyphs(self, glyphMapping):
+        names = self.glyphOrder.glyphNames
+        getGlyphID = self.glyphOrder.getGlyphID
+        new = [getGlyphID(glyphMapping[names[member]]) if names[member] in glyphMapping else member for member in self]
+        if new == list(self):
+            return self
+        return self.__class__(new, self.glyphOrder)
+
+    def _removeClassReferences(self, removedClasses):
+        # there are no references in here
+        return self
+
+    def _useGlyphIDs(self, glyphOrder):
+        return self
+
+
+class GlyphOrder(object):
+
+    """
+    A list of glyph names and the reverse mapping. A name
+    that is not in the list is appended the first time
+    that its glyph ID is requested.
+    """
+
+    def __init__(self, glyphNames=None):
+        self.glyphNames = []
+        self._glyphIDs = {}
+        if glyphNames is not None:
+            for glyphName in glyphNames:
+                self.getGlyphID(glyphName)
+
+    def __len__(self):
+        return len(self.glyphNames)
+
+    def getGlyphID(self, glyphName):
+        glyphID = self._glyphIDs.get(glyphName)
+        if glyphID is None:
+            glyphID = len(self.glyphNames)
+            if glyphID > 0xFFFF:
+                raise FeaToolsError("Too many glyphs for glyph ID storage.")
+            self.glyphNames.append(glyphName)
+            self._glyphIDs[glyphName] = glyphID
+        return glyphID
+
+    def getGlyphIDs(self, glyphNames):
+        return [self.getGlyphID(glyphName) for glyphName in glyphNames]
+
+    def findGlyphIDs(self, glyphNames):
+        # names that are not in the order are skipped
+        glyphIDs = self._glyphIDs
+        return set([glyphIDs[glyphName] for glyphName in glyphNames if glyphName in glyphIDs])
+
+    def getGlyphNames(self, glyphIDs):
+        glyphNames = self.glyphNames
+        return [glyphNames[glyphID] for glyphID in glyphIDs]
+
+
+class GlyphIndex(object):
+
+    """
+    An index of the places that contain each glyph name.
+    The entries are (owner, lookup). owner is a subtable
+    in lookup. For class definitions, owner is (classes,
+    class name) and lookup is None.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def addGroup(self, group, entry):
+        for member in resolveGlyphNames(group):
+            if isinstance(member, ClassReference):
+                continue
+            if member not in self._entries:
+                self._entries[member] = []
+            self._entries[member].append(entry)
+
+    def addClasses(self, classes):
+        for name, group in classes.items():
+            self.addGroup(group, ((classes, name), None))
+
+    def addLookup(self, lookup):
+        for subtable in lookup.subtables:
+            entry = (subtable, lookup)
+            for sequence in subtable._sequences():
+                for group in sequence:
+                    self.addGroup(group, entry)
+
+    def removeGlyphs(self, glyphNames):
+        """
+        Remove the glyphs from the index and
+        return the entries that contained them.
+        """
+        found = OrderedDict()
+        for glyphName in glyphNames:
+            for entry in self._entries.pop(glyphName, ()):
+                found[id(entry)] = entry
+        return list(found.values())
+
+    def renameGlyphs(self, glyphMapping):
+        """
+        Move the entries to the new names and return
+        the entries that contain the old names.
+        """
+        found = OrderedDict()
+        moved = []
+        for oldName, newName in glyphMapping.items():
+            entries = self._entries.pop(oldName, None)
+            if entries:
+                moved.append((newName, entries))
+                for entry in entries:
+                    found[id(entry)] = entry
+        for newName, entries in moved:
+            if newName not in self._entries:
+                self._entries[newName] = []
+            self._entries[newName].extend(entries)
+        return list(found.values())
+
+
+class ValuePool(object):
+
+    """
+    The classes and sequences of a table. Equal values
+    are interned to a single shared object.
+    """
+
+    def __init__(self):
+        self._classes = {}
+        self._sequences = {}
+        # the sequences with class references by their names
+        self._namedSequences = {}
+
+    def internClass(self, members):
+        if not isinstance(members, (tuple, GlyphIDClass)):
+            members = tuple(members)
+        group = self._classes.get(members)
+        if group is None:
+            group = members
+            if not isinstance(group, (Class, GlyphIDClass)):
+                group = Class(group)
+            self._classes[group] = group
+        return group
+
+    def internSequence(self, groups):
+        groups = tuple([self.internClass(group) for group in groups])
+        sequence = self._sequences.get(groups)
+        if sequence is None:
+            sequence = Sequence(groups)
+            self._sequences[sequence] = sequence
+        return sequence
+
+    def internNamedSequence(self, groups):
+        """
+        Intern a sequence given as lists of glyph names
+        and class names, like in the writer API.
+        """
+        key = tuple([tuple(members) for members in groups])
+        # names without class references are equal to the sequence
+        sequence = self._sequences.get(key)
+        if sequence is not None:
+            return sequence
+        sequence = self._namedSequences.get(key)
+        if sequence is not None:
+            return sequence
+        classes = self._classes
+        interned = []
+        hasReferences = False
+        for members in key:
+            if "@" in "".join(members):
+                members = tuple(makeClassReferences(members))
+                hasReferences = True
+            group = classes.get(members)
+            if group is None:
+                group = Class(members)
+                classes[group] = group
+            interned.append(group)
+        sequence = Sequence(interned)
+        sequence = self._sequences.setdefault(sequence, sequence)
+        if hasReferences:
+            self._namedSequences[key] = sequence
+        return sequence
 
 
 class ClassReference(object):
 
+    __slots__ = ("name",)
+
     def __init__(self):
         self.name = None
 
@@ -1122,9 +2065,198 @@ class ClassReference(object):
 # Utilities
 # ---------
 
+def iterUniqueLookups(languages):
+    """
+    Iterate over the lookups in the languages.
+    A lookup shared by more than one language
+    is only given the first time it is found.
+    """
+    sharedLookups = set()
+    for language in languages:
+        for lookup in language.lookups:
+            if isinstance(lookup, LookupReference):
+                continue
+            if lookup._shared:
+                if id(lookup) in sharedLookups:
+                    continue
+                sharedLookups.add(id(lookup))
+            yield lookup
+
+def makeClassReferences(members):
+    """
+    Replace the class names in members with ClassReference
+    objects. members is returned if it has no class names.
+    """
+    if "@" not in "".join(members):
+        return members
+    newMembers = []
+    for member in members:
+        if member.startswith("@"):
+            reference = ClassReference()
+            reference.name = member
+            member = reference
+        newMembers.append(member)
+    return newMembers
+
+def editValue(value, methodName, argument, memo):
+    """
+    Call the method of a class or sequence that returns
+    an edited copy of it. The values are shared, so the
+    result for each value is kept in memo.
+    """
+    method = getattr(value, methodName)
+    if memo is None:
+        return method(argument)
+    key = id(value)
+    if key not in memo:
+        # the groups in a sequence use the same memo
+        if isinstance(value, Sequence):
+            result = method(argument, memo)
+        else:
+            result = method(argument)
+        # the value is kept so that the id stays unique
+        memo[key] = (value, result)
+    return memo[key][1]
+
+def makeGlyphIDClass(group, glyphOrder):
+    """
+    Convert a group of glyph names to a GlyphIDClass. Groups
+    that reference other classes are left as they are.
+    """
+    if isinstance(group, GlyphIDClass):
+        return group
+    for member in group:
+        if isinstance(member, ClassReference) or member.startswith("@"):
+            return group
+    return GlyphIDClass(glyphOrder.getGlyphIDs(group), glyphOrder)
+
+def sequenceDigestData(sequence):
+    # control characters can't occur in glyph names
+    # so they are used to mark the end of each part
+    data = []
+    for group in sequence:
+        if isinstance(group, GlyphIDClass):
+            data.append("\x01" + " ".join([str(member) for member in group]))
+        else:
+            for member in group:
+                if isinstance(member, ClassReference):
+                    member = "\x02" + member.name
+                data.append(member + "\x00")
+        data.append("\x03")
+    return "".join(data)
+
+def expandGroup(group, classes):
+    """
+    Get the glyph names in a group. Class references
+    are replaced with the members of the class.
+    """
+    glyphNames = []
+    for member in resolveGlyphNames(group):
+        if isinstance(member, ClassReference):
+            member = member.name
+        if member.startswith("@"):
+            glyphNames.extend(expandGroup(classes.get(member, []), classes))
+        else:
+            glyphNames.append(member)
+    return glyphNames
+
+def flattenSequence(sequence, classes):
+    newSequence = []
+    for group in sequence:
+        for member in group:
+            if isinstance(member, ClassReference) or (not isinstance(group, GlyphIDClass) and member.startswith("@")):
+                group = Class(expandGroup(group, classes))
+                break
+        newSequence.append(group)
+    if isinstance(sequence, Sequence):
+        return sequence._replaceGroups(newSequence)
+    return Sequence(newSequence)
+
+def groupIntersects(group, glyphNames, classes):
+    for glyphName in expandGroup(group, classes):
+        if glyphName in glyphNames:
+            return True
+    return False
+
+def isPositional(targetSequence, substitutionSequence):
+    # sub [a b] by [c d] and contextual versions of it
+    if len(targetSequence) != len(substitutionSequence):
+        return False
+    for targetGroup, substitutionGroup in zip(targetSequence, substitutionSequence):
+        if len(targetGroup) != len(substitutionGroup):
+            return False
+    return True
+
+def subsetGroup(group, keepGlyphs):
+    glyphNames = resolveGlyphNames(group)
+    return selectMembers(group, [glyphName in keepGlyphs for glyphName in glyphNames])
+
+def subsetPositionalSequences(targetSequence, substitutionSequence, keepGlyphs):
+    newTargetSequence = []
+    newSubstitutionSequence = []
+    for targetGroup, substitutionGroup in zip(targetSequence, substitutionSequence):
+        targetNames = resolveGlyphNames(targetGroup)
+        substitutionNames = resolveGlyphNames(substitutionGroup)
+        keep = [t in keepGlyphs and s in keepGlyphs for t, s in zip(targetNames, substitutionNames)]
+        newTargetSequence.append(selectMembers(targetGroup, keep))
+        newSubstitutionSequence.append(selectMembers(substitutionGroup, keep))
+    return Sequence(newTargetSequence), Sequence(newSubstitutionSequence)
+
+def selectMembers(group, keep):
+    members = [member for member, flag in zip(group, keep) if flag]
+    if isinstance(group, GlyphIDClass):
+        return GlyphIDClass(members, group.glyphOrder)
+    return Class(members)
+
+def resolveGlyphNames(group):
+    if isinstance(group, GlyphIDClass):
+        return group.glyphNames()
+    return group
+
 def nameClass(features, members):
     name = "@" + "_".join(features)
     return name
 
 def nameLookup(features):
     return "_".join(features)
+
+def findClassNames(group):
+    if isinstance(group, GlyphIDClass):
+        return []
+    names = []
+    for member in group:
+        if isinstance(member, ClassReference):
+            names.append(member.name)
+        elif member.startswith("@"):
+            names.append(member)
+    return names
+
+def findUsedClasses(classNames, classes):
+    """
+    Add the names of the classes that are
+    referenced by the named classes.
+    """
+    usedClasses = set()
+    classNames = list(classNames)
+    while classNames:
+        name = classNames.pop()
+        if name in usedClasses:
+            continue
+        usedClasses.add(name)
+        classNames.extend(findClassNames(classes.get(name, [])))
+    return usedClasses
+
+def selectClasses(classes, classNames):
+    return Classes([(name, group) for name, group in classes.items() if name in classNames])
+
+def copyLookups(lookups, copiedLookups):
+    # lookups that are used by more than
+    # one language are only copied once
+    newLookups = []
+    for lookup in lookups:
+        if not isinstance(lookup, LookupReference):
+            if id(lookup) not in copiedLookups:
+                copiedLookups[id(lookup)] = lookup._copy()
+            lookup = copiedLookups[id(lookup)]
+        newLookups.append(lookup)
+    return newLookups
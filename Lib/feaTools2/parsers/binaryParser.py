@@ -1,32 +1,85 @@
-def parseTable(writer, table, tableTag, excludeFeatures=None):
-    if excludeFeatures is None:
-        excludeFeatures = []
+import hashlib
+
+
+def parseTable(writer, table, tableTag, excludeFeatures=None, includeFeatures=None, excludeScripts=None, includeScripts=None, excludeLanguages=None, includeLanguages=None):
+    featureOrder, features = readFeatureRecords(table,
+        excludeFeatures=excludeFeatures, includeFeatures=includeFeatures,
+        excludeScripts=excludeScripts, includeScripts=includeScripts,
+        excludeLanguages=excludeLanguages, includeLanguages=includeLanguages
+    )
+    # do the official packing
+    # each lookup is decoded only once. the decoded
+    # lookup is keyed by its index in the lookup list.
+    # lookups referenced by contextual subtables are
+    # cached separately since they are never written.
+    lookupCache = {}
+    nestedLookupCache = {}
+    for featureTag in featureOrder:
+        records = features[featureTag]
+        feature = writer.addFeature(featureTag)
+        parseFeature(feature, table, tableTag, records, lookupCache, nestedLookupCache)
+
+def iterFeatures(table, tableTag, excludeFeatures=None, includeFeatures=None, excludeScripts=None, includeScripts=None, excludeLanguages=None, includeLanguages=None):
+    """
+    Yield a Feature object for each feature in the table
+    as soon as the lookups in the feature have been decoded.
+    Decoded lookups are not shared between features, so each
+    feature can be manipulated and discarded independently.
+    """
+    from feaTools2.objects import Feature
+    featureOrder, features = readFeatureRecords(table,
+        excludeFeatures=excludeFeatures, includeFeatures=includeFeatures,
+        excludeScripts=excludeScripts, includeScripts=includeScripts,
+        excludeLanguages=excludeLanguages, includeLanguages=includeLanguages
+    )
+    nestedLookupCache = {}
+    for featureTag in featureOrder:
+        records = features.pop(featureTag)
+        feature = Feature()
+        feature.tag = featureTag
+        parseFeature(feature, table, tableTag, records, {}, nestedLookupCache)
+        yield feature
+
+def readFeatureRecords(table, excludeFeatures=None, includeFeatures=None, excludeScripts=None, includeScripts=None, excludeLanguages=None, includeLanguages=None):
+    """
+    Gather the (scriptTag, languageTag, lookupIndexes) records
+    for each feature. Returns the feature tags in the order
+    that they should be written and a dict of the records
+    keyed by feature tag.
+
+    The include and exclude filters are applied here, before
+    any lookup is touched. Scripts are matched with tags like
+    "DFLT" and "latn". Languages are matched with tags like
+    "dflt" and "TRK".
+    """
+    excludeFeatures = makeTagSet(excludeFeatures)
+    includeFeatures = makeTagSet(includeFeatures)
+    excludeScripts = makeTagSet(excludeScripts)
+    includeScripts = makeTagSet(includeScripts)
+    excludeLanguages = makeTagSet(excludeLanguages)
+    includeLanguages = makeTagSet(includeLanguages)
     # first pass through the features
     features = {}
     for scriptRecord in table.ScriptList.ScriptRecord:
         scriptTag = scriptRecord.ScriptTag
+        if isFiltered(scriptTag, includeScripts, excludeScripts):
+            continue
         if scriptTag == "DFLT":
             scriptTag = None
-        # default
-        languageTag = None
-        featureIndexes = scriptRecord.Script.DefaultLangSys.FeatureIndex
-        for index in featureIndexes:
-            featureRecord = table.FeatureList.FeatureRecord[index]
-            featureTag = featureRecord.FeatureTag
-            if featureTag in excludeFeatures:
-                continue
-            lookupIndexes = featureRecord.Feature.LookupListIndex
-            if featureTag not in features:
-                features[featureTag] = []
-            features[featureTag].append((scriptTag, languageTag, lookupIndexes))
-        # language specific
+        # default followed by language specific
+        languageRecords = [(None, scriptRecord.Script.DefaultLangSys)]
         for languageRecord in scriptRecord.Script.LangSysRecord:
-            languageTag = languageRecord.LangSysTag
-            featureIndexes = languageRecord.LangSys.FeatureIndex
-            for index in featureIndexes:
+            languageRecords.append((languageRecord.LangSysTag, languageRecord.LangSys))
+        for languageTag, languageSystem in languageRecords:
+            # scripts don't have to have a default language
+            if languageSystem is None:
+                continue
+            if isFiltered(languageTag or "dflt", includeLanguages, excludeLanguages):
+                continue
+            for index in languageSystem.FeatureIndex:
                 featureRecord = table.FeatureList.FeatureRecord[index]
                 featureTag = featureRecord.FeatureTag
-                if featureTag in excludeFeatures:
+                if isFiltered(featureTag, includeFeatures, excludeFeatures):
                     continue
                 lookupIndexes = featureRecord.Feature.LookupListIndex
                 if featureTag not in features:
@@ -42,39 +95,97 @@ def parseTable(writer, table, tableTag, excludeFeatures=None):
         sorter.append((indexes, featureTag))
     featureOrder = [featureTag for (indexes, featureTag) in sorted(sorter)]
     # sort the script and language records
-    # grab the lookup records
+    # lookups with identical structures are pointed
+    # to the first index that has the structure
+    fingerprints = {}
+    canonicalIndexes = {}
     for featureTag, records in features.items():
         _records = []
         for (scriptTag, languageTag, lookupIndexes) in sorted(records):
             if scriptTag is None:
                 scriptTag = "DFLT"
-            lookupRecords = [table.LookupList.Lookup[index] for index in lookupIndexes]
-            _records.append((scriptTag, languageTag, lookupRecords))
+            _lookupIndexes = []
+            for index in lookupIndexes:
+                fingerprint = fingerprintLookup(table, index, fingerprints)
+                if fingerprint not in canonicalIndexes:
+                    canonicalIndexes[fingerprint] = index
+                _lookupIndexes.append(canonicalIndexes[fingerprint])
+            _records.append((scriptTag, languageTag, _lookupIndexes))
         features[featureTag] = _records
-    # do the official packing
-    for featureTag in featureOrder:
-        records = features[featureTag]
-        feature = writer.addFeature(featureTag)
-        parseFeature(feature, table, tableTag, records)
+    return featureOrder, features
 
-def parseFeature(writer, table, tableTag, records):
-    for (scriptTag, languageTag, lookupRecords) in records:
+def parseFeature(writer, table, tableTag, records, lookupCache, nestedLookupCache=None):
+    for (scriptTag, languageTag, lookupIndexes) in records:
         writer.addScript(scriptTag)
-        parseScript(writer, table, tableTag, languageTag, lookupRecords)
+        parseScript(writer, table, tableTag, languageTag, lookupIndexes, lookupCache, nestedLookupCache)
 
-def parseScript(writer, table, tableTag, languageTag, lookupRecords):
+def parseScript(writer, table, tableTag, languageTag, lookupIndexes, lookupCache, nestedLookupCache=None):
     language = writer.addLanguage(languageTag)
-    parseLanguage(writer, table, tableTag, lookupRecords)
+    parseLanguage(writer, table, tableTag, lookupIndexes, lookupCache, nestedLookupCache)
 
-def parseLanguage(writer, table, tableTag, lookupRecords):
-    for lookupRecord in lookupRecords:
+def parseLanguage(writer, table, tableTag, lookupIndexes, lookupCache, nestedLookupCache=None):
+    for index in lookupIndexes:
+        # share the already decoded lookup if the writer can handle it
+        if index in lookupCache and hasattr(writer, "addSharedLookup"):
+            writer.addSharedLookup(lookupCache[index])
+            continue
         lookup = writer.addLookup(None)
-        parseLookup(lookup, table, tableTag, lookupRecord)
+        parseLookup(lookup, table, tableTag, table.LookupList.Lookup[index], nestedLookupCache)
+        lookupCache[index] = lookup
 
-def parseLookup(writer, table, tableTag, lookupRecord):
+def parseLookup(writer, table, tableTag, lookupRecord, nestedLookupCache=None):
     parseLookupFlag(writer, lookupRecord.LookupFlag)
     for subtableRecord in lookupRecord.SubTable:
-        parseSubtable(writer, table, tableTag, lookupRecord.LookupType, subtableRecord)
+        parseSubtable(writer, table, tableTag, lookupRecord.LookupType, subtableRecord, nestedLookupCache)
+
+def fingerprintLookup(table, index, fingerprints):
+    """
+    Create a digest of the structure of the lookup at index.
+    Lookups with the same digest decode to equal objects, so
+    only one of them needs to be decoded. fingerprints is a
+    dict of already created digests keyed by lookup index.
+    """
+    if index in fingerprints:
+        return fingerprints[index]
+    # a lookup with an unknown structure is only equal to itself.
+    # store this now to guard against recursive references.
+    fingerprints[index] = "Lookup %d" % index
+    lookupRecord = table.LookupList.Lookup[index]
+    structure = [lookupRecord.LookupType, lookupRecord.LookupFlag]
+    for subtableRecord in lookupRecord.SubTable:
+        subtableStructure = fingerprintSubtable(table, lookupRecord.LookupType, subtableRecord, fingerprints)
+        if subtableStructure is None:
+            return fingerprints[index]
+        structure.append(subtableStructure)
+    fingerprint = hashlib.sha1(repr(structure).encode("utf-8")).hexdigest()
+    fingerprints[index] = fingerprint
+    return fingerprint
+
+def fingerprintSubtable(table, type, subtable, fingerprints):
+    if type == 1:
+        return sorted(subtable.mapping.items())
+    elif type == 2:
+        return sorted([(t, list(s)) for t, s in subtable.mapping.items()])
+    elif type == 3:
+        return sorted([(t, list(s)) for t, s in subtable.alternates.items()])
+    elif type == 4:
+        ligatures = []
+        for firstGlyph, parts in sorted(subtable.ligatures.items()):
+            parts = [(list(part.Component), part.LigGlyph) for part in parts]
+            ligatures.append((firstGlyph, parts))
+        return ligatures
+    elif type == 6 and subtable.Format == 3:
+        substLookups = []
+        for substLookup in subtable.SubstLookupRecord:
+            fingerprint = fingerprintLookup(table, substLookup.LookupListIndex, fingerprints)
+            substLookups.append((substLookup.SequenceIndex, fingerprint))
+        return (
+            [readCoverage(i) for i in subtable.BacktrackCoverage],
+            [readCoverage(i) for i in subtable.InputCoverage],
+            [readCoverage(i) for i in subtable.LookAheadCoverage],
+            substLookups
+        )
+    return None
 
 def parseLookupFlag(writer, lookupFlag):
     kwargs = dict(
@@ -86,7 +197,7 @@ def parseLookupFlag(writer, lookupFlag):
     )
     writer.addLookupFlag(**kwargs)
 
-def parseSubtable(writer, table, tableTag, type, subtableRecord):
+def parseSubtable(writer, table, tableTag, type, subtableRecord, nestedLookupCache=None):
     if tableTag == "GSUB":
         if type == 1:
             parseGSUBLookupType1(writer, subtableRecord)
@@ -99,7 +210,7 @@ def parseSubtable(writer, table, tableTag, type, subtableRecord):
         elif type == 5:
             parseGSUBLookupType5(writer, subtableRecord)
         elif type == 6:
-            parseGSUBLookupType6(writer, table, tableTag, subtableRecord)
+            parseGSUBLookupType6(writer, table, tableTag, subtableRecord, nestedLookupCache)
         elif type == 7:
             parseGSUBLookupType7(writer, subtableRecord)
         else:
@@ -158,8 +269,9 @@ def parseGSUBLookupType4(writer, subtable):
             substitution.append(s)
     writer.addGSUBSubtable(target=target, substitution=substitution, type=4)
 
-def parseGSUBLookupType6(writer, table, tableTag, subtable):
-    from feaTools2.objects import Table
+def parseGSUBLookupType6(writer, table, tableTag, subtable, nestedLookupCache=None):
+    if nestedLookupCache is None:
+        nestedLookupCache = {}
     assert subtable.Format == 3, "Stop being lazy."
     backtrack = [readCoverage(i) for i in reversed(subtable.BacktrackCoverage)]
     lookahead = [readCoverage(i) for i in subtable.LookAheadCoverage]
@@ -173,18 +285,10 @@ def parseGSUBLookupType6(writer, table, tableTag, subtable):
         target = []
         substitution = []
         assert len(subtable.SubstLookupRecord) == 1, "Does this ever happen?"
+        inputCoverage = set(input[0])
         for substLookup in subtable.SubstLookupRecord:
             index = substLookup.LookupListIndex
-            lookupRecord = table.LookupList.Lookup[index]
-            # make a dummy table
-            dummyTable = Table()
-            dummyTable.tag = tableTag
-            # add a dummpy lookup
-            dummyLookup = dummyTable.addLookup("DummyLookup")
-            # write the data into the objects
-            parseLookup(dummyLookup, table, tableTag, lookupRecord)
-            # extract the lookup
-            lookup = dummyLookup
+            lookup = readNestedLookup(table, tableTag, index, nestedLookupCache)
             # XXX potential problem here:
             # theoretically this nested lookup could have a flag that is
             # different than the flag of the lookup that contains this
@@ -202,7 +306,7 @@ def parseGSUBLookupType6(writer, table, tableTag, subtable):
                         newTargetClass = []
                         newSubstitutionClass = []
                         for memberIndex, t in enumerate(targetClass):
-                            if t in input[0]:
+                            if t in inputCoverage:
                                 newTargetClass.append(t)
                                 s = substitutionSequence[classIndex][memberIndex]
                                 newSubstitutionClass.append(s)
@@ -210,7 +314,7 @@ def parseGSUBLookupType6(writer, table, tableTag, subtable):
                             newTargetSequence.append(newTargetClass)
                             newSubstitutionSequence.append(newSubstitutionClass)
                 elif loadedSubtable.type == 4:
-                    if targetSequence != input:
+                    if [list(group) for group in targetSequence] != input:
                         continue
                     newTargetSequence = targetSequence
                     newSubstitutionSequence = substitutionSequence
@@ -220,6 +324,30 @@ def parseGSUBLookupType6(writer, table, tableTag, subtable):
                 substitution.append(newSubstitutionSequence)
     writer.addGSUBSubtable(target=target, substitution=substitution, type=6, backtrack=backtrack, lookahead=lookahead)
 
+def readNestedLookup(table, tableTag, index, nestedLookupCache):
+    from feaTools2.objects import Lookup
+    if index not in nestedLookupCache:
+        lookupRecord = table.LookupList.Lookup[index]
+        # write the data into the objects
+        lookup = Lookup()
+        lookup.name = "DummyLookup"
+        parseLookup(lookup, table, tableTag, lookupRecord, nestedLookupCache)
+        nestedLookupCache[index] = lookup
+    return nestedLookupCache[index]
+
+def makeTagSet(tags):
+    if tags is None:
+        return None
+    return set([tag.strip() for tag in tags])
+
+def isFiltered(tag, include, exclude):
+    tag = tag.strip()
+    if exclude is not None and tag in exclude:
+        return True
+    if include is not None and tag not in include:
+        return True
+    return False
+
 def readCoverage(coverage):
     if not isinstance(coverage, list):
         coverage = coverage.glyphs
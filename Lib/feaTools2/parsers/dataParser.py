@@ -0,0 +1,16 @@
+nestedIdentifiers = set(["addFeature", "addLookup"])
+
+
+def parseData(writer, data):
+    """
+    Play the data recorded by DataWriter back into writer.
+    """
+    for item in data:
+        identifier = item[0]
+        method = getattr(writer, identifier)
+        if identifier in nestedIdentifiers:
+            name, nestedData = item[1:]
+            nestedWriter = method(name)
+            parseData(nestedWriter, nestedData)
+        else:
+            method(*item[1:])
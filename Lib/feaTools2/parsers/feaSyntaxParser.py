@@ -0,0 +1,735 @@
+"""
+A parser for the GSUB subset of the .fea syntax.
+
+    table = Table()
+    table.tag = "GSUB"
+    parseFeaSyntax(table, text)
+
+The statements are played into any writer. languagesystem,
+class definitions, features, lookups, lookup references,
+lookupflag, script, language, subtable and GSUB lookup types
+1, 3, 4 and 6 are supported. table blocks are skipped.
+Everything else raises a FeaToolsError.
+
+The text is split into statements with one compiled regular
+expression. The statements are split into words with str.split
+and the groups are sliced out of the words, so only a few
+operations per statement are done in Python. The garbage
+collector is turned off while the text is parsed.
+
+This is not fast enough to build a Table from a multi-megabyte
+file well under a second. With Python 2.7, the 3.6 MB text of
+benchmarks/feaSyntaxParser.py takes about 0.6 seconds to parse
+and about 1 second to parse into a Table. Most of the difference
+is spent interning the sequences of the subtables.
+
+Consecutive rules of types 1, 3 and 4 are given to the writer
+in one addGSUBSubtable call and each contextual rule gets a call
+of its own, like the binary parser does. A subtable statement
+starts a new call. Rules outside of a lookup block are put in a
+lookup without a name. A new one is started when the lookup type
+or the lookup flag changes. Rules before the first script in a
+feature are in the default script and language. The language
+systems of the other scripts are added to the feature so that
+they include those rules.
+"""
+
+import gc
+import re
+from feaTools2 import FeaToolsError
+
+# strings are matched so that a # in a string is kept
+commentPattern = re.compile(r'"[^"]*"|#[^\n]*')
+# the text of a statement and the ; { or } that ends it
+statementPattern = re.compile(r'([^;{}"]*(?:"[^"]*"[^;{}"]*)*)([;{}])')
+includePattern = re.compile(r"\s*include\s*\(\s*([^)]*?)\s*\)\s*$")
+
+defaultLookupFlag = dict(
+    rightToLeft=False,
+    ignoreBaseGlyphs=False,
+    ignoreLigatures=False,
+    ignoreMarks=False,
+    markAttachmentType=False
+)
+
+lookupFlagNames = dict(
+    RightToLeft="rightToLeft",
+    IgnoreBaseGlyphs="ignoreBaseGlyphs",
+    IgnoreLigatures="ignoreLigatures",
+    IgnoreMarks="ignoreMarks"
+)
+
+substitutionKeywords = set(["sub", "substitute", "ignore"])
+# the words that end or start something in a glyph pattern
+patternWords = set(["[", "]", "'", ",", "by", "from", "lookup"])
+
+
+def parseFeaSyntax(writer, text):
+    """
+    Parse the .fea text into writer.
+    """
+    parser = FeaSyntaxParser(splitStatements(text))
+    # the writer keeps all of the objects that are made,
+    # so the garbage collector would only slow this down
+    collect = gc.isenabled()
+    gc.disable()
+    try:
+        parser.parse(writer)
+    finally:
+        if collect:
+            gc.enable()
+
+def splitStatements(text):
+    """
+    Split the text into a list of (text, terminator) tuples.
+    The terminator is ;, { or }. Comments are removed.
+    """
+    # comments are only removed if there can be any
+    if "#" in text:
+        text = commentPattern.sub(_removeComment, text)
+    statements = statementPattern.findall(text)
+    end = max(text.rfind(";"), text.rfind("{"), text.rfind("}"))
+    if text[end + 1:].strip():
+        raise FeaToolsError("Unterminated statement: %s" % text[end + 1:].strip())
+    return statements
+
+def _removeComment(match):
+    text = match.group(0)
+    if text[0] == "#":
+        return ""
+    return text
+
+def padTag(tag):
+    return tag.ljust(4)
+
+
+# ------
+# Parser
+# ------
+
+class FeaSyntaxParser(object):
+
+    def __init__(self, statements):
+        self._statements = statements
+        self._index = 0
+        self._languageSystems = []
+        # feature state
+        self._featureWriter = None
+        self._featureName = None
+        self._usesDefault = False
+        self._hasScript = False
+        self._language = None
+        self._lookupFlag = defaultLookupFlag
+        self._implicitLookup = None
+        # the implied languages of the scripts in the feature
+        self._impliedLanguages = {}
+        self._scriptLanguages = []
+        # the lookups in the default script and language.
+        # lookup names and lists of writer calls.
+        self._defaultLookups = []
+        self._recordDefaultLookups = False
+
+    def parse(self, writer):
+        statements = self._statements
+        while self._index < len(statements):
+            text, terminator = self._next()
+            words = text.split()
+            if not words:
+                if terminator != ";":
+                    self._raiseUnsupported(text, terminator)
+                continue
+            keyword = words[0]
+            if terminator == "{":
+                if keyword == "feature":
+                    self._parseFeature(writer, words)
+                elif keyword == "lookup":
+                    self._parseLookup(writer, words, defaultLookupFlag)
+                elif keyword == "table":
+                    self._skipTable(words)
+                else:
+                    self._raiseUnsupported(text, terminator)
+            elif terminator == "}":
+                self._raiseUnsupported(text, terminator)
+            elif keyword == "languagesystem":
+                self._parseLanguageSystem(writer, words)
+            elif keyword[0] == "@":
+                self._parseClassDefinition(writer, text)
+            elif keyword.startswith("include"):
+                self._parseInclude(writer, text)
+            else:
+                self._raiseUnsupported(text, terminator)
+
+    # statements
+
+    def _next(self):
+        if self._index >= len(self._statements):
+            raise FeaToolsError("Unexpected end of the feature text.")
+        statement = self._statements[self._index]
+        self._index += 1
+        return statement
+
+    def _expectEnd(self, name):
+        # } name;
+        text, terminator = self._next()
+        if text.strip() != name or terminator != ";":
+            raise FeaToolsError("Expected } %s; but found } %s%s" % (name, text.strip(), terminator))
+
+    def _raiseUnsupported(self, text, terminator):
+        raise FeaToolsError("Unsupported statement: %s%s" % (text.strip(), terminator))
+
+    # top level
+
+    def _parseLanguageSystem(self, writer, words):
+        if len(words) != 3:
+            raise FeaToolsError("Invalid languagesystem: %s" % " ".join(words))
+        script, language = words[1:]
+        if language == "dflt":
+            language = None
+        else:
+            language = padTag(language)
+        script = padTag(script)
+        self._languageSystems.append((script, language))
+        writer.addLanguageSystem(script, language)
+
+    def _parseClassDefinition(self, writer, text):
+        name, equals, members = text.partition("=")
+        name = name.strip()
+        members = members.strip()
+        if not equals or " " in name:
+            raise FeaToolsError("Invalid class definition: %s" % text.strip())
+        if members.startswith("[") and members.endswith("]"):
+            members = members[1:-1].split()
+        else:
+            members = members.split()
+            if len(members) != 1 or "[" in members[0] or "]" in members[0]:
+                raise FeaToolsError("Invalid class definition: %s" % text.strip())
+        writer.addClassDefinition(name, [stripEscape(member) for member in members])
+
+    def _parseInclude(self, writer, text):
+        match = includePattern.match(text)
+        if match is None:
+            raise FeaToolsError("Invalid include: %s" % text.strip())
+        writer.addFileReference(match.group(1))
+
+    def _skipTable(self, words):
+        # table blocks don't contain nested blocks
+        if len(words) != 2:
+            raise FeaToolsError("Invalid table: %s" % " ".join(words))
+        tag = words[1]
+        while True:
+            text, terminator = self._next()
+            if terminator == "}":
+                break
+            if terminator == "{":
+                self._raiseUnsupported(text, terminator)
+        self._expectEnd(tag)
+
+    # feature
+
+    def _parseFeature(self, writer, words):
+        if len(words) not in (2, 3) or (len(words) == 3 and words[2] != "useExtension"):
+            raise FeaToolsError("Invalid feature: %s" % " ".join(words))
+        name = words[1]
+        self._featureWriter = writer.addFeature(padTag(name))
+        self._featureName = name
+        self._usesDefault = False
+        self._hasScript = False
+        self._language = None
+        self._lookupFlag = defaultLookupFlag
+        self._implicitLookup = None
+        self._impliedLanguages = {}
+        self._scriptLanguages = []
+        self._defaultLookups = []
+        self._recordDefaultLookups = False
+        while True:
+            text, terminator = self._next()
+            if terminator == "}":
+                if text.strip():
+                    self._raiseUnsupported(text, terminator)
+                self._endImplicitLookup()
+                self._addImpliedLanguages(featureEnd=True)
+                self._endScript()
+                self._expectEnd(name)
+                break
+            words = text.split(None, 1)
+            if not words:
+                if terminator != ";":
+                    self._raiseUnsupported(text, terminator)
+                continue
+            keyword = words[0]
+            if terminator == "{":
+                if keyword != "lookup":
+                    self._raiseUnsupported(text, terminator)
+                self._endImplicitLookup()
+                self._needLanguage()
+                words = text.split()
+                self._parseLookup(self._featureWriter, words, self._lookupFlag)
+                self._recordDefaultLookup(words[1])
+            elif keyword in substitutionKeywords:
+                self._parseFeatureSubstitution(text)
+            elif keyword == "lookup":
+                words = text.split()
+                if len(words) != 2:
+                    raise FeaToolsError("Invalid lookup reference: %s" % text.strip())
+                self._endImplicitLookup()
+                self._needLanguage()
+                self._featureWriter.addLookupReference(words[1])
+                self._recordDefaultLookup(words[1])
+            elif keyword == "script":
+                self._parseScript(text)
+            elif keyword == "language":
+                self._parseLanguage(text)
+            elif keyword == "lookupflag":
+                self._endImplicitLookup()
+                self._lookupFlag = parseLookupFlag(text)
+            elif keyword[0] == "@":
+                self._parseClassDefinition(self._featureWriter, text)
+            elif keyword == "feature":
+                words = text.split()
+                if len(words) != 2:
+                    raise FeaToolsError("Invalid feature reference: %s" % text.strip())
+                self._endImplicitLookup()
+                self._featureWriter.addFeatureReference(padTag(words[1]))
+            elif keyword == "subtable":
+                if self._implicitLookup is not None:
+                    self._implicitLookup.breakSubtable()
+            else:
+                self._raiseUnsupported(text, terminator)
+        self._featureWriter = None
+        self._featureName = None
+
+    def _needLanguage(self):
+        # rules before any script statement
+        # are in the default script and language
+        if not self._hasScript:
+            self._featureWriter.addScript("DFLT")
+            self._featureWriter.addLanguage(None)
+            self._hasScript = True
+            self._usesDefault = True
+            self._recordDefaultLookups = True
+
+    def _recordDefaultLookup(self, lookup):
+        # the lookups are given to the implied languages
+        # that can't include the default lookups
+        if self._recordDefaultLookups:
+            self._defaultLookups.append(lookup)
+
+    def _addImpliedLanguages(self, featureEnd=False):
+        # the rules in the default script and language are
+        # used by all language systems. the languages of the
+        # scripts that are not in the feature are added so
+        # that they include the default lookups. the other
+        # languages of the scripts in the feature are added
+        # at the end of the script.
+        if not self._usesDefault:
+            return
+        self._usesDefault = False
+        scripts = set()
+        if not featureEnd:
+            scripts = self._findFeatureScripts()
+        languageSystems = sorted(set(self._languageSystems), key=lambda languageSystem: (languageSystem[0], languageSystem[1] or ""))
+        currentScript = None
+        for script, language in languageSystems:
+            if script == "DFLT":
+                continue
+            if script in scripts:
+                if language is not None:
+                    self._impliedLanguages.setdefault(script, []).append(language)
+                continue
+            if script != currentScript:
+                self._featureWriter.addScript(script)
+                currentScript = script
+            self._featureWriter.addLanguage(language)
+
+    def _findFeatureScripts(self):
+        # the tags of the script statements between the
+        # current statement and the end of the feature.
+        # the current statement is included.
+        statements = self._statements
+        scripts = set()
+        index = self._index - 1
+        while index < len(statements):
+            text, terminator = statements[index]
+            index += 1
+            if terminator == "}":
+                if index < len(statements) and statements[index][0].strip() == self._featureName:
+                    break
+            elif terminator == ";":
+                words = text.split()
+                if len(words) == 2 and words[0] == "script":
+                    scripts.add(padTag(words[1]))
+        return scripts
+
+    def _endScript(self):
+        # the implied languages that the script didn't name
+        # only have the lookups of the default script and
+        # language, not the lookups of the default language
+        # of this script, so they are given to them again.
+        featureWriter = self._featureWriter
+        for language in self._scriptLanguages:
+            featureWriter.addLanguage(language, includeDefault=False)
+            for lookup in self._defaultLookups:
+                if isinstance(lookup, list):
+                    lookupWriter = featureWriter.addLookup(None)
+                    for methodName, kwargs in lookup:
+                        getattr(lookupWriter, methodName)(**kwargs)
+                else:
+                    featureWriter.addLookupReference(lookup)
+        self._scriptLanguages = []
+
+    def _parseScript(self, text):
+        self._endImplicitLookup()
+        self._addImpliedLanguages()
+        self._endScript()
+        self._recordDefaultLookups = False
+        words = text.split()
+        if len(words) != 2:
+            raise FeaToolsError("Invalid script: %s" % text.strip())
+        script = padTag(words[1])
+        self._scriptLanguages = self._impliedLanguages.pop(script, [])
+        # a script starts with its default language
+        self._featureWriter.addScript(script)
+        self._featureWriter.addLanguage(None)
+        self._hasScript = True
+        self._language = None
+        self._lookupFlag = defaultLookupFlag
+
+    def _parseLanguage(self, text):
+        # a language without a script is in the default script
+        self._endImplicitLookup()
+        self._recordDefaultLookups = False
+        words = text.split()
+        if len(words) < 2:
+            raise FeaToolsError("Invalid language: %s" % text.strip())
+        includeDefault = True
+        for word in words[2:]:
+            if word in ("exclude_dflt", "excludeDFLT"):
+                includeDefault = False
+            elif word in ("include_dflt", "includeDFLT"):
+                includeDefault = True
+            elif word != "required":
+                raise FeaToolsError("Invalid language: %s" % text.strip())
+        language = words[1]
+        if language == "dflt":
+            language = None
+        else:
+            language = padTag(language)
+        if not self._hasScript:
+            self._featureWriter.addScript("DFLT")
+            self._hasScript = True
+        # the script statement already added the default language
+        elif language is None and self._language is None:
+            return
+        if language in self._scriptLanguages:
+            self._scriptLanguages.remove(language)
+        self._featureWriter.addLanguage(language, includeDefault=includeDefault)
+        self._language = language
+
+    def _parseFeatureSubstitution(self, text):
+        for rule in parseSubstitution(text):
+            type = rule[0]
+            lookup = self._implicitLookup
+            if lookup is not None and lookup.type != type:
+                self._endImplicitLookup()
+                lookup = None
+            if lookup is None:
+                self._needLanguage()
+                record = None
+                if self._recordDefaultLookups:
+                    record = []
+                    self._recordDefaultLookup(record)
+                lookup = LookupState(self._featureWriter.addLookup(None), self._lookupFlag, record)
+                self._implicitLookup = lookup
+            lookup.addRule(*rule)
+
+    def _endImplicitLookup(self):
+        if self._implicitLookup is not None:
+            self._implicitLookup.finish()
+            self._implicitLookup = None
+
+    # lookup
+
+    def _parseLookup(self, writer, words, lookupFlag):
+        if len(words) not in (2, 3) or (len(words) == 3 and words[2] != "useExtension"):
+            raise FeaToolsError("Invalid lookup: %s" % " ".join(words))
+        name = words[1]
+        lookup = LookupState(writer.addLookup(name), lookupFlag)
+        # lookups can have thousands of rules, so
+        # the statements are read without _next
+        statements = self._statements
+        count = len(statements)
+        index = self._index
+        while True:
+            if index >= count:
+                raise FeaToolsError("Unexpected end of the feature text.")
+            text, terminator = statements[index]
+            index += 1
+            if terminator == "}":
+                if text.strip():
+                    self._raiseUnsupported(text, terminator)
+                lookup.finish()
+                self._index = index
+                self._expectEnd(name)
+                break
+            words = text.split(None, 1)
+            if not words:
+                if terminator != ";":
+                    self._raiseUnsupported(text, terminator)
+                continue
+            keyword = words[0]
+            if terminator == "{":
+                self._raiseUnsupported(text, terminator)
+            elif keyword in substitutionKeywords:
+                for rule in parseSubstitution(text):
+                    if lookup.type is not None and lookup.type != rule[0]:
+                        raise FeaToolsError("Lookup %s contains more than one lookup type." % name)
+                    lookup.addRule(*rule)
+            elif keyword == "lookupflag":
+                if lookup.type is not None:
+                    raise FeaToolsError("The lookupflag in lookup %s follows a rule." % name)
+                lookup.flag = parseLookupFlag(text)
+            elif keyword == "subtable":
+                lookup.breakSubtable()
+            else:
+                self._raiseUnsupported(text, terminator)
+
+
+class LookupState(object):
+
+    """
+    Collect the rules of a lookup. Consecutive rules of
+    types 1, 3 and 4 are given to the writer in one
+    subtable. Each contextual rule is a subtable of its
+    own, like in the binary. If record is a list, the
+    writer calls are also added to it.
+    """
+
+    def __init__(self, writer, flag, record=None):
+        self.writer = writer
+        self.flag = flag
+        self.record = record
+        self.type = None
+        self._flagWritten = False
+        # [type, target, substitution, backtrack, lookahead]
+        self._subtable = None
+        # the last single substitution only has glyph names
+        self._canMerge = False
+
+    def _writeFlag(self):
+        if not self._flagWritten:
+            self.writer.addLookupFlag(**self.flag)
+            self._flagWritten = True
+            if self.record is not None:
+                self.record.append(("addLookupFlag", self.flag))
+
+    def addRule(self, type, backtrack, target, substitution, lookahead):
+        if not self._flagWritten:
+            self._writeFlag()
+        self.type = type
+        subtable = self._subtable
+        canMerge = type == 1 and isGlyphSubstitution(target, substitution)
+        if subtable is None or subtable[0] != type or type == 6:
+            self.breakSubtable()
+            subtable = self._subtable = [type, [], [], backtrack, lookahead]
+        # sub a by b; sub c by d; is stored as sub [a c] by [b d];
+        elif canMerge and self._canMerge:
+            targetClass = subtable[1][-1][0]
+            substitutionClass = subtable[2][-1][0]
+            if len(substitutionClass) != len(targetClass):
+                substitutionClass *= len(targetClass)
+            targetClass.extend(target[0])
+            if len(substitution[0]) != len(target[0]):
+                substitutionClass.extend(substitution[0] * len(target[0]))
+            else:
+                substitutionClass.extend(substitution[0])
+            return
+        self._canMerge = canMerge
+        subtable[1].append(target)
+        if substitution is not None:
+            subtable[2].append(substitution)
+
+    def breakSubtable(self):
+        subtable = self._subtable
+        if subtable is not None:
+            type, target, substitution, backtrack, lookahead = subtable
+            self.writer.addGSUBSubtable(target, substitution, type, backtrack=backtrack, lookahead=lookahead)
+            if self.record is not None:
+                self.record.append(("addGSUBSubtable", dict(target=target, substitution=substitution, type=type, backtrack=backtrack, lookahead=lookahead)))
+            self._subtable = None
+            self._canMerge = False
+
+    def finish(self):
+        self._writeFlag()
+        self.breakSubtable()
+
+
+# -----
+# Rules
+# -----
+
+def parseLookupFlag(text):
+    flag = dict(defaultLookupFlag)
+    words = text.replace(",", " ").split()
+    index = 1
+    while index < len(words):
+        word = words[index]
+        index += 1
+        if word in lookupFlagNames:
+            flag[lookupFlagNames[word]] = True
+        elif word == "MarkAttachmentType" and index < len(words):
+            flag["markAttachmentType"] = words[index]
+            index += 1
+        elif word.isdigit():
+            value = int(word)
+            flag["rightToLeft"] = bool(value & 0x0001)
+            flag["ignoreBaseGlyphs"] = bool(value & 0x0002)
+            flag["ignoreLigatures"] = bool(value & 0x0004)
+            flag["ignoreMarks"] = bool(value & 0x0008)
+            flag["markAttachmentType"] = (value >> 8) or False
+        else:
+            raise FeaToolsError("Unsupported lookupflag: %s" % text.strip())
+    return flag
+
+def parseSubstitution(text):
+    """
+    Parse the text of a substitution statement. A list of
+    (type, backtrack, target, substitution, lookahead) rules
+    is returned. substitution is None for ignore rules.
+    """
+    # sub a by b; and sub f i by f_i; don't need to be
+    # read one word at a time
+    if "[" not in text and "'" not in text and "," not in text and "\\" not in text:
+        words = text.split()
+        if len(words) > 3 and words[-2] == "by" and words[0] != "ignore" and words[-1] != "NULL":
+            if words.count("by") == 1 and "from" not in words and "lookup" not in words:
+                target = [[word] for word in words[1:-2]]
+                if len(target) == 1:
+                    return [(1, [], target, [[words[-1]]], [])]
+                return [(4, [], target, [[words[-1]]], [])]
+    # sub a from [a.alt1 a.alt2]; is also common
+    elif "'" not in text and "," not in text and "\\" not in text and " from " in text:
+        words = text.replace("[", " [ ").replace("]", " ] ").split()
+        if len(words) > 5 and words[0] in ("sub", "substitute") and words[2] == "from" and words[3] == "[" and words[-1] == "]":
+            alternates = words[4:-1]
+            if words[1] not in patternWords and not patternWords.intersection(alternates) and alternates != ["NULL"]:
+                return [(3, [], [[words[1]]], [alternates], [])]
+    words = splitRule(text)
+    if words[0] == "ignore":
+        if len(words) < 3 or words[1] not in ("sub", "substitute"):
+            raise FeaToolsError("Unsupported statement: %s" % text.strip())
+        rules = []
+        index = 2
+        while index < len(words):
+            groups, marks, index = parseGlyphPattern(words, index, text)
+            if index < len(words):
+                if words[index] != ",":
+                    raise FeaToolsError("Invalid ignore statement: %s" % text.strip())
+                index += 1
+            backtrack, target, lookahead = splitContext(groups, marks, text)
+            rules.append((6, backtrack, target, None, lookahead))
+        return rules
+    groups, marks, index = parseGlyphPattern(words, 1, text)
+    if index >= len(words) or words[index] not in ("by", "from"):
+        raise FeaToolsError("Unsupported statement: %s" % text.strip())
+    operator = words[index]
+    replacement, replacementMarks, index = parseGlyphPattern(words, index + 1, text)
+    if index < len(words) or not groups or not replacement or True in replacementMarks:
+        raise FeaToolsError("Invalid substitution: %s" % text.strip())
+    if replacement == [["NULL"]]:
+        raise FeaToolsError("Glyph deletion is not supported: %s" % text.strip())
+    # sub a' b by c;
+    if True in marks:
+        if operator == "from":
+            raise FeaToolsError("Contextual alternate substitutions are not supported: %s" % text.strip())
+        backtrack, target, lookahead = splitContext(groups, marks, text)
+        return [(6, backtrack, target, replacement, lookahead)]
+    # sub a from [a.alt1 a.alt2];
+    if operator == "from":
+        if len(groups) != 1 or len(groups[0]) != 1 or len(replacement) != 1:
+            raise FeaToolsError("Invalid alternate substitution: %s" % text.strip())
+        return [(3, [], groups, replacement, [])]
+    if len(replacement) == 1:
+        # sub a by b;
+        if len(groups) == 1:
+            return [(1, [], groups, replacement, [])]
+        # sub f i by f_i;
+        return [(4, [], groups, replacement, [])]
+    raise FeaToolsError("Multiple substitutions are not supported: %s" % text.strip())
+
+def splitRule(text):
+    # brackets, marks and commas are separate words
+    if "[" in text:
+        text = text.replace("[", " [ ").replace("]", " ] ")
+    if "'" in text:
+        text = text.replace("'", " ' ")
+    if "," in text:
+        text = text.replace(",", " , ")
+    words = text.split()
+    if "\\" in text:
+        words = [stripEscape(word) for word in words]
+    return words
+
+def parseGlyphPattern(words, index, text):
+    """
+    Read glyphs, classes and groups from the words until
+    by, from or a comma. A list of groups, a list of marked
+    flags and the index of the next word are returned.
+    """
+    groups = []
+    marks = []
+    count = len(words)
+    while index < count:
+        word = words[index]
+        # most words are glyph or class names
+        if word not in patternWords:
+            members = [word]
+            index += 1
+        elif word == "[":
+            try:
+                end = words.index("]", index)
+            except ValueError:
+                raise FeaToolsError("Unterminated group: %s" % text.strip())
+            members = words[index + 1:end]
+            if not members or "[" in members or "'" in members or "," in members:
+                raise FeaToolsError("Invalid group: %s" % text.strip())
+            index = end + 1
+        elif word == "by" or word == "from" or word == ",":
+            break
+        else:
+            raise FeaToolsError("Unsupported rule: %s" % text.strip())
+        groups.append(members)
+        if index < count and words[index] == "'":
+            marks.append(True)
+            index += 1
+        else:
+            marks.append(False)
+    return groups, marks, index
+
+def splitContext(groups, marks, text):
+    if True not in marks:
+        raise FeaToolsError("Contextual rules need marked glyphs: %s" % text.strip())
+    start = marks.index(True)
+    end = len(marks) - marks[::-1].index(True)
+    if False in marks[start:end]:
+        raise FeaToolsError("Only one run of marked glyphs is allowed: %s" % text.strip())
+    return groups[:start], groups[start:end], groups[end:]
+
+def isGlyphSubstitution(target, substitution):
+    # a substitution of glyphs that can be combined with
+    # other substitutions. classes are left alone.
+    targetClass = target[0]
+    substitutionClass = substitution[0]
+    if len(substitutionClass) != 1 and len(substitutionClass) != len(targetClass):
+        return False
+    for member in targetClass:
+        if member[0] == "@":
+            return False
+    for member in substitutionClass:
+        if member[0] == "@":
+            return False
+    return True
+
+def stripEscape(name):
+    if name[0] == "\\":
+        return name[1:]
+    return name
@@ -0,0 +1,505 @@
+"""
+A GSUB reader that works directly on the bytes of a font.
+
+The objects in this module mirror the attributes of the
+fontTools otTables objects that binaryParser reads, so the
+parsing is handed to binaryParser and the same writer calls
+are made. Nothing is decoded until it is requested. The data
+is read through zero-copy memoryview slices of the font data.
+"""
+
+import struct
+from feaTools2 import FeaToolsError
+from feaTools2.parsers import binaryParser
+
+
+def parseTable(writer, data, tableTag, glyphOrder, excludeFeatures=None, includeFeatures=None, excludeScripts=None, includeScripts=None, excludeLanguages=None, includeLanguages=None):
+    tableData = readTableData(data, tableTag)
+    if tableData is None:
+        raise FeaToolsError("The font does not contain a %s table." % tableTag)
+    table = readTable(tableData, tableTag, glyphOrder)
+    binaryParser.parseTable(writer, table, tableTag,
+        excludeFeatures=excludeFeatures, includeFeatures=includeFeatures,
+        excludeScripts=excludeScripts, includeScripts=includeScripts,
+        excludeLanguages=excludeLanguages, includeLanguages=includeLanguages
+    )
+
+def readTable(tableData, tableTag, glyphOrder):
+    if tableTag != "GSUB":
+        raise NotImplementedError
+    reader = TableReader(memoryview(tableData), glyphOrder)
+    return GSUB(reader)
+
+def readTableData(data, tableTag, fontNumber=0):
+    """
+    Locate a table in the sfnt data. The table data is
+    returned as a memoryview slice of data. None is
+    returned if the table is not in the font.
+    """
+    data = memoryview(data)
+    offset = 0
+    sfntVersion = readTag(data, 0)
+    if sfntVersion == "ttcf":
+        numFonts = struct.unpack_from(">L", data, 8)[0]
+        if fontNumber >= numFonts:
+            raise FeaToolsError("The collection does not contain font %d." % fontNumber)
+        offset = struct.unpack_from(">L", data, 12 + fontNumber * 4)[0]
+    numTables = struct.unpack_from(">H", data, offset + 4)[0]
+    for index in range(numTables):
+        recordOffset = offset + 12 + index * 16
+        tag = readTag(data, recordOffset)
+        if tag == tableTag:
+            tableOffset, length = struct.unpack_from(">LL", data, recordOffset + 8)
+            return data[tableOffset:tableOffset + length]
+    return None
+
+def readTag(data, offset):
+    tag = data[offset:offset + 4].tobytes()
+    if not isinstance(tag, str):
+        tag = tag.decode("latin-1")
+    return tag
+
+
+# ------------
+# Table Reader
+# ------------
+
+class lazyAttribute(object):
+
+    """
+    Compute the value the first time the attribute
+    is requested and store it in the instance.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        value = self.func(obj)
+        setattr(obj, self.name, value)
+        return value
+
+
+class TableReader(object):
+
+    def __init__(self, data, glyphOrder):
+        self.data = data
+        self.glyphOrder = glyphOrder
+        self._coverages = {}
+
+    def uint16(self, offset):
+        return struct.unpack_from(">H", self.data, offset)[0]
+
+    def uint16Array(self, offset, count):
+        return struct.unpack_from(">%dH" % count, self.data, offset)
+
+    def int16(self, offset):
+        return struct.unpack_from(">h", self.data, offset)[0]
+
+    def uint32(self, offset):
+        return struct.unpack_from(">L", self.data, offset)[0]
+
+    def tag(self, offset):
+        return readTag(self.data, offset)
+
+    def glyphName(self, glyphID):
+        # this follows TTFont.getGlyphName
+        if glyphID < len(self.glyphOrder):
+            return self.glyphOrder[glyphID]
+        return "glyph%.5d" % glyphID
+
+    def glyphNames(self, glyphIDs):
+        return [self.glyphName(glyphID) for glyphID in glyphIDs]
+
+    def coverage(self, offset):
+        # coverage tables are often shared by subtables
+        if offset not in self._coverages:
+            self._coverages[offset] = Coverage(self, offset)
+        return self._coverages[offset]
+
+
+class Record(object):
+
+    def __init__(self, reader, offset):
+        self.reader = reader
+        self.offset = offset
+
+
+class RecordList(object):
+
+    """
+    A sequence of records that are created
+    the first time they are requested.
+    """
+
+    def __init__(self, count, factory):
+        self._items = [None] * count
+        self._factory = factory
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        item = self._items[index]
+        if item is None:
+            item = self._items[index] = self._factory(index)
+        return item
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+# ------
+# Header
+# ------
+
+class GSUB(Record):
+
+    def __init__(self, reader):
+        super(GSUB, self).__init__(reader, 0)
+
+    @lazyAttribute
+    def ScriptList(self):
+        return ScriptList(self.reader, self.reader.uint16(4))
+
+    @lazyAttribute
+    def FeatureList(self):
+        return FeatureList(self.reader, self.reader.uint16(6))
+
+    @lazyAttribute
+    def LookupList(self):
+        return LookupList(self.reader, self.reader.uint16(8))
+
+
+# -------
+# Scripts
+# -------
+
+class ScriptList(Record):
+
+    @lazyAttribute
+    def ScriptRecord(self):
+        count = self.reader.uint16(self.offset)
+        return RecordList(count, self._readScriptRecord)
+
+    def _readScriptRecord(self, index):
+        recordOffset = self.offset + 2 + index * 6
+        record = ScriptRecord()
+        record.ScriptTag = self.reader.tag(recordOffset)
+        record.Script = Script(self.reader, self.offset + self.reader.uint16(recordOffset + 4))
+        return record
+
+
+class ScriptRecord(object): pass
+
+
+class Script(Record):
+
+    @lazyAttribute
+    def DefaultLangSys(self):
+        offset = self.reader.uint16(self.offset)
+        if not offset:
+            return None
+        return LangSys(self.reader, self.offset + offset)
+
+    @lazyAttribute
+    def LangSysRecord(self):
+        count = self.reader.uint16(self.offset + 2)
+        return RecordList(count, self._readLangSysRecord)
+
+    def _readLangSysRecord(self, index):
+        recordOffset = self.offset + 4 + index * 6
+        record = LangSysRecord()
+        record.LangSysTag = self.reader.tag(recordOffset)
+        record.LangSys = LangSys(self.reader, self.offset + self.reader.uint16(recordOffset + 4))
+        return record
+
+
+class LangSysRecord(object): pass
+
+
+class LangSys(Record):
+
+    @lazyAttribute
+    def ReqFeatureIndex(self):
+        return self.reader.uint16(self.offset + 2)
+
+    @lazyAttribute
+    def FeatureIndex(self):
+        count = self.reader.uint16(self.offset + 4)
+        return list(self.reader.uint16Array(self.offset + 6, count))
+
+
+# --------
+# Features
+# --------
+
+class FeatureList(Record):
+
+    @lazyAttribute
+    def FeatureRecord(self):
+        count = self.reader.uint16(self.offset)
+        return RecordList(count, self._readFeatureRecord)
+
+    def _readFeatureRecord(self, index):
+        recordOffset = self.offset + 2 + index * 6
+        record = FeatureRecord()
+        record.FeatureTag = self.reader.tag(recordOffset)
+        record.Feature = Feature(self.reader, self.offset + self.reader.uint16(recordOffset + 4))
+        return record
+
+
+class FeatureRecord(object): pass
+
+
+class Feature(Record):
+
+    @lazyAttribute
+    def LookupListIndex(self):
+        count = self.reader.uint16(self.offset + 2)
+        return list(self.reader.uint16Array(self.offset + 4, count))
+
+
+# -------
+# Lookups
+# -------
+
+class LookupList(Record):
+
+    @lazyAttribute
+    def Lookup(self):
+        count = self.reader.uint16(self.offset)
+        return RecordList(count, self._readLookup)
+
+    def _readLookup(self, index):
+        offset = self.offset + self.reader.uint16(self.offset + 2 + index * 2)
+        return Lookup(self.reader, offset)
+
+
+class Lookup(Record):
+
+    def __init__(self, reader, offset):
+        super(Lookup, self).__init__(reader, offset)
+        self.LookupType = reader.uint16(offset)
+        self.LookupFlag = reader.uint16(offset + 2)
+
+    @lazyAttribute
+    def SubTable(self):
+        count = self.reader.uint16(self.offset + 4)
+        offsets = self.reader.uint16Array(self.offset + 6, count)
+        subtableClass = gsubSubtableClasses.get(self.LookupType)
+        if subtableClass is None:
+            raise FeaToolsError("Unknown GSUB subtable type %d" % self.LookupType)
+        return [subtableClass(self.reader, self.offset + offset) for offset in offsets]
+
+    @lazyAttribute
+    def MarkFilteringSet(self):
+        if not self.LookupFlag & 0x0010:
+            return None
+        count = self.reader.uint16(self.offset + 4)
+        return self.reader.uint16(self.offset + 6 + count * 2)
+
+
+# ---------
+# Subtables
+# ---------
+
+class Subtable(Record):
+
+    def __init__(self, reader, offset):
+        super(Subtable, self).__init__(reader, offset)
+        self.Format = reader.uint16(offset)
+
+    def _coverage(self, offset):
+        return self.reader.coverage(self.offset + self.reader.uint16(offset))
+
+    def _coverageArray(self, offset):
+        count = self.reader.uint16(offset)
+        offsets = self.reader.uint16Array(offset + 2, count)
+        return [self.reader.coverage(self.offset + i) for i in offsets]
+
+    def _glyphArrays(self, offset):
+        """
+        Read an array of offsets to (count, glyphIDs) arrays.
+        """
+        reader = self.reader
+        count = reader.uint16(offset)
+        offsets = reader.uint16Array(offset + 2, count)
+        arrays = []
+        for arrayOffset in offsets:
+            arrayOffset += self.offset
+            glyphCount = reader.uint16(arrayOffset)
+            glyphIDs = reader.uint16Array(arrayOffset + 2, glyphCount)
+            arrays.append(reader.glyphNames(glyphIDs))
+        return arrays
+
+
+class SingleSubst(Subtable):
+
+    @lazyAttribute
+    def mapping(self):
+        reader = self.reader
+        coverage = self._coverage(self.offset + 2)
+        if self.Format == 1:
+            delta = reader.int16(self.offset + 4)
+            glyphIDs = coverage.glyphIDs
+            substitutes = [reader.glyphName((glyphID + delta) % 65536) for glyphID in glyphIDs]
+        elif self.Format == 2:
+            count = reader.uint16(self.offset + 4)
+            substitutes = reader.glyphNames(reader.uint16Array(self.offset + 6, count))
+        else:
+            raise FeaToolsError("Unknown SingleSubst format %d" % self.Format)
+        return dict(zip(coverage.glyphs, substitutes))
+
+
+class MultipleSubst(Subtable):
+
+    @lazyAttribute
+    def mapping(self):
+        coverage = self._coverage(self.offset + 2)
+        sequences = self._glyphArrays(self.offset + 4)
+        return dict(zip(coverage.glyphs, sequences))
+
+
+class AlternateSubst(Subtable):
+
+    @lazyAttribute
+    def alternates(self):
+        coverage = self._coverage(self.offset + 2)
+        alternateSets = self._glyphArrays(self.offset + 4)
+        return dict(zip(coverage.glyphs, alternateSets))
+
+
+class LigatureSubst(Subtable):
+
+    @lazyAttribute
+    def ligatures(self):
+        reader = self.reader
+        coverage = self._coverage(self.offset + 2)
+        count = reader.uint16(self.offset + 4)
+        setOffsets = reader.uint16Array(self.offset + 6, count)
+        ligatures = {}
+        for firstGlyph, setOffset in zip(coverage.glyphs, setOffsets):
+            setOffset += self.offset
+            ligatureCount = reader.uint16(setOffset)
+            ligatureOffsets = reader.uint16Array(setOffset + 2, ligatureCount)
+            parts = []
+            for ligatureOffset in ligatureOffsets:
+                ligatureOffset += setOffset
+                ligature = Ligature()
+                ligature.LigGlyph = reader.glyphName(reader.uint16(ligatureOffset))
+                componentCount = reader.uint16(ligatureOffset + 2)
+                components = reader.uint16Array(ligatureOffset + 4, componentCount - 1)
+                ligature.Component = reader.glyphNames(components)
+                parts.append(ligature)
+            ligatures[firstGlyph] = parts
+        return ligatures
+
+
+class Ligature(object): pass
+
+
+class ContextSubst(Subtable): pass
+
+
+class ChainContextSubst(Subtable):
+
+    # only format 3 is supported by binaryParser
+
+    def _format3Offsets(self):
+        if self.Format != 3:
+            raise AttributeError("Only available in ChainContextSubst format 3.")
+        reader = self.reader
+        backtrackOffset = self.offset + 2
+        inputOffset = backtrackOffset + 2 + reader.uint16(backtrackOffset) * 2
+        lookAheadOffset = inputOffset + 2 + reader.uint16(inputOffset) * 2
+        substOffset = lookAheadOffset + 2 + reader.uint16(lookAheadOffset) * 2
+        return backtrackOffset, inputOffset, lookAheadOffset, substOffset
+
+    @lazyAttribute
+    def BacktrackCoverage(self):
+        return self._coverageArray(self._format3Offsets()[0])
+
+    @lazyAttribute
+    def InputCoverage(self):
+        return self._coverageArray(self._format3Offsets()[1])
+
+    @lazyAttribute
+    def LookAheadCoverage(self):
+        return self._coverageArray(self._format3Offsets()[2])
+
+    @lazyAttribute
+    def SubstLookupRecord(self):
+        offset = self._format3Offsets()[3]
+        count = self.reader.uint16(offset)
+        records = []
+        for index in range(count):
+            record = SubstLookupRecord()
+            record.SequenceIndex, record.LookupListIndex = self.reader.uint16Array(offset + 2 + index * 4, 2)
+            records.append(record)
+        return records
+
+
+class SubstLookupRecord(object): pass
+
+
+class ExtensionSubst(Subtable):
+
+    def __init__(self, reader, offset):
+        super(ExtensionSubst, self).__init__(reader, offset)
+        self.ExtensionLookupType = reader.uint16(offset + 2)
+
+    @lazyAttribute
+    def ExtSubTable(self):
+        subtableClass = gsubSubtableClasses.get(self.ExtensionLookupType)
+        if subtableClass is None or subtableClass is ExtensionSubst:
+            raise FeaToolsError("Unknown GSUB extension subtable type %d" % self.ExtensionLookupType)
+        offset = self.offset + self.reader.uint32(self.offset + 4)
+        return subtableClass(self.reader, offset)
+
+
+gsubSubtableClasses = {
+    1 : SingleSubst,
+    2 : MultipleSubst,
+    3 : AlternateSubst,
+    4 : LigatureSubst,
+    5 : ContextSubst,
+    6 : ChainContextSubst,
+    7 : ExtensionSubst
+}
+
+
+# --------
+# Coverage
+# --------
+
+class Coverage(Record):
+
+    def __init__(self, reader, offset):
+        super(Coverage, self).__init__(reader, offset)
+        self.Format = reader.uint16(offset)
+
+    @lazyAttribute
+    def glyphIDs(self):
+        reader = self.reader
+        count = reader.uint16(self.offset + 2)
+        if self.Format == 1:
+            return reader.uint16Array(self.offset + 4, count)
+        elif self.Format == 2:
+            ranges = []
+            for index in range(count):
+                start, end, startCoverageIndex = reader.uint16Array(self.offset + 4 + index * 6, 3)
+                ranges.append((startCoverageIndex, start, end))
+            glyphIDs = []
+            for startCoverageIndex, start, end in sorted(ranges):
+                glyphIDs.extend(range(start, end + 1))
+            return glyphIDs
+        return []
+
+    @lazyAttribute
+    def glyphs(self):
+        return self.reader.glyphNames(self.glyphIDs)
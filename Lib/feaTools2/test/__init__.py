@@ -1,14 +1,54 @@
 import tempfile
 import os
+import sys
 from fontTools.ttLib import TTLibError
 from fontTools.agl import AGL2UV
 from defcon import Font
 from ufo2fdk import OTFCompiler
-from feaTools2 import decompileBinaryToObject
+from feaTools2 import decompileBinaryToObject, iterDecompileBinaryToFeatures, serializeTables, deserializeTables
+from feaTools2.cache import DecompileCache
 from feaTools2.writers.dumpWriter import DumpWriter
 from feaTools2.test.cases import *
 
-def compileDecompileCompareDumps(features, expectedDump):
+def compileDecompileCompareDumps(features, expectedDump, serialize=False, **kwargs):
+    path, errors = compileFeatures(features)
+    # extract the features
+    try:
+        tables = decompileBinaryToObject(path, compress=True, **kwargs)
+        if serialize:
+            tables = deserializeTables(serializeTables(tables))
+    # print compiler errors
+    except TTLibError:
+        print(errors)
+    # get rid of the temp file
+    finally:
+        os.remove(path)
+    # dump
+    writer = DumpWriter()
+    tables["GSUB"].write(writer)
+    dump = writer.dump()
+    # compare
+    compareDumps(expectedDump, dump)
+
+def compileIterDecompileCompareDumps(features, expectedDump, **kwargs):
+    path, errors = compileFeatures(features)
+    # extract the features
+    writer = DumpWriter()
+    try:
+        for feature in iterDecompileBinaryToFeatures(path, **kwargs):
+            featureWriter = writer.addFeature(feature.tag)
+            feature.write(featureWriter)
+    # print compiler errors
+    except TTLibError:
+        print(errors)
+    # get rid of the temp file
+    finally:
+        os.remove(path)
+    dump = writer.dump()
+    # compare
+    compareDumps(expectedDump, dump)
+
+def compileFeatures(features):
     # make the font
     font = Font()
     font.info.unitsPerEm = 1000
@@ -28,21 +68,7 @@ def compileDecompileCompareDumps(features, expectedDump):
     handle, path = tempfile.mkstemp()
     compiler = OTFCompiler()
     errors = compiler.compile(font, path)["makeotf"]
-    # extract the features
-    try:
-        tables = decompileBinaryToObject(path, compress=True)
-    # print compiler errors
-    except TTLibError:
-        print(errors)
-    # get rid of the temp file
-    finally:
-        os.remove(path)
-    # dump
-    writer = DumpWriter()
-    tables["GSUB"].write(writer)
-    dump = writer.dump()
-    # compare
-    compareDumps(expectedDump, dump)
+    return path, errors
 
 def compareDumps(dump1, dump2):
     if dump1 == dump2:
@@ -147,6 +173,804 @@ def testGSUBType6():
     >>> compileDecompileCompareDumps(gsubType65_fea, gsubType65_dump)
     """
 
+# ---------
+# Filtering
+# ---------
+
+def testFilterScriptsLanguages():
+    """
+    >>> compileDecompileCompareDumps(filterScriptsLanguages1_fea, filterScriptsLanguages1_dump, includeScripts=["latn", "cyrl"], excludeScripts=["cyrl"], excludeLanguages=["TRK"])
+    """
+
+# -----------------
+# Lookup Comparison
+# -----------------
+
+def makeComparisonLookups():
+    from feaTools2.objects import Table
+    lookups = []
+    for name in ("lookup1", "lookup2"):
+        table = Table()
+        lookup = table.addLookup(name)
+        lookup.addGSUBSubtable([[["A"]]], [[["B"]]], 1)
+        lookups.append(lookup)
+    return lookups
+
+def testLookupComparison():
+    """
+    >>> lookup1, lookup2 = makeComparisonLookups()
+    >>> lookup1 == lookup2
+    True
+    >>> lookup1.flag.ignoreMarks = True
+    >>> lookup1 == lookup2
+    False
+    >>> lookup1, lookup2 = makeComparisonLookups()
+    >>> lookup1 == lookup2
+    True
+    >>> lookup2.subtables[0].target = [[["C"]]]
+    >>> lookup1 == lookup2
+    False
+    >>> lookup1, lookup2 = makeComparisonLookups()
+    >>> lookup1 == lookup2
+    True
+    >>> lookup2.subtables.append(lookup1.subtables[0])
+    >>> lookup1 == lookup2
+    False
+    >>> lookup1, lookup2 = makeComparisonLookups()
+    >>> lookup1 == lookup2
+    True
+    >>> cached = lookup1._digest
+    >>> hash(lookup1) == hash(lookup1)
+    True
+    >>> lookup1 == lookup2
+    True
+    >>> lookup1._digest is cached
+    True
+    """
+
+# -------------
+# Serialization
+# -------------
+
+def testSerialization():
+    """
+    >>> compileDecompileCompareDumps(compressGlobalLookups4_fea, compressGlobalLookups4_dump, serialize=True)
+    >>> compileDecompileCompareDumps(compressFeatureDefaultLanguageLookups3_fea, compressFeatureDefaultLanguageLookups3_dump, serialize=True)
+    >>> compileDecompileCompareDumps(lookupFlag5_fea, lookupFlag5_dump, serialize=True)
+    >>> compileDecompileCompareDumps(gsubType13_fea, gsubType13_dump, serialize=True)
+    >>> compileDecompileCompareDumps(gsubType63_fea, gsubType63_dump, serialize=True)
+    """
+
+# ------------
+# SFNT Backend
+# ------------
+
+def testSFNTBackend():
+    """
+    >>> compileDecompileCompareDumps(compressGlobalLookups4_fea, compressGlobalLookups4_dump, backend="sfnt")
+    >>> compileDecompileCompareDumps(compressFeatureDefaultLanguageLookups2_fea, compressFeatureDefaultLanguageLookups2_dump, backend="sfnt")
+    >>> compileDecompileCompareDumps(lookupFlag5_fea, lookupFlag5_dump, backend="sfnt")
+    >>> compileDecompileCompareDumps(gsubType13_fea, gsubType13_dump, backend="sfnt")
+    >>> compileDecompileCompareDumps(gsubType31_fea, gsubType31_dump, backend="sfnt")
+    >>> compileDecompileCompareDumps(gsubType42_fea, gsubType42_dump, backend="sfnt")
+    >>> compileDecompileCompareDumps(gsubType63_fea, gsubType63_dump, backend="sfnt")
+    >>> compileDecompileCompareDumps(gsubType65_fea, gsubType65_dump, backend="sfnt")
+    """
+
+# ---------
+# Streaming
+# ---------
+
+def testIterDecompile():
+    """
+    >>> compileIterDecompileCompareDumps(iterDecompile1_fea, iterDecompile1_dump)
+    >>> compileIterDecompileCompareDumps(iterDecompile1_fea, iterDecompile2_dump, includeFeatures=["TST1", "TST3"], excludeFeatures=["TST3"])
+    """
+
+def testFeaSyntaxStream():
+    """
+    >>> from StringIO import StringIO
+    >>> from feaTools2.objects import Table
+    >>> from feaTools2.writers.feaSyntaxWriter import FeaSyntaxWriter
+    >>> table = Table()
+    >>> for tag in ("smcp", "liga"):
+    ...     feature = table.addFeature(tag)
+    ...     feature.addScript("latn")
+    ...     feature.addLanguage(None)
+    ...     lookup = feature.addLookup(tag + "_1")
+    ...     lookup.addGSUBSubtable([[["a"]]], [[["a." + tag]]], 1)
+    >>> for filterRedundancies in (False, True):
+    ...     writer = FeaSyntaxWriter(filterRedundancies=filterRedundancies)
+    ...     table.write(writer)
+    ...     text = writer.write()
+    ...     stream = StringIO()
+    ...     writer = FeaSyntaxWriter(filterRedundancies=filterRedundancies, stream=stream)
+    ...     table.write(writer)
+    ...     streamed = "smcp" in stream.getvalue() and "liga" not in stream.getvalue()
+    ...     writer.finish()
+    ...     print(streamed, stream.getvalue() == text)
+    (True, True)
+    (True, True)
+    """
+
+# -----------------
+# fontTools Objects
+# -----------------
+
+def compileRebuildCompareDumps(features, expectedDump):
+    from fontTools.ttLib import TTFont
+    from feaTools2.writers.otTablesWriter import OTTablesWriter
+    path, errors = compileFeatures(features)
+    try:
+        # write the GSUB objects back into the font
+        font = TTFont(path)
+        tables = decompileBinaryToObject(font)
+        writer = OTTablesWriter(font.getGlyphOrder())
+        tables["GSUB"].write(writer)
+        font["GSUB"] = writer.getTable()
+        font.save(path)
+        font.close()
+        # extract the features
+        tables = decompileBinaryToObject(path)
+    # print compiler errors
+    except TTLibError:
+        print(errors)
+    # get rid of the temp file
+    finally:
+        os.remove(path)
+    # dump
+    writer = DumpWriter()
+    tables["GSUB"].write(writer)
+    dump = writer.dump()
+    # compare
+    compareDumps(expectedDump, dump)
+
+def testOTTablesWriter():
+    """
+    >>> compileRebuildCompareDumps(compressGlobalLookups4_fea, compressGlobalLookups4_dump)
+    >>> compileRebuildCompareDumps(compressFeatureDefaultLanguageLookups2_fea, compressFeatureDefaultLanguageLookups2_dump)
+    >>> compileRebuildCompareDumps(lookupFlag4_fea, lookupFlag4_dump)
+    >>> compileRebuildCompareDumps(gsubType13_fea, gsubType13_dump)
+    >>> compileRebuildCompareDumps(gsubType31_fea, gsubType31_dump)
+    >>> compileRebuildCompareDumps(gsubType42_fea, gsubType42_dump)
+    >>> compileRebuildCompareDumps(gsubType63_fea, gsubType63_dump)
+    >>> compileRebuildCompareDumps(gsubType65_fea, gsubType65_dump)
+    >>> compileRebuildCompareDumps(lookupFlag5_fea, lookupFlag5_dump)
+    Traceback (most recent call last):
+        ...
+    FeaToolsError: The lookup flag markAttachmentType can not be compiled.
+    """
+
+# ----------
+# feaLib AST
+# ----------
+
+def compileBuildCompareDumps(features, expectedDump):
+    from fontTools.ttLib import TTFont
+    from fontTools.feaLib.builder import Builder
+    from feaTools2.writers.feaLibASTWriter import FeaLibASTWriter
+    path, errors = compileFeatures(features)
+    try:
+        # build the GSUB objects back into the font
+        font = TTFont(path)
+        tables = decompileBinaryToObject(font)
+        writer = FeaLibASTWriter()
+        tables["GSUB"].write(writer)
+        Builder(font, writer.getFeatureFile()).build()
+        font.save(path)
+        font.close()
+        # extract the features
+        tables = decompileBinaryToObject(path)
+    # print compiler errors
+    except TTLibError:
+        print(errors)
+    # get rid of the temp file
+    finally:
+        os.remove(path)
+    # dump
+    writer = DumpWriter()
+    tables["GSUB"].write(writer)
+    dump = writer.dump()
+    # compare
+    compareDumps(expectedDump, dump)
+
+def testFeaLibASTWriter():
+    """
+    >>> compileBuildCompareDumps(compressGlobalLookups4_fea, compressGlobalLookups4_dump)
+    >>> compileBuildCompareDumps(compressFeatureDefaultLanguageLookups1_fea, compressFeatureDefaultLanguageLookups1_dump)
+    >>> compileBuildCompareDumps(compressFeatureDefaultLanguageLookups2_fea, compressFeatureDefaultLanguageLookups2_dump)
+    >>> compileBuildCompareDumps(compressFeatureDefaultLanguageLookups3_fea, compressFeatureDefaultLanguageLookups3_dump)
+    >>> compileBuildCompareDumps(lookupFlag4_fea, lookupFlag4_dump)
+    >>> compileBuildCompareDumps(gsubType13_fea, gsubType13_dump)
+    >>> compileBuildCompareDumps(gsubType31_fea, gsubType31_dump)
+    >>> compileBuildCompareDumps(gsubType42_fea, gsubType42_dump)
+    >>> compileBuildCompareDumps(gsubType63_fea, gsubType63_dump)
+    >>> compileBuildCompareDumps(gsubType65_fea, gsubType65_dump)
+    >>> compileBuildCompareDumps(lookupFlag5_fea, lookupFlag5_dump)
+    Traceback (most recent call last):
+        ...
+    FeaToolsError: The lookup flag markAttachmentType can not be written.
+    """
+
+# -----------------
+# Fea Syntax Parser
+# -----------------
+
+def parseCompareDumps(features, expectedDump):
+    from feaTools2.objects import Table
+    from feaTools2.parsers.feaSyntaxParser import parseFeaSyntax
+    table = Table()
+    table.tag = "GSUB"
+    parseFeaSyntax(table, features)
+    table.compress()
+    # dump
+    writer = DumpWriter()
+    table.write(writer)
+    dump = writer.dump()
+    # compare
+    compareDumps(expectedDump, dump)
+
+def testFeaSyntaxParser():
+    """
+    >>> parseCompareDumps(compressGlobalLookups2_fea, compressGlobalLookups2_dump)
+    >>> parseCompareDumps(compressFeatureDefaultLanguageLookups3_fea, compressFeatureDefaultLanguageLookups3_dump)
+    >>> parseCompareDumps(lookupFlag1_fea, lookupFlag1_dump)
+    >>> parseCompareDumps(lookupFlag4_fea, lookupFlag4_dump)
+    >>> parseCompareDumps(gsubType11_fea, gsubType11_dump)
+    >>> parseCompareDumps(gsubType12_fea, gsubType12_dump)
+    >>> parseCompareDumps(gsubType13_fea, gsubType13_dump)
+    >>> parseCompareDumps(gsubType31_fea, gsubType31_dump)
+    >>> parseCompareDumps(gsubType41_fea, gsubType41_dump)
+    >>> parseCompareDumps(gsubType61_fea, gsubType61_dump)
+    >>> parseCompareDumps(gsubType63_fea, gsubType63_dump)
+    >>> parseCompareDumps(gsubType65_fea, gsubType65_dump)
+    >>> parseCompareDumps(parseNamedScript1_fea, parseNamedScript1_dump)
+    >>> compileDecompileCompareDumps(parseNamedScript1_fea, parseNamedScript1_dump)
+    """
+
+# ---------
+# Glyph IDs
+# ---------
+
+def testGlyphIDs():
+    """
+    >>> compileDecompileCompareDumps(compressGlobalLookups4_fea, compressGlobalLookups4_dump, glyphIDs=True)
+    >>> compileDecompileCompareDumps(compressFeatureDefaultLanguageLookups3_fea, compressFeatureDefaultLanguageLookups3_dump, glyphIDs=True)
+    >>> compileDecompileCompareDumps(gsubType13_fea, gsubType13_dump, glyphIDs=True)
+    >>> compileDecompileCompareDumps(gsubType31_fea, gsubType31_dump, glyphIDs=True)
+    >>> compileDecompileCompareDumps(gsubType42_fea, gsubType42_dump, glyphIDs=True)
+    >>> compileDecompileCompareDumps(gsubType63_fea, gsubType63_dump, glyphIDs=True)
+    """
+
+def testGlyphIDClass():
+    """
+    >>> from feaTools2.objects import GlyphOrder, GlyphIDClass
+    >>> glyphOrder = GlyphOrder([".notdef", "A", "B", "C"])
+    >>> group = GlyphIDClass(glyphOrder.getGlyphIDs(["A", "B", "C"]), glyphOrder)
+    >>> list(group)
+    [1, 2, 3]
+    >>> group = group.removeGlyphs(["B"])
+    >>> group.glyphNames()
+    ['A', 'C']
+    >>> group = group.renameGlyphs({"C" : "C.alt"})
+    >>> list(group), group.glyphNames()
+    ([1, 4], ['A', 'C.alt'])
+    >>> import copy, pickle
+    >>> copied = copy.copy(group)
+    >>> type(copied) is GlyphIDClass, copied.glyphOrder is glyphOrder, list(copied)
+    (True, True, [1, 4])
+    >>> copied = copy.deepcopy(group)
+    >>> type(copied) is GlyphIDClass, copied.glyphOrder is glyphOrder, copied.glyphNames()
+    (True, False, ['A', 'C.alt'])
+    >>> copied = pickle.loads(pickle.dumps(group))
+    >>> type(copied) is GlyphIDClass, copied.glyphNames()
+    (True, ['A', 'C.alt'])
+    >>> other = GlyphIDClass([1, 4], glyphOrder)
+    >>> other == group, hash(other) == hash(group), {group : "found"}[other]
+    (True, True, 'found')
+    >>> from feaTools2.objects import ValuePool
+    >>> pool = ValuePool()
+    >>> pool.internClass(group) is pool.internClass(other)
+    True
+    >>> pool.internSequence([group]) is pool.internSequence([other])
+    True
+    """
+
+# ---------
+# Interning
+# ---------
+
+def testInternValues():
+    """
+    >>> from feaTools2.objects import Table
+    >>> table = Table()
+    >>> table.addClassDefinition("@ab", ["a", "b"])
+    >>> feature = table.addFeature("test")
+    >>> feature.addScript("latn")
+    >>> feature.addLanguage(None)
+    >>> lookup = feature.addLookup("test_1")
+    >>> lookup.addGSUBSubtable([[["a", "b"]]], [[["a.alt", "b.alt"]]], 1)
+    >>> lookup.addGSUBSubtable([[["c"]]], [[["c.alt"]]], 6, backtrack=[["a", "b"]])
+    >>> first, second = lookup.subtables
+    >>> group = table.classes["@ab"]
+    >>> first.target[0][0] is group, second.backtrack[0] is group
+    (True, True)
+    >>> {group : None}[("a", "b")]
+    >>> table.removeGlyphs(["b"])
+    >>> group
+    ('a', 'b')
+    >>> table.classes["@ab"], first.target[0][0], second.backtrack[0]
+    (('a',), ('a',), ('a',))
+    >>> table.classes["@ab"] is first.target[0][0] is second.backtrack[0]
+    True
+    """
+
+# -----------
+# Glyph Index
+# -----------
+
+def decompileEditDump(path, indexGlyphs):
+    tables = decompileBinaryToObject(path)
+    table = tables["GSUB"]
+    if indexGlyphs:
+        table.indexGlyphs()
+    table.removeGlyphs(["B", "F"])
+    table.renameGlyphs({"A" : "A.alt", "C" : "D", "D" : "C"})
+    table.removeGlyphs(["D"])
+    table.cleanup()
+    writer = DumpWriter()
+    table.write(writer)
+    return writer.dump()
+
+def testGlyphIndex():
+    """
+    >>> path, errors = compileFeatures(compressGlobalLookups4_fea)
+    >>> decompileEditDump(path, True) == decompileEditDump(path, False)
+    True
+    >>> os.remove(path)
+    >>> path, errors = compileFeatures(gsubType63_fea)
+    >>> decompileEditDump(path, True) == decompileEditDump(path, False)
+    True
+    >>> os.remove(path)
+    """
+
+# ----------
+# Subsetting
+# ----------
+
+def testSubset():
+    """
+    >>> from feaTools2.objects import Table
+    >>> table = Table()
+    >>> feature = table.addFeature("smcp")
+    >>> feature.addScript("latn")
+    >>> feature.addLanguage(None)
+    >>> lookup = feature.addLookup("smcp_1")
+    >>> lookup.addGSUBSubtable([[["a", "b"]]], [[["a.sc", "b.sc"]]], 1)
+    >>> feature = table.addFeature("liga")
+    >>> feature.addScript("latn")
+    >>> feature.addLanguage(None)
+    >>> lookup = feature.addLookup("liga_1")
+    >>> lookup.addGSUBSubtable([[["f"], ["i"]], [["f"], ["l"]]], [[["f_i"]], [["f_l"]]], 4)
+    >>> sorted(table.subset(["a", "f", "i"]))
+    ['a', 'a.sc', 'f', 'f_i', 'i']
+    >>> subtable = table[0].scripts[0].languages[0].lookups[0].subtables[0]
+    >>> subtable.target, subtable.substitution
+    ([(('a',),)], [(('a.sc',),)])
+    >>> subtable = table[1].scripts[0].languages[0].lookups[0].subtables[0]
+    >>> subtable.target, subtable.substitution
+    ([(('f',), ('i',))], [(('f_i',),)])
+    >>> sorted(table.subset(["a"]))
+    ['a', 'a.sc']
+    >>> [feature.tag for feature in table]
+    ['smcp']
+    >>> sorted(table.subset(["x"]))
+    ['x']
+    >>> len(table)
+    0
+    >>> table = Table()
+    >>> feature = table.addFeature("liga")
+    >>> for script in ("cyrl", "latn"):
+    ...     feature.addScript(script)
+    ...     feature.addLanguage(None)
+    ...     lookup = feature.addLookup("liga_1")
+    ...     lookup.addGSUBSubtable([[["f"], ["i"]]], [[["f_i"]]], 4)
+    ...     lookup = feature.addLookup("liga_2")
+    ...     lookup.addGSUBSubtable([[["x"]]], [[["y"]]], 1)
+    >>> table.compress()
+    >>> [lookup.name for lookup in table[0].scripts[1].languages[0].lookups]
+    ['liga_1', 'liga_2']
+    >>> sorted(table.subset(["x"]))
+    ['x', 'y']
+    >>> [lookup.name for lookup in table[0].scripts[0].languages[0].lookups]
+    ['liga_2']
+    >>> [lookup.name for lookup in table[0].scripts[1].languages[0].lookups]
+    ['liga_2']
+    """
+
+def testCopySubset():
+    """
+    >>> from feaTools2.objects import Table
+    >>> table = Table()
+    >>> feature = table.addFeature("smcp")
+    >>> feature.addScript("latn")
+    >>> feature.addLanguage(None)
+    >>> lookup = feature.addLookup("smcp_1")
+    >>> lookup.addGSUBSubtable([[["a", "b"]]], [[["a.sc", "b.sc"]]], 1)
+    >>> feature = table.addFeature("liga")
+    >>> feature.addScript("latn")
+    >>> feature.addLanguage(None)
+    >>> lookup = feature.addLookup("liga_1")
+    >>> lookup.addGSUBSubtable([[["f"], ["i"]]], [[["f_i"]]], 4)
+    >>> subsets = list(table.iterSubsets([["a", "f", "i"], ["a", "b"]]))
+    >>> subset, keepGlyphs = subsets[0]
+    >>> sorted(keepGlyphs)
+    ['a', 'a.sc', 'f', 'f_i', 'i']
+    >>> subset[0].scripts[0].languages[0].lookups[0].subtables[0].target
+    [(('a',),)]
+    >>> subset[1].scripts[0].languages[0].lookups[0] is lookup
+    True
+    >>> subset, keepGlyphs = subsets[1]
+    >>> [feature.tag for feature in subset]
+    ['smcp']
+    >>> subset[0].scripts[0].languages[0].lookups[0] is table[0].scripts[0].languages[0].lookups[0]
+    True
+    >>> subset.removeGlyphs(["b"])
+    >>> subset[0].scripts[0].languages[0].lookups[0].subtables[0].target
+    [(('a',),)]
+    >>> table[0].scripts[0].languages[0].lookups[0].subtables[0].target
+    [(('a', 'b'),)]
+    >>> subset, keepGlyphs = table.copySubset(["a", "b"])
+    >>> table.removeGlyphs(["b"])
+    >>> subset[0].scripts[0].languages[0].lookups[0].subtables[0].target
+    [(('a', 'b'),)]
+    >>> table[0].scripts[0].languages[0].lookups[0].subtables[0].target
+    [(('a',),)]
+    >>> table = Table()
+    >>> feature = table.addFeature("liga")
+    >>> for script in ("cyrl", "latn"):
+    ...     feature.addScript(script)
+    ...     feature.addLanguage(None)
+    ...     lookup = feature.addLookup("liga_1")
+    ...     lookup.addGSUBSubtable([[["f"], ["i"]]], [[["f_i"]]], 4)
+    ...     lookup = feature.addLookup("liga_2")
+    ...     lookup.addGSUBSubtable([[["x"]]], [[["y"]]], 1)
+    >>> table.compress()
+    >>> subset, keepGlyphs = table.copySubset(["x"])
+    >>> [lookup.name for lookup in subset[0].scripts[1].languages[0].lookups]
+    ['liga_2']
+    >>> [lookup.name for lookup in table[0].scripts[1].languages[0].lookups]
+    ['liga_1', 'liga_2']
+    >>> table = Table()
+    >>> table.addClassDefinition("@ab", ["a", "b"])
+    >>> feature = table.addFeature("smcp")
+    >>> feature.addScript("latn")
+    >>> feature.addLanguage(None)
+    >>> lookup = feature.addLookup("smcp_1")
+    >>> lookup.addGSUBSubtable([[["a", "b"]]], [[["a.sc", "b.sc"]]], 1)
+    >>> table.indexGlyphs()
+    >>> subset, keepGlyphs = table.copySubset(["a", "b"])
+    >>> table.removeGlyphs(["b"])
+    >>> table[0].scripts[0].languages[0].lookups[0].subtables[0].target, table.classes["@ab"]
+    ([(('a',),)], ('a',))
+    >>> subset[0].scripts[0].languages[0].lookups[0].subtables[0].target, subset.classes.get("@ab")
+    ([(('a', 'b'),)], None)
+    """
+
+def makeClosureTable():
+    from feaTools2.objects import Table
+    table = Table()
+    table.addClassDefinition("@lower", ["a", "b", "c"])
+    table.addClassDefinition("@smcp", ["a.sc", "b.sc", "c.sc"])
+    feature = table.addFeature("smcp")
+    feature.addScript("latn")
+    feature.addLanguage(None)
+    # positional
+    lookup = feature.addLookup("smcp_1")
+    lookup.addGSUBSubtable([[["@lower"]]], [[["@smcp"]]], 1)
+    lookup = feature.addLookup("smcp_2")
+    lookup.addGSUBSubtable([[["a.sc"]]], [[["a.sc.alt1", "a.sc.alt2"]]], 3)
+    feature = table.addFeature("liga")
+    feature.addScript("latn")
+    feature.addLanguage(None)
+    # ligature
+    lookup = feature.addLookup("liga_1")
+    lookup.addGSUBSubtable([[["f"], ["i"]], [["f"], ["f"], ["i"]]], [[["f_i"]], [["f_f_i"]]], 4)
+    lookup.addGSUBSubtable([[["a.sc"], ["b.sc", "c.sc"]]], [[["a_b.sc"]]], 4)
+    # contextual
+    lookup = feature.addLookup("liga_2")
+    lookup.addGSUBSubtable([[["x"]]], [[["multiply"]]], 6, backtrack=[["one", "two"]], lookahead=[["@lower"]])
+    lookup.addGSUBSubtable([[["f_i"], ["b"]]], [[["f_i_b"]]], 6, backtrack=[["c"]])
+    return table
+
+def compareGlyphClosures(table, glyphNames):
+    # the NumPy closure is only used when NumPy is installed
+    try:
+        import numpy
+    except ImportError:
+        return True
+    from feaTools2.closure import GlyphClosure
+    closure = GlyphClosure(table).close(glyphNames)
+    expected = table._glyphClosure(glyphNames, table._uniqueLookups(), closure=False)
+    if closure != expected:
+        print(sorted(closure))
+        print(sorted(expected))
+        return False
+    return True
+
+def testGlyphClosureEngines():
+    """
+    >>> glyphSets = [["a"], ["b", "c"], ["f", "i"], ["f", "i", "b"], ["c", "f", "i", "b"], ["x", "one"], ["x", "c"], ["x", "one", "b"], ["notAGlyph"]]
+    >>> table = makeClosureTable()
+    >>> [compareGlyphClosures(table, glyphNames) for glyphNames in glyphSets]
+    [True, True, True, True, True, True, True, True, True]
+    >>> table.useGlyphIDs()
+    >>> [compareGlyphClosures(table, glyphNames) for glyphNames in glyphSets]
+    [True, True, True, True, True, True, True, True, True]
+    >>> table = makeClosureTable()
+    >>> table.useGlyphIDs([".notdef", "x", "multiply", "one", "two", "a", "b", "c"])
+    >>> [compareGlyphClosures(table, glyphNames) for glyphNames in glyphSets]
+    [True, True, True, True, True, True, True, True, True]
+    >>> sorted(makeClosureTable().glyphClosure(["c", "f", "i", "b"]))
+    ['b', 'b.sc', 'c', 'c.sc', 'f', 'f_f_i', 'f_i', 'f_i_b', 'i']
+    """
+
+def testGlyphClosure():
+    """
+    The result is the same with and without NumPy.
+    See testGlyphClosureEngines.
+
+    >>> from feaTools2.objects import Table
+    >>> table = Table()
+    >>> table.addClassDefinition("@digits", ["one", "two"])
+    >>> feature = table.addFeature("calt")
+    >>> feature.addScript("latn")
+    >>> feature.addLanguage(None)
+    >>> lookup = feature.addLookup("calt_1")
+    >>> lookup.addGSUBSubtable([[["x"]]], [[["multiply"]]], 6, backtrack=[["@digits"]], lookahead=[["@digits"]])
+    >>> lookup = feature.addLookup("calt_2")
+    >>> lookup.addGSUBSubtable([[["multiply"]]], [[["multiply.alt"]]], 1)
+    >>> sorted(table.glyphClosure(["x", "one"]))
+    ['multiply', 'multiply.alt', 'one', 'x']
+    >>> sorted(table.glyphClosure(["x", "a"]))
+    ['a', 'x']
+    >>> table.useGlyphIDs()
+    >>> sorted(table.glyphClosure(["x", "two", "notAGlyph"]))
+    ['multiply', 'multiply.alt', 'notAGlyph', 'two', 'x']
+    """
+
+# ----------------------
+# Applying Substitutions
+# ----------------------
+
+def testSubstitutionEngine():
+    """
+    >>> from feaTools2.objects import Table
+    >>> from feaTools2.engine import SubstitutionEngine
+    >>> table = Table()
+    >>> feature = table.addFeature("liga")
+    >>> feature.addScript("DFLT")
+    >>> feature.addLanguage(None)
+    >>> lookup = feature.addLookup("liga_1")
+    >>> lookup.addLookupFlag(ignoreMarks=True)
+    >>> lookup.addGSUBSubtable([[["f"], ["f"], ["i"]], [["f"], ["i"]]], [[["f_f_i"]], [["f_i"]]], 4)
+    >>> feature = table.addFeature("calt")
+    >>> feature.addScript("DFLT")
+    >>> feature.addLanguage(None)
+    >>> lookup = feature.addLookup("calt_1")
+    >>> lookup.addGSUBSubtable([[["x"]]], [], 6, backtrack=[["zero"]])
+    >>> lookup.addGSUBSubtable([[["x"]]], [[["multiply"]]], 6, backtrack=[["@digits"]])
+    >>> feature = table.addFeature("salt")
+    >>> feature.addScript("DFLT")
+    >>> feature.addLanguage(None)
+    >>> lookup = feature.addLookup("salt_1")
+    >>> lookup.addGSUBSubtable([[["a"]]], [[["a.alt1", "a.alt2"]]], 3)
+    >>> table.addClassDefinition("@digits", ["zero", "one"])
+    >>> engine = SubstitutionEngine(table, glyphClasses=dict(acute=3))
+    >>> engine.apply(["f", "i", "f", "acute", "f", "i"], features=["liga"])
+    ['f_i', 'f_f_i', 'acute']
+    >>> engine.apply(["zero", "x", "one", "x", "a"], features=["calt", "salt"])
+    ['zero', 'x', 'one', 'multiply', 'a.alt1']
+    >>> list(engine.applyBatch([["a"], ["f", "i", "a"]], script="latn"))
+    [['a.alt1'], ['f_i', 'a.alt1']]
+    """
+
+# ------------
+# Lazy Loading
+# ------------
+
+def testLazyTables():
+    """
+    >>> from feaTools2.objects import Tables
+    >>> def loader(table):
+    ...     print("loading %s" % table.tag)
+    ...     table.addFeature("liga")
+    >>> tables = Tables(loaders=dict(GSUB=loader))
+    >>> tables.isLoaded("GSUB")
+    False
+    >>> len(tables["GSUB"])
+    loading GSUB
+    1
+    >>> len(tables["GSUB"])
+    1
+    >>> len(tables["GPOS"])
+    0
+    """
+
+def compileDecompileLazyErrors(features, **kwargs):
+    from feaTools2 import FeaToolsError
+    path, errors = compileFeatures(features)
+    messages = []
+    f = open(path, "rb")
+    try:
+        tables = decompileBinaryToObject(f, lazy=True, **kwargs)
+        # a failed load is repeated with the open font
+        for i in range(2):
+            try:
+                tables["GSUB"]
+            except FeaToolsError as error:
+                messages.append(str(error))
+        closed = f.closed
+    # get rid of the temp file
+    finally:
+        f.close()
+        os.remove(path)
+    return messages, closed
+
+def testLazyErrors():
+    """
+    >>> compileDecompileLazyErrors(gsubType11_fea, backend="unknown")
+    (['Unknown backend unknown.', 'Unknown backend unknown.'], False)
+    """
+
+# -----
+# Cache
+# -----
+
+def compileDecompileWithCache(features, expectedDump, **kwargs):
+    path, errors = compileFeatures(features)
+    directory = tempfile.mkdtemp()
+    cache = DecompileCache(directory, **kwargs)
+    try:
+        for i in range(2):
+            tables = decompileBinaryToObject(path, cache=cache)
+            writer = DumpWriter()
+            tables["GSUB"].write(writer)
+            compareDumps(expectedDump, writer.dump())
+        # different options make a different entry
+        decompileBinaryToObject(path, compress=False, cache=cache)
+    # get rid of the temp files
+    finally:
+        os.remove(path)
+        count = len(os.listdir(directory))
+        cache.clear()
+        os.rmdir(directory)
+    return cache.hits, cache.misses, count
+
+def compileDecompileGlyphIDsWithCache(features):
+    from fontTools.ttLib import TTFont
+    path, errors = compileFeatures(features)
+    directory = tempfile.mkdtemp()
+    cache = DecompileCache(directory)
+    try:
+        font = TTFont(path)
+        expected = font.getGlyphOrder()
+        font.close()
+        glyphOrders = []
+        for i in range(2):
+            tables = decompileBinaryToObject(path, cache=cache, glyphIDs=True)
+            glyphOrders.append(tables["GSUB"].glyphOrder.glyphNames == expected)
+    # get rid of the temp files
+    finally:
+        os.remove(path)
+        cache.clear()
+        os.rmdir(directory)
+    return cache.hits, cache.misses, glyphOrders
+
+def compileMakeCacheKeys(features):
+    from fontTools.ttLib import TTFont
+    path, errors = compileFeatures(features)
+    directory = tempfile.mkdtemp()
+    cache = DecompileCache(directory)
+    try:
+        # the backend is part of the key
+        decompileBinaryToObject(path, cache=cache)
+        decompileBinaryToObject(path, cache=cache, backend="sfnt")
+        count = len(os.listdir(directory))
+        # the glyph names depend on cmap and maxp when post is format 3
+        font = TTFont(path)
+        keys = [cache.makeKey(font, {})]
+        font["maxp"].numGlyphs += 1
+        keys.append(cache.makeKey(font, {}))
+        for table in font["cmap"].tables:
+            table.cmap[0x20] = ".notdef"
+        keys.append(cache.makeKey(font, {}))
+        font.close()
+    # get rid of the temp files
+    finally:
+        os.remove(path)
+        cache.clear()
+        os.rmdir(directory)
+    return cache.misses, count, len(set(keys))
+
+def testCache():
+    """
+    >>> compileDecompileWithCache(compressGlobalLookups4_fea, compressGlobalLookups4_dump)
+    (1, 2, 2)
+    >>> compileDecompileWithCache(gsubType63_fea, gsubType63_dump, maxEntries=1)
+    (1, 2, 1)
+    >>> compileDecompileGlyphIDsWithCache(gsubType63_fea)
+    (1, 1, [True, True])
+    >>> compileMakeCacheKeys(gsubType11_fea)
+    (2, 2, 3)
+    """
+
+# -----
+# Batch
+# -----
+
+def compileBatchDecompile(features, **kwargs):
+    from feaTools2.batch import batchDecompile
+    path, errors = compileFeatures(features)
+    missingPath = path + ".missing"
+    try:
+        results = {}
+        for resultPath, result, error in batchDecompile([path, missingPath], jobs=2, **kwargs):
+            if error is not None:
+                result = error.strip().splitlines()[-1]
+            results[resultPath == path] = result
+    # get rid of the temp file
+    finally:
+        os.remove(path)
+    return results[True], results[False]
+
+def compileBatchMain(features):
+    from io import BytesIO, StringIO
+    from feaTools2.batch import main
+    path, errors = compileFeatures(features)
+    directory = tempfile.mkdtemp()
+    outputDirectory = os.path.join(directory, "fea")
+    stdout = sys.stdout
+    try:
+        # the output paths are written to stdout
+        if sys.version_info[0] < 3:
+            sys.stdout = BytesIO()
+        else:
+            sys.stdout = StringIO()
+        code = main([path, "--output-directory", outputDirectory])
+        fileNames = os.listdir(outputDirectory)
+    # get rid of the temp files
+    finally:
+        sys.stdout = stdout
+        os.remove(path)
+        if os.path.exists(outputDirectory):
+            for fileName in os.listdir(outputDirectory):
+                os.remove(os.path.join(outputDirectory, fileName))
+            os.rmdir(outputDirectory)
+        os.rmdir(directory)
+    return code, [os.path.splitext(fileName)[1] for fileName in fileNames]
+
+def testBatchDecompile():
+    """
+    >>> text, error = compileBatchDecompile(gsubType11_fea)
+    >>> "sub A by B;" in text
+    True
+    >>> error.startswith("IOError") or error.startswith("FileNotFoundError")
+    True
+    >>> data, error = compileBatchDecompile(gsubType11_fea, output="data")
+    >>> tables = deserializeTables(data)
+    >>> len(tables["GSUB"])
+    1
+    >>> compileBatchDecompile(gsubType11_fea, timeout=0.000001)
+    ('Decompiling took more than 1e-06 seconds.', 'Decompiling took more than 1e-06 seconds.')
+    >>> compileBatchDecompile(gsubType11_fea, output="unknown")
+    Traceback (most recent call last):
+        ...
+    ValueError: Unknown output unknown.
+    >>> compileBatchMain(gsubType11_fea)
+    (0, ['.fea'])
+    """
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
@@ -877,3 +877,216 @@ Feature: TST1
                     target: [[[E] [F]]]
                     substitution: [[[G]]]
 """.strip()
+
+# ---------
+# Streaming
+# ---------
+
+iterDecompile1_fea = """
+languagesystem DFLT dflt;
+lookup Test {
+    sub A by B;
+} Test;
+feature TST1 {
+    lookup Test;
+    sub C by D;
+} TST1;
+feature TST2 {
+    lookup Test;
+} TST2;
+feature TST3 {
+    sub E by F;
+} TST3;
+""".strip()
+
+iterDecompile1_dump = """
+Feature: TST2
+    Script: DFLT
+        Language: None
+            Include Default: True
+            Lookup: TST2_1
+                LookupFlag:
+                    rightToLeft: False
+                    ignoreBaseGlyphs: False
+                    ignoreLigatures: False
+                    ignoreMarks: False
+                    markAttachmentType: False
+                GSUBSubtable Type 1:
+                    backtrack: []
+                    lookahead: []
+                    target: [[[A]]]
+                    substitution: [[[B]]]
+Feature: TST1
+    Script: DFLT
+        Language: None
+            Include Default: True
+            Lookup: TST1_1
+                LookupFlag:
+                    rightToLeft: False
+                    ignoreBaseGlyphs: False
+                    ignoreLigatures: False
+                    ignoreMarks: False
+                    markAttachmentType: False
+                GSUBSubtable Type 1:
+                    backtrack: []
+                    lookahead: []
+                    target: [[[A]]]
+                    substitution: [[[B]]]
+            Lookup: TST1_2
+                LookupFlag:
+                    rightToLeft: False
+                    ignoreBaseGlyphs: False
+                    ignoreLigatures: False
+                    ignoreMarks: False
+                    markAttachmentType: False
+                GSUBSubtable Type 1:
+                    backtrack: []
+                    lookahead: []
+                    target: [[[C]]]
+                    substitution: [[[D]]]
+Feature: TST3
+    Script: DFLT
+        Language: None
+            Include Default: True
+            Lookup: TST3_1
+                LookupFlag:
+                    rightToLeft: False
+                    ignoreBaseGlyphs: False
+                    ignoreLigatures: False
+                    ignoreMarks: False
+                    markAttachmentType: False
+                GSUBSubtable Type 1:
+                    backtrack: []
+                    lookahead: []
+                    target: [[[E]]]
+                    substitution: [[[F]]]
+""".strip()
+
+iterDecompile2_dump = """
+Feature: TST1
+    Script: DFLT
+        Language: None
+            Include Default: True
+            Lookup: TST1_1
+                LookupFlag:
+                    rightToLeft: False
+                    ignoreBaseGlyphs: False
+                    ignoreLigatures: False
+                    ignoreMarks: False
+                    markAttachmentType: False
+                GSUBSubtable Type 1:
+                    backtrack: []
+                    lookahead: []
+                    target: [[[A]]]
+                    substitution: [[[B]]]
+            Lookup: TST1_2
+                LookupFlag:
+                    rightToLeft: False
+                    ignoreBaseGlyphs: False
+                    ignoreLigatures: False
+                    ignoreMarks: False
+                    markAttachmentType: False
+                GSUBSubtable Type 1:
+                    backtrack: []
+                    lookahead: []
+                    target: [[[C]]]
+                    substitution: [[[D]]]
+""".strip()
+
+# ---------
+# Filtering
+# ---------
+
+filterScriptsLanguages1_fea = compressFeatureDefaultLanguageLookups2_fea
+
+filterScriptsLanguages1_dump = """
+LanguageSystem: latn None
+Feature: TST1
+    Script: latn
+        Language: None
+            Include Default: True
+            Lookup: TST1_1
+                LookupFlag:
+                    rightToLeft: False
+                    ignoreBaseGlyphs: False
+                    ignoreLigatures: False
+                    ignoreMarks: False
+                    markAttachmentType: False
+                GSUBSubtable Type 1:
+                    backtrack: []
+                    lookahead: []
+                    target: [[[A]]]
+                    substitution: [[[B]]]
+            Lookup: TST1_2
+                LookupFlag:
+                    rightToLeft: False
+                    ignoreBaseGlyphs: False
+                    ignoreLigatures: False
+                    ignoreMarks: False
+                    markAttachmentType: False
+                GSUBSubtable Type 1:
+                    backtrack: []
+                    lookahead: []
+                    target: [[[C]]]
+                    substitution: [[[D]]]
+""".strip()
+
+# -----------------
+# Fea Syntax Parser
+# -----------------
+
+parseNamedScript1_fea = """
+languagesystem DFLT dflt;
+languagesystem latn dflt;
+languagesystem latn TRK;
+languagesystem cyrl dflt;
+feature liga {
+    sub A by B;
+    script latn;
+    sub C by D;
+} liga;
+""".strip()
+
+parseNamedScript1_dump = """
+LanguageSystem: DFLT None
+LanguageSystem: cyrl None
+LanguageSystem: latn None
+LanguageSystem: latn TRK
+Feature: liga
+    Script: DFLT
+        Language: None
+            Include Default: True
+            Lookup: liga_1
+                LookupFlag:
+                    rightToLeft: False
+                    ignoreBaseGlyphs: False
+                    ignoreLigatures: False
+                    ignoreMarks: False
+                    markAttachmentType: False
+                GSUBSubtable Type 1:
+                    backtrack: []
+                    lookahead: []
+                    target: [[[A]]]
+                    substitution: [[[B]]]
+    Script: cyrl
+        Language: None
+            Include Default: True
+    Script: latn
+        Language: None
+            Include Default: True
+            Lookup: liga_2
+                LookupFlag:
+                    rightToLeft: False
+                    ignoreBaseGlyphs: False
+                    ignoreLigatures: False
+                    ignoreMarks: False
+                    markAttachmentType: False
+                GSUBSubtable Type 1:
+                    backtrack: []
+                    lookahead: []
+                    target: [[[C]]]
+                    substitution: [[[D]]]
+        Language: TRK
+            Include Default: False
+            Lookup Reference: liga_1
+""".strip()
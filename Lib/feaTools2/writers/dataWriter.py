@@ -0,0 +1,88 @@
+from feaTools2.writers.abstractWriter import AbstractWriter
+
+
+class DataWriter(AbstractWriter):
+
+    """
+    Record the writer calls as nested lists and tuples of
+    strings, numbers, booleans and None. The data is compact,
+    it can be stored with marshal and it can be played back
+    into any writer with feaTools2.parsers.dataParser.
+    """
+
+    def __init__(self):
+        self._data = []
+
+    def getData(self):
+        return self._data
+
+    def _plainSequence(self, sequence):
+        return [list(group) for group in sequence]
+
+    # file reference
+
+    def addFileReference(self, path):
+        self._data.append(("addFileReference", path))
+
+    # language system
+
+    def addLanguageSystem(self, script, language):
+        self._data.append(("addLanguageSystem", script, language))
+
+    # script
+
+    def addScript(self, name):
+        self._data.append(("addScript", name))
+
+    # language
+
+    def addLanguage(self, name, includeDefault=True):
+        self._data.append(("addLanguage", name, includeDefault))
+
+    # class definitiion
+
+    def addClassDefinition(self, name, members):
+        self._data.append(("addClassDefinition", name, list(members)))
+
+    # feature
+
+    def addFeature(self, name):
+        writer = self.__class__()
+        self._data.append(("addFeature", name, writer._data))
+        return writer
+
+    # lookup
+
+    def addLookup(self, name):
+        writer = self.__class__()
+        self._data.append(("addLookup", name, writer._data))
+        return writer
+
+    # lookup flag
+
+    def addLookupFlag(self, rightToLeft=False, ignoreBaseGlyphs=False, ignoreLigatures=False, ignoreMarks=False, markAttachmentType=None):
+        self._data.append(("addLookupFlag", rightToLeft, ignoreBaseGlyphs, ignoreLigatures, ignoreMarks, markAttachmentType))
+
+    # feature reference
+
+    def addFeatureReference(self, name):
+        self._data.append(("addFeatureReference", name))
+
+    # lookup reference
+
+    def addLookupReference(self, name):
+        self._data.append(("addLookupReference", name))
+
+    # GSUB
+
+    def addGSUBSubtable(self, target, substitution, type, backtrack=[], lookahead=[]):
+        target = [self._plainSequence(sequence) for sequence in target]
+        substitution = [self._plainSequence(sequence) for sequence in substitution]
+        backtrack = self._plainSequence(backtrack)
+        lookahead = self._plainSequence(lookahead)
+        self._data.append(("addGSUBSubtable", target, substitution, type, backtrack, lookahead))
+
+    # GPOS
+
+    def addGPOSSubtable(self, target, positioning, backtrack=[], lookahead=[], type=None):
+        raise NotImplementedError
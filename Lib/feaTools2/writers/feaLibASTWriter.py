@@ -0,0 +1,234 @@
+"""
+Build a fontTools.feaLib.ast.FeatureFile from the writer API.
+
+    writer = FeaLibASTWriter()
+    table.write(writer)
+    featureFile = writer.getFeatureFile()
+    Builder(font, featureFile).build()
+
+The statements are the ones that the feaLib parser makes from
+the text of FeaSyntaxWriter, so the feature file can be merged
+with parsed features or built without the text being written
+and parsed again. Lookups without a name are given one since
+feaLib needs it. includeDefault is written as exclude_dflt.
+
+Like FeaSyntaxWriter with filterRedundancies, a script or
+language is only written when lookups follow it. The lookups
+of a DFLT script that comes first in a feature are written
+before any script statement, so feaLib registers them for all
+of the language systems. The languages that include the default
+lookups shouldn't list them again, so the table should be
+compressed.
+"""
+
+from fontTools.feaLib import ast
+from feaTools2 import FeaToolsError
+from feaTools2.writers.abstractWriter import AbstractWriter
+from feaTools2.writers.otTablesWriter import lookupFlagValue, padTag
+
+
+class FeaLibASTWriter(AbstractWriter):
+
+    def __init__(self):
+        self._block = ast.FeatureFile()
+        self._featureName = None
+        self._classes = {}
+        # the lookup blocks are shared by all of the writers
+        self._lookups = {}
+        self._lookupCounter = [0]
+        # the script and language statements that are
+        # waiting for a lookup
+        self._pendingScript = None
+        self._pendingLanguage = None
+        self._hasLookup = False
+
+    def getFeatureFile(self):
+        return self._block
+
+    def _makeWriter(self, block):
+        writer = self.__class__()
+        writer._block = block
+        writer._featureName = self._featureName
+        writer._classes = dict(self._classes)
+        writer._lookups = self._lookups
+        writer._lookupCounter = self._lookupCounter
+        return writer
+
+    # glyphs
+
+    def _makeGlyphExpression(self, members, forceClass=False):
+        # a glyph, @class or [a b @class]
+        if len(members) == 1:
+            member = members[0]
+            if member.startswith("@"):
+                return ast.GlyphClassName(self._getClassDefinition(member))
+            if not forceClass:
+                return ast.GlyphName(member)
+        glyphClass = ast.GlyphClass()
+        for member in members:
+            if member.startswith("@"):
+                glyphClass.add_class(ast.GlyphClassName(self._getClassDefinition(member)))
+            else:
+                glyphClass.append(member)
+        return glyphClass
+
+    def _makeGlyphExpressions(self, sequence):
+        return [self._makeGlyphExpression(members) for members in sequence]
+
+    def _getClassDefinition(self, name):
+        if name not in self._classes:
+            raise FeaToolsError("Unknown class %s." % name)
+        return self._classes[name]
+
+    # file reference
+
+    def addFileReference(self, path):
+        self._block.statements.append(ast.IncludeStatement(path))
+
+    # language system
+
+    def addLanguageSystem(self, script, language):
+        if language is None:
+            language = "dflt"
+        self._block.statements.append(ast.LanguageSystemStatement(padTag(script), padTag(language)))
+
+    # script
+
+    def addScript(self, name):
+        # aalt special handling
+        if self._featureName == "aalt":
+            return
+        self._pendingScript = name
+        self._pendingLanguage = None
+
+    # language
+
+    def addLanguage(self, name, includeDefault=True):
+        # aalt special handling
+        if self._featureName == "aalt":
+            return
+        self._pendingLanguage = (name, includeDefault)
+        # a language that excludes the default
+        # lookups is needed even without lookups
+        if not includeDefault:
+            self._writeScriptAndLanguage()
+
+    def _writeScriptAndLanguage(self):
+        statements = self._block.statements
+        script = self._pendingScript
+        language = self._pendingLanguage
+        self._pendingScript = None
+        self._pendingLanguage = None
+        # the DFLT script is the default before any lookups
+        if script == "DFLT" and not self._hasLookup:
+            script = None
+        if script is not None:
+            statements.append(ast.ScriptStatement(padTag(script)))
+        if language is not None:
+            name, includeDefault = language
+            # a script starts with the default language
+            if name is None and includeDefault and (script is not None or not self._hasLookup):
+                return
+            if name is None:
+                name = "dflt"
+            statements.append(ast.LanguageStatement(padTag(name), include_default=includeDefault))
+
+    def _willWriteLookup(self):
+        if self._pendingScript is not None or self._pendingLanguage is not None:
+            self._writeScriptAndLanguage()
+        self._hasLookup = True
+
+    # class definition
+
+    def addClassDefinition(self, name, members):
+        definition = ast.GlyphClassDefinition(name[1:], self._makeGlyphExpression(members, forceClass=True))
+        self._classes[name] = definition
+        self._block.statements.append(definition)
+
+    # feature
+
+    def addFeature(self, name):
+        block = ast.FeatureBlock(padTag(name))
+        self._block.statements.append(block)
+        writer = self._makeWriter(block)
+        writer._featureName = name
+        return writer
+
+    # lookup
+
+    def addLookup(self, name):
+        # aalt special handling
+        if self._featureName == "aalt":
+            return self
+        # feaLib can't refer to a lookup without a name
+        if name is None:
+            self._lookupCounter[0] += 1
+            name = "lookup%d" % self._lookupCounter[0]
+        self._willWriteLookup()
+        block = ast.LookupBlock(name)
+        self._lookups[name] = block
+        self._block.statements.append(block)
+        return self._makeWriter(block)
+
+    # lookup flag
+
+    def addLookupFlag(self, rightToLeft=False, ignoreBaseGlyphs=False, ignoreLigatures=False, ignoreMarks=False, markAttachmentType=None):
+        # aalt special handling
+        if self._featureName == "aalt":
+            return
+        if markAttachmentType:
+            raise FeaToolsError("The lookup flag markAttachmentType can not be written.")
+        value = lookupFlagValue(rightToLeft, ignoreBaseGlyphs, ignoreLigatures, ignoreMarks)
+        self._block.statements.append(ast.LookupFlagStatement(value))
+
+    # feature reference
+
+    def addFeatureReference(self, name):
+        self._block.statements.append(ast.FeatureReferenceStatement(padTag(name)))
+
+    # lookup reference
+
+    def addLookupReference(self, name):
+        # aalt special handling
+        if self._featureName == "aalt":
+            raise FeaToolsError("Lookup references are not allowed in the aalt feature.")
+        if name not in self._lookups:
+            raise FeaToolsError("Unknown lookup %s." % name)
+        self._willWriteLookup()
+        self._block.statements.append(ast.LookupReferenceStatement(self._lookups[name]))
+
+    # GSUB
+
+    def addGSUBSubtable(self, target, substitution, type, backtrack=[], lookahead=[]):
+        if type not in (1, 3, 4, 6):
+            raise FeaToolsError("GSUB lookup type %s can not be written." % type)
+        self._willWriteLookup()
+        prefix = self._makeGlyphExpressions(backtrack)
+        suffix = self._makeGlyphExpressions(lookahead)
+        statements = self._block.statements
+        for index, targetSequence in enumerate(target):
+            glyphs = self._makeGlyphExpressions(targetSequence)
+            # ignore sub a b' c;
+            if index >= len(substitution):
+                statements.append(ast.IgnoreSubstStatement([(prefix, glyphs, suffix)]))
+            # sub a from [a.alt1 a.alt2];
+            elif type == 3:
+                replacement = self._makeGlyphExpression(substitution[index][0], forceClass=True)
+                statements.append(ast.AlternateSubstStatement([], glyphs[0], [], replacement))
+            else:
+                replacements = self._makeGlyphExpressions(substitution[index])
+                statements.append(self._makeSubstitution(prefix, glyphs, suffix, replacements, type == 6))
+
+    def _makeSubstitution(self, prefix, glyphs, suffix, replacements, forceChain):
+        # sub a by b; sub [a b] by c; and sub [a b] by [c d];
+        if len(glyphs) == 1 and len(replacements) == 1:
+            return ast.SingleSubstStatement(glyphs, replacements, prefix, suffix, forceChain)
+        # sub a by b c;
+        if len(glyphs) == 1 and len(glyphs[0].glyphSet()) == 1 and len(replacements) > 1:
+            if max([len(replacement.glyphSet()) for replacement in replacements]) == 1:
+                replacements = tuple([replacement.glyphSet()[0] for replacement in replacements])
+                return ast.MultipleSubstStatement(prefix, glyphs[0].glyphSet()[0], suffix, replacements, forceChain=forceChain)
+        # sub f i by f_i;
+        if len(glyphs) > 1 and len(replacements) == 1 and len(replacements[0].glyphSet()) == 1:
+            return ast.LigatureSubstStatement(prefix, glyphs, suffix, replacements[0].glyphSet()[0], forceChain)
+        raise FeaToolsError("The substitution of %d glyphs by %d glyphs can not be written." % (len(glyphs), len(replacements)))
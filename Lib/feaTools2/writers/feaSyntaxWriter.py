@@ -11,13 +11,31 @@ defaultLookupFlag = dict(
 )
 
 
+def isLookupOrSubtable(identifier):
+    # lookups, lookup references and lookup flags
+    return identifier.startswith("addLookup") or identifier in ("addGSUBSubtable", "addGPOSSubtable")
+
+
+def lookupFlagFromItem(item):
+    flag = dict(item)
+    del flag["identifier"]
+    return flag
+
+
 needSpaceBefore = "addFeature addLookup addScript addLanguage setLookupReference".split(" ")
 needSpaceAfter = "addFeature addLookup addScript addLanguage setLookupReference".split(" ")
 
 
 class FeaSyntaxWriter(AbstractWriter):
 
-    def __init__(self, whitespace="\t", filterRedundancies=False):
+    def __init__(self, whitespace="\t", filterRedundancies=False, stream=None):
+        """
+        stream is an optional file-like object. Each top level
+        feature and lookup is written to it as soon as it is
+        complete. Call finish after everything has been added.
+        The text in the stream is the same as the text that
+        write would return.
+        """
         self._featureName = None
         self._whitespace = whitespace
         self._indent = 0
@@ -26,28 +44,48 @@ class FeaSyntaxWriter(AbstractWriter):
         self._text = []
         self._identifierStack = []
         self._initialLookupFlag = defaultLookupFlag
+        self._currentLookupFlag = None
         self._inScript = False
         self._inLanguage = False
+        # streaming
+        self._stream = stream
+        self._streamStarted = False
+        # the number of content items that
+        # have been written to the stream
+        self._streamedContent = 0
+        # scripts, languages and lookup flags can only be
+        # filtered once the whole scope is known, so they
+        # stop the streaming of the filtered content
+        self._canStream = True
 
     # ------
     # Output
     # ------
 
     def write(self):
+        return "\n".join(self.iterWrite())
+
+    def iterWrite(self):
+        """
+        Yield the lines of the text one at a time.
+        The lines are joined with newlines by write.
+        """
         if self._filter:
             self._preWrite()
-        text = self._basicWrite()
-        return "\n".join(text)
+        for line in self._iterLines():
+            yield line
+        for line in self._handleFinalBreak():
+            yield line
 
-    def _basicWrite(self):
-        text = []
+    def _iterLines(self):
         for item in self._text:
             if isinstance(item, self.__class__):
-                text += item._basicWrite()
+                for line in item._iterLines():
+                    yield line
+                for line in item._handleFinalBreak():
+                    yield line
             else:
-                text.append(item)
-        text += self._handleFinalBreak()
-        return text
+                yield item
 
     def _preWrite(self):
         # filter
@@ -56,33 +94,74 @@ class FeaSyntaxWriter(AbstractWriter):
         self._inScript = False
         self._inLanguage = False
         # write
-        for item in self._content:
-            kwargs = dict(item)
-            identifier = kwargs.pop("identifier")
-            if identifier in ("addFeature", "addLookup"):
-                # set the indent level based on the current scope
-                writer = kwargs["writer"]
-                if identifier == "addFeature":
+        for item in self._content[self._streamedContent:]:
+            self._preWriteItem(item)
+
+    def _preWriteItem(self, item):
+        kwargs = dict(item)
+        identifier = kwargs.pop("identifier")
+        if identifier in ("addFeature", "addLookup"):
+            # set the indent level based on the current scope
+            writer = kwargs["writer"]
+            if identifier == "addFeature":
+                writer._indent = self._indentLevel() + 1
+            elif identifier == "addLookup":
+                if item["writeLookupTag"]:
                     writer._indent = self._indentLevel() + 1
-                elif identifier == "addLookup":
-                    if item["writeLookupTag"]:
-                        writer._indent = self._indentLevel() + 1
-                    else:
-                        writer._indent = self._indentLevel()
-                # if adding a feature, skim through the contents to see
-                # if an initial lookup container is needed
-                if identifier == "addFeature":
-                    subLookups = []
-                    for otherItem in writer._content:
-                        if otherItem["identifier"] == "addLookup":
-                            subLookups.append(otherItem)
-                    if len(subLookups) == 1:
-                        otherItem = subLookups[-1]
-                        otherItem["writeLookupTag"] = False
-                writer._preWrite()
-            methodName = "_" + identifier
-            method = getattr(self, methodName)
-            method(**kwargs)
+                else:
+                    writer._indent = self._indentLevel()
+            # if adding a feature, skim through the contents to see
+            # if an initial lookup container is needed
+            if identifier == "addFeature":
+                subLookups = []
+                for otherItem in writer._content:
+                    if otherItem["identifier"] == "addLookup":
+                        subLookups.append(otherItem)
+                if len(subLookups) == 1:
+                    otherItem = subLookups[-1]
+                    otherItem["writeLookupTag"] = False
+            writer._preWrite()
+        methodName = "_" + identifier
+        method = getattr(self, methodName)
+        method(**kwargs)
+
+    # streaming
+
+    def _flush(self):
+        # everything that has been added before a new
+        # feature or lookup is complete
+        if self._stream is None:
+            return
+        if self._filter:
+            if not self._canStream:
+                return
+            for item in self._content[self._streamedContent:]:
+                self._preWriteItem(item)
+                # the item is kept for the filtering
+                # of the content that follows it
+                if "writer" in item:
+                    item["writer"] = None
+            self._streamedContent = len(self._content)
+        self._writeToStream(self._iterLines())
+        self._text = []
+
+    def finish(self):
+        """
+        Write the rest of the text to the stream.
+        """
+        if self._filter:
+            self._preWrite()
+        self._writeToStream(self._iterLines())
+        self._writeToStream(self._handleFinalBreak())
+        self._text = []
+
+    def _writeToStream(self, lines):
+        stream = self._stream
+        for line in lines:
+            if self._streamStarted:
+                line = "\n" + line
+            stream.write(line)
+            self._streamStarted = True
 
     # white space
 
@@ -132,106 +211,79 @@ class FeaSyntaxWriter(AbstractWriter):
     # ---------
 
     def _filterContent(self):
-        self._newContent = []
-        while self._content:
-            item = self._content.pop(0)
+        # whether a script or language is needed depends on
+        # the items that follow it, so the index of the next
+        # lookup or subtable and of the next script is found
+        # for every item in one pass from the end.
+        content = self._content
+        nextLookup = [None] * len(content)
+        nextScript = [None] * len(content)
+        lookupIndex = None
+        scriptIndex = None
+        for index in reversed(range(len(content))):
+            nextLookup[index] = lookupIndex
+            nextScript[index] = scriptIndex
+            identifier = content[index]["identifier"]
+            if isLookupOrSubtable(identifier):
+                lookupIndex = index
+            elif identifier == "addScript":
+                scriptIndex = index
+        # whether a script is needed and the current lookup
+        # flag depend on the items that have been kept, so
+        # they are updated as the items are kept.
+        newContent = []
+        keptLookup = False
+        currentFlag = self._initialLookupFlag
+        for index, item in enumerate(content):
             identifier = item["identifier"]
             # script
             if identifier == "addScript":
-                item = self._filterScript(item)
+                item = self._filterScript(item, keptLookup, nextLookup[index], nextScript[index])
             # language
             elif identifier == "addLanguage":
-                item = self._filterLanguage(item)
+                item = self._filterLanguage(item, nextLookup[index], nextScript[index])
             # lookup flag
             elif identifier == "addLookupFlag":
-                item = self._filterLookupFlag(item)
+                item = self._filterLookupFlag(item, currentFlag)
             # store
-            if item is not None:
-                self._newContent.append(item)
-        self._content = self._newContent
-        del self._newContent
-
-    def _filterScript(self, item):
-        needScript = False
-        while not needScript:
-            # write DFLT only if the script is being
-            # declared after a lookup or subtable
-            if item["name"] == "DFLT":
-                needScript = False
-                for otherItem in self._newContent:
-                    identifier = otherItem["identifier"]
-                    # lookup
-                    if identifier.startswith("addLookup"):
-                        needScript = True
-                    # subtable
-                    elif identifier == "addGSUBSubtable":
-                        needScript = True
-                    elif identifier == "addGPOSSubtable":
-                        needScript = True
-                break
-            # don't write the script if no lookups or subtables are
-            # between this script and the end of the scope
-            # or another script declaration.
-            else:
-                for otherItem in self._content:
-                    identifier = otherItem["identifier"]
-                    # lookup or lookup reference
-                    if identifier.startswith("addLookup"):
-                        needScript = True
-                    # subtable
-                    elif identifier == "addGSUBSubtable":
-                        needScript = True
-                    elif identifier == "addGPOSSubtable":
-                        needScript = True
-                    # script
-                    elif identifier == "addScript":
-                        needScript = False
-                        break
-                break
+            if item is None:
+                continue
+            newContent.append(item)
+            if isLookupOrSubtable(identifier):
+                keptLookup = True
+            if identifier == "addLookupFlag":
+                currentFlag = lookupFlagFromItem(item)
+            elif identifier == "addScript":
+                currentFlag = defaultLookupFlag
+        self._content = newContent
+
+    def _filterScript(self, item, keptLookup, nextLookup, nextScript):
+        # write DFLT only if the script is being
+        # declared after a lookup or subtable
+        if item["name"] == "DFLT":
+            needScript = keptLookup
+        # don't write the script if no lookups or subtables are
+        # between this script and the end of the scope.
+        # a script that is followed by another script
+        # declaration is not written either.
+        else:
+            needScript = nextScript is None and nextLookup is not None
         if needScript:
             return item
 
-    def _filterLanguage(self, item):
-        needLanguage = False
-        while not needLanguage:
-            # write dflt only if the language is being
-            # declared after a lookup or subtable
-            if item["name"] is None:
-                needScript = False
-                for otherItem in self._newContent:
-                    identifier = otherItem["identifier"]
-                    # script
-                    # if a script occurs before any of the above,
-                    # the language is not needed
-                    if identifier == "addScript":
-                        needLanguage = False
-                        break
-                break
-            # don't write the language if no lookups or subtables are
-            # between this script and the end of the scope
-            # or another language declaration.
-            else:
-                for otherItem in self._content:
-                    identifier = otherItem["identifier"]
-                    # lookup or lookup reference
-                    if identifier.startswith("addLookup"):
-                        needLanguage = True
-                    # subtable
-                    elif identifier == "addGSUBSubtable":
-                        needLanguage = True
-                    elif identifier == "addGPOSSubtable":
-                        needLanguage = True
-                    # script
-                    elif identifier == "addScript":
-                        needLanguage = True
-                break
+    def _filterLanguage(self, item, nextLookup, nextScript):
+        # the default language is not written
+        if item["name"] is None:
+            needLanguage = False
+        # don't write the language if no lookups, subtables
+        # or scripts follow it in the scope
+        else:
+            needLanguage = nextLookup is not None or nextScript is not None
         if needLanguage:
             return item
 
-    def _filterLookupFlag(self, item):
-        currentFlag = self._findCurrentLookupFlag(self._newContent)
-        newFlag = dict(item)
-        del newFlag["identifier"]
+    def _filterLookupFlag(self, item, currentFlag):
+        newFlag = lookupFlagFromItem(item)
         if newFlag == currentFlag:
             return None
         return item
@@ -304,6 +356,8 @@ class FeaSyntaxWriter(AbstractWriter):
             name=name
         )
         self._content.append(d)
+        self._canStream = False
+        self._currentLookupFlag = defaultLookupFlag
         # shift the indents
         self._inScript = True
         self._inLanguage = False
@@ -340,6 +394,7 @@ class FeaSyntaxWriter(AbstractWriter):
             includeDefault=includeDefault
         )
         self._content.append(d)
+        self._canStream = False
         # shift the indents
         self._inLanguage = True
 
@@ -386,6 +441,7 @@ class FeaSyntaxWriter(AbstractWriter):
     # feature
 
     def addFeature(self, name):
+        self._flush()
         writer = self.__class__(whitespace=self._whitespace, filterRedundancies=self._filter)
         writer._featureName = name
         writer._indent = self._indent + 1
@@ -420,6 +476,7 @@ class FeaSyntaxWriter(AbstractWriter):
         # aalt special handling
         if self._featureName == "aalt":
             return self
+        self._flush()
         # make a writer
         writer = self.__class__(whitespace=self._whitespace, filterRedundancies=self._filter)
         writer._indent = self._indentLevel() + 1
@@ -428,7 +485,7 @@ class FeaSyntaxWriter(AbstractWriter):
             self._addLookup(name, writer, True)
             return writer
         # filter
-        writer._initialLookupFlag = self._findCurrentLookupFlag(self._content)
+        writer._initialLookupFlag = self._findCurrentLookupFlag()
         d = dict(
             identifier="addLookup",
             name=name,
@@ -455,16 +512,12 @@ class FeaSyntaxWriter(AbstractWriter):
 
     # lookup flag
 
-    def _findCurrentLookupFlag(self, content):
-        for item in reversed(content):
-            identifier = item["identifier"]
-            if identifier == "addLookupFlag":
-                d = dict(item)
-                del d["identifier"]
-                return d
-            elif identifier == "addScript":
-                return defaultLookupFlag
-        return self._initialLookupFlag
+    def _findCurrentLookupFlag(self):
+        # the flag of the last lookup flag or script
+        # that has been added to the content
+        if self._currentLookupFlag is None:
+            return self._initialLookupFlag
+        return self._currentLookupFlag
 
     def addLookupFlag(self, rightToLeft=False, ignoreBaseGlyphs=False, ignoreLigatures=False, ignoreMarks=False, markAttachmentType=None):
         # aalt special handling
@@ -486,6 +539,8 @@ class FeaSyntaxWriter(AbstractWriter):
             markAttachmentType=markAttachmentType
         )
         self._content.append(d)
+        self._canStream = False
+        self._currentLookupFlag = lookupFlagFromItem(d)
 
     def _addLookupFlag(self, rightToLeft=False, ignoreBaseGlyphs=False, ignoreLigatures=False, ignoreMarks=False, markAttachmentType=None):
         self._handleBreakBefore("addLookupFlag")
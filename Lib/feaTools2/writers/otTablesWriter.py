@@ -0,0 +1,532 @@
+"""
+Build a fontTools GSUB table from the writer API.
+
+    writer = OTTablesWriter(font.getGlyphOrder())
+    table.write(writer)
+    font["GSUB"] = writer.getTable()
+
+The lookups are put in the lookup list in the order in which
+they are first written, like SubstitutionEngine. A language
+uses its own lookups, the lookups of the default language of
+its script and the lookups of the default script and language
+when includeDefault is set. Lookups and coverage tables with
+identical contents are only built once.
+
+GSUB lookup types 1, 3, 4 and 6 are supported. Each rule of a
+contextual subtable is compiled to a format 3 chaining context
+subtable that points to a nested single, multiple or ligature
+substitution lookup. The single and multiple substitutions of
+a lookup share nested lookups when they don't conflict. The
+nested lookups are put after all of the other lookups.
+
+The decompiler only records whether a lookup had a mark
+attachment type, so it is only compiled if it is a number.
+A FeaToolsError is raised for any other mark attachment type.
+"""
+
+from itertools import product
+from feaTools2 import FeaToolsError
+from feaTools2.objects import expandGroup, isPositional
+from feaTools2.writers.abstractWriter import AbstractWriter
+
+supportedTypes = (1, 3, 4, 6)
+
+
+def lookupFlagValue(rightToLeft=False, ignoreBaseGlyphs=False, ignoreLigatures=False, ignoreMarks=False, markAttachmentType=None):
+    value = 0
+    if rightToLeft:
+        value |= 0x0001
+    if ignoreBaseGlyphs:
+        value |= 0x0002
+    if ignoreLigatures:
+        value |= 0x0004
+    if ignoreMarks:
+        value |= 0x0008
+    if markAttachmentType:
+        # the decompiler records True instead of the class number
+        if isinstance(markAttachmentType, bool) or not isinstance(markAttachmentType, int) or markAttachmentType > 0xFF:
+            raise FeaToolsError("The lookup flag markAttachmentType can not be compiled.")
+        value |= markAttachmentType << 8
+    return value
+
+
+def expandSequence(sequence, classes):
+    return tuple([tuple(expandGroup(group, classes)) for group in sequence])
+
+
+def padTag(tag):
+    return tag.ljust(4)
+
+
+class OTTablesWriter(AbstractWriter):
+
+    def __init__(self, glyphOrder):
+        """
+        glyphOrder is the glyph order of the font that the
+        table will be compiled in. It is needed to sort the
+        glyphs in the coverage tables.
+        """
+        self._glyphIDs = dict([(glyphName, index) for index, glyphName in enumerate(glyphOrder)])
+        self._classes = {}
+        self._lookups = []
+        self._namedLookups = {}
+        self._features = []
+
+    # writer API
+
+    def addLanguageSystem(self, script, language):
+        # the language systems are defined by the features
+        pass
+
+    def addClassDefinition(self, name, members):
+        self._classes[name] = list(members)
+
+    def addFeature(self, name):
+        feature = FeatureWriter(self, name)
+        self._features.append(feature)
+        return feature
+
+    def addLookup(self, name):
+        return self._addLookup(name, self._classes)
+
+    def _addLookup(self, name, classes):
+        lookup = LookupWriter(name, classes)
+        self._lookups.append(lookup)
+        if name is not None and name not in self._namedLookups:
+            self._namedLookups[name] = lookup
+        return lookup
+
+    # table
+
+    def getTable(self):
+        """
+        Get a fontTools GSUB table object.
+        """
+        from fontTools.ttLib import newTable
+        from fontTools.ttLib.tables import otTables
+        self._coverageCache = {}
+        self._nestedLookups = []
+        self._nestedLookupIndexes = {}
+        # lookups with identical contents share an index
+        lookupIndexes = {}
+        contentIndexes = {}
+        uniqueLookups = []
+        for lookup in self._lookups:
+            key = lookup._getContents()
+            if key not in contentIndexes:
+                contentIndexes[key] = len(uniqueLookups)
+                uniqueLookups.append(lookup)
+            lookupIndexes[id(lookup)] = contentIndexes[key]
+        self._lookupCount = len(uniqueLookups)
+        lookups = [self._buildLookup(lookup) for lookup in uniqueLookups]
+        lookups += self._nestedLookups
+        # features
+        featureRecords = []
+        languageFeatures = {}
+        for feature in self._features:
+            for scriptTag, languageTag, languageLookups in feature._getLanguageLookups():
+                indexes = set()
+                for lookup in languageLookups:
+                    if not isinstance(lookup, LookupWriter):
+                        if lookup not in self._namedLookups:
+                            raise FeaToolsError("Unknown lookup %s." % lookup)
+                        lookup = self._namedLookups[lookup]
+                    indexes.add(lookupIndexes[id(lookup)])
+                featureRecord = (feature.tag, tuple(sorted(indexes)))
+                featureRecords.append(featureRecord)
+                key = (scriptTag, languageTag)
+                if key not in languageFeatures:
+                    languageFeatures[key] = []
+                languageFeatures[key].append(featureRecord)
+        # features with identical lookups are shared
+        featureIndexes = {}
+        featureList = otTables.FeatureList()
+        featureList.FeatureRecord = []
+        for featureRecord in sorted(set(featureRecords)):
+            featureTag, indexes = featureRecord
+            featureIndexes[featureRecord] = len(featureList.FeatureRecord)
+            record = otTables.FeatureRecord()
+            record.FeatureTag = padTag(featureTag)
+            record.Feature = otTables.Feature()
+            record.Feature.FeatureParams = None
+            record.Feature.LookupListIndex = list(indexes)
+            record.Feature.LookupCount = len(indexes)
+            featureList.FeatureRecord.append(record)
+        featureList.FeatureCount = len(featureList.FeatureRecord)
+        # scripts
+        scripts = {}
+        for (scriptTag, languageTag), records in languageFeatures.items():
+            langSys = otTables.LangSys()
+            langSys.LookupOrder = None
+            langSys.ReqFeatureIndex = 0xFFFF
+            langSys.FeatureIndex = sorted(set([featureIndexes[record] for record in records]))
+            langSys.FeatureCount = len(langSys.FeatureIndex)
+            scriptTag = padTag(scriptTag)
+            if scriptTag not in scripts:
+                scripts[scriptTag] = {}
+            scripts[scriptTag][languageTag] = langSys
+        scriptList = otTables.ScriptList()
+        scriptList.ScriptRecord = []
+        for scriptTag, languages in sorted(scripts.items()):
+            script = otTables.Script()
+            script.DefaultLangSys = languages.pop(None, None)
+            script.LangSysRecord = []
+            for languageTag, langSys in sorted(languages.items()):
+                record = otTables.LangSysRecord()
+                record.LangSysTag = padTag(languageTag)
+                record.LangSys = langSys
+                script.LangSysRecord.append(record)
+            script.LangSysCount = len(script.LangSysRecord)
+            record = otTables.ScriptRecord()
+            record.ScriptTag = scriptTag
+            record.Script = script
+            scriptList.ScriptRecord.append(record)
+        scriptList.ScriptCount = len(scriptList.ScriptRecord)
+        # lookups
+        lookupList = otTables.LookupList()
+        lookupList.Lookup = lookups
+        lookupList.LookupCount = len(lookups)
+        # table
+        gsub = otTables.GSUB()
+        gsub.Version = 0x00010000
+        gsub.ScriptList = scriptList
+        gsub.FeatureList = featureList
+        gsub.LookupList = lookupList
+        table = newTable("GSUB")
+        table.table = gsub
+        del self._coverageCache
+        del self._nestedLookups
+        del self._nestedLookupIndexes
+        return table
+
+    # lookups
+
+    def _buildLookup(self, lookup):
+        flag, subtables = lookup._getContents()
+        types = set([subtable[0] for subtable in subtables])
+        if len(types) > 1:
+            raise FeaToolsError("Lookup %s contains more than one GSUB lookup type." % lookup.name)
+        if types:
+            type = types.pop()
+        else:
+            type = 1
+        if type not in supportedTypes:
+            raise FeaToolsError("GSUB lookup type %s can not be compiled." % type)
+        if type == 1:
+            builder = self._buildSingleSubst
+        elif type == 3:
+            builder = self._buildAlternateSubst
+        elif type == 4:
+            builder = self._buildLigatureSubst
+        else:
+            builder = self._buildChainContextSubst
+        # the nested lookups of the contextual rules
+        self._lookupNestedLookups = []
+        builtSubtables = []
+        for type, backtrack, lookahead, rules in subtables:
+            builtSubtables.extend(builder(flag, backtrack, lookahead, rules))
+        for nestedType, items, records in self._lookupNestedLookups:
+            index = self._getNestedLookupIndex(nestedType, flag, items)
+            for record in records:
+                record.LookupListIndex = index
+        del self._lookupNestedLookups
+        return self._makeLookup(type, flag, builtSubtables)
+
+    def _makeLookup(self, type, flag, subtables):
+        from fontTools.ttLib.tables import otTables
+        lookup = otTables.Lookup()
+        lookup.LookupType = type
+        lookup.LookupFlag = flag
+        lookup.SubTable = subtables
+        lookup.SubTableCount = len(subtables)
+        return lookup
+
+    def _addNestedSubstitution(self, record, targetSequence, substitutionSequence):
+        # sub [a b] by c; sub a by b c; and sub [a b] by [a.alt b.alt];
+        if len(targetSequence) == 1:
+            if isPositional(targetSequence, substitutionSequence):
+                items = [(t, (s,)) for t, s in zip(targetSequence[0], substitutionSequence[0])]
+            else:
+                substitutions = tuple([group[0] for group in substitutionSequence])
+                items = [(glyphName, substitutions) for glyphName in targetSequence[0]]
+            if all([len(substitutions) == 1 for glyphName, substitutions in items]):
+                type = 1
+            else:
+                type = 2
+            # the first rule for a glyph is used
+            mapping = {}
+            for glyphName, substitutions in items:
+                if glyphName not in mapping:
+                    mapping[glyphName] = substitutions
+            # the rules of a lookup share a nested lookup
+            # if their substitutions don't conflict
+            for nestedType, nestedMapping, records in self._lookupNestedLookups:
+                if nestedType != type:
+                    continue
+                for glyphName, substitutions in mapping.items():
+                    if nestedMapping.get(glyphName, substitutions) != substitutions:
+                        break
+                else:
+                    nestedMapping.update(mapping)
+                    records.append(record)
+                    return
+            self._lookupNestedLookups.append((type, mapping, [record]))
+        # sub f i by f_i;
+        # ligatures are not shared. a longer ligature from
+        # another rule would be matched before this one.
+        else:
+            ligature = substitutionSequence[0][0]
+            items = [(components, ligature) for components in product(*targetSequence)]
+            self._lookupNestedLookups.append((4, items, [record]))
+
+    def _getNestedLookupIndex(self, type, flag, items):
+        if type == 4:
+            key = (type, flag, tuple(items))
+        else:
+            items = sorted(items.items())
+            key = (type, flag, tuple(items))
+        if key not in self._nestedLookupIndexes:
+            if type == 1:
+                subtable = self._makeSingleSubst([(glyphName, substitutions[0]) for glyphName, substitutions in items])
+            elif type == 2:
+                subtable = self._makeMultipleSubst(items)
+            else:
+                subtable = self._makeLigatureSubst(items)
+            self._nestedLookupIndexes[key] = self._lookupCount + len(self._nestedLookups)
+            self._nestedLookups.append(self._makeLookup(type, flag, [subtable]))
+        return self._nestedLookupIndexes[key]
+
+    # subtables
+
+    def _buildSingleSubst(self, flag, backtrack, lookahead, rules):
+        items = []
+        for targetSequence, substitutionSequence in rules:
+            if not targetSequence or not substitutionSequence or not all(substitutionSequence):
+                continue
+            # sub [a b] by [a.alt b.alt];
+            if isPositional(targetSequence, substitutionSequence):
+                pairs = zip(targetSequence[0], substitutionSequence[0])
+            # sub [a b] by c;
+            else:
+                pairs = [(glyphName, substitutionSequence[0][0]) for glyphName in targetSequence[0]]
+            items.extend(pairs)
+        return [self._makeSingleSubst(items)]
+
+    def _makeSingleSubst(self, items):
+        from fontTools.ttLib.tables import otTables
+        # the first rule for a glyph is used
+        mapping = {}
+        for glyphName, substitution in items:
+            if glyphName not in mapping:
+                mapping[glyphName] = substitution
+        subtable = otTables.SingleSubst()
+        subtable.mapping = mapping
+        return subtable
+
+    def _buildAlternateSubst(self, flag, backtrack, lookahead, rules):
+        from fontTools.ttLib.tables import otTables
+        alternates = {}
+        for targetSequence, substitutionSequence in rules:
+            if not targetSequence or not substitutionSequence or not all(substitutionSequence):
+                continue
+            for glyphName in targetSequence[0]:
+                if glyphName not in alternates:
+                    alternates[glyphName] = list(substitutionSequence[0])
+        subtable = otTables.AlternateSubst()
+        subtable.alternates = alternates
+        return [subtable]
+
+    def _buildLigatureSubst(self, flag, backtrack, lookahead, rules):
+        items = []
+        for targetSequence, substitutionSequence in rules:
+            if not substitutionSequence or not all(substitutionSequence):
+                continue
+            ligature = substitutionSequence[0][0]
+            for components in product(*targetSequence):
+                items.append((components, ligature))
+        return [self._makeLigatureSubst(items)]
+
+    def _makeLigatureSubst(self, items):
+        from fontTools.ttLib.tables import otTables
+        # the first rule for the components is used and
+        # longer ligatures are matched before shorter ones
+        seen = set()
+        ligatures = {}
+        for components, ligatureGlyph in sorted(items, key=lambda item: -len(item[0])):
+            if not components or components in seen:
+                continue
+            seen.add(components)
+            ligature = otTables.Ligature()
+            ligature.LigGlyph = ligatureGlyph
+            ligature.Component = list(components[1:])
+            ligature.CompCount = len(components)
+            if components[0] not in ligatures:
+                ligatures[components[0]] = []
+            ligatures[components[0]].append(ligature)
+        subtable = otTables.LigatureSubst()
+        subtable.ligatures = ligatures
+        return subtable
+
+    def _makeMultipleSubst(self, items):
+        from fontTools.ttLib.tables import otTables
+        mapping = {}
+        for glyphName, substitutions in items:
+            if glyphName not in mapping:
+                mapping[glyphName] = list(substitutions)
+        subtable = otTables.MultipleSubst()
+        subtable.mapping = mapping
+        return subtable
+
+    def _buildChainContextSubst(self, flag, backtrack, lookahead, rules):
+        from fontTools.ttLib.tables import otTables
+        # a context with an empty group can never match
+        if not all(backtrack) or not all(lookahead):
+            return []
+        backtrackCoverage = [self._getCoverage(group) for group in reversed(backtrack)]
+        lookaheadCoverage = [self._getCoverage(group) for group in lookahead]
+        subtables = []
+        for targetSequence, substitutionSequence in rules:
+            if not targetSequence or not all(targetSequence):
+                continue
+            subtable = otTables.ChainContextSubst()
+            subtable.Format = 3
+            subtable.BacktrackCoverage = backtrackCoverage
+            subtable.BacktrackGlyphCount = len(backtrackCoverage)
+            subtable.InputCoverage = [self._getCoverage(group) for group in targetSequence]
+            subtable.InputGlyphCount = len(targetSequence)
+            subtable.LookAheadCoverage = lookaheadCoverage
+            subtable.LookAheadGlyphCount = len(lookaheadCoverage)
+            subtable.SubstLookupRecord = []
+            # ignore rules and substitutions that were
+            # emptied by glyph removal don't have a record
+            if substitutionSequence and all(substitutionSequence):
+                record = otTables.SubstLookupRecord()
+                record.SequenceIndex = 0
+                self._addNestedSubstitution(record, targetSequence, substitutionSequence)
+                subtable.SubstLookupRecord.append(record)
+            subtable.SubstCount = len(subtable.SubstLookupRecord)
+            subtables.append(subtable)
+        return subtables
+
+    def _getCoverage(self, group):
+        from fontTools.ttLib.tables import otTables
+        glyphIDs = self._glyphIDs
+        for glyphName in group:
+            if glyphName not in glyphIDs:
+                raise FeaToolsError("Unknown glyph %s." % glyphName)
+        glyphNames = tuple(sorted(set(group), key=glyphIDs.__getitem__))
+        coverage = self._coverageCache.get(glyphNames)
+        if coverage is None:
+            coverage = otTables.Coverage()
+            coverage.glyphs = list(glyphNames)
+            self._coverageCache[glyphNames] = coverage
+        return coverage
+
+
+class FeatureWriter(AbstractWriter):
+
+    def __init__(self, writer, tag):
+        self._writer = writer
+        self.tag = tag
+        # the feature classes are added to the table classes
+        self._classes = dict(writer._classes)
+        # script tag : language tag : [includeDefault, lookups]
+        self._scripts = {}
+        self._scriptOrder = []
+        self._currentScript = None
+        self._currentLanguage = None
+
+    def addClassDefinition(self, name, members):
+        self._classes[name] = list(members)
+
+    def addScript(self, name):
+        if name not in self._scripts:
+            self._scripts[name] = {}
+            self._scriptOrder.append(name)
+        self._currentScript = name
+        self._currentLanguage = None
+
+    def addLanguage(self, name, includeDefault=True):
+        if self._currentScript is None:
+            raise FeaToolsError("A script must be defined before adding a language.")
+        languages = self._scripts[self._currentScript]
+        if name not in languages:
+            languages[name] = [includeDefault, []]
+        self._currentLanguage = languages[name]
+
+    def addLookup(self, name):
+        lookups = self._getCurrentLookups("lookup")
+        lookup = self._writer._addLookup(name, self._classes)
+        lookups.append(lookup)
+        return lookup
+
+    def addLookupReference(self, name):
+        lookups = self._getCurrentLookups("lookup reference")
+        lookups.append(name)
+
+    def _getCurrentLookups(self, description):
+        if self._currentScript is None:
+            raise FeaToolsError("A script must be defined before adding a %s." % description)
+        if self._currentLanguage is None:
+            raise FeaToolsError("A language must be defined before adding a %s." % description)
+        return self._currentLanguage[1]
+
+    def _getLanguageLookups(self):
+        """
+        Get (scriptTag, languageTag, lookups) for each language.
+        The lookups are lookup writers and lookup names.
+        """
+        records = []
+        defaultLookups = []
+        if "DFLT" in self._scripts and None in self._scripts["DFLT"]:
+            defaultLookups = self._scripts["DFLT"][None][1]
+        for scriptTag in self._scriptOrder:
+            languages = self._scripts[scriptTag]
+            scriptDefaultLookups = []
+            if None in languages:
+                scriptDefaultLookups = languages[None][1]
+            for languageTag, (includeDefault, lookups) in languages.items():
+                lookups = list(lookups)
+                if languageTag is not None and includeDefault:
+                    lookups += scriptDefaultLookups
+                if scriptTag != "DFLT" and includeDefault:
+                    lookups += defaultLookups
+                records.append((scriptTag, languageTag, lookups))
+        return records
+
+
+class LookupWriter(AbstractWriter):
+
+    def __init__(self, name, classes):
+        self.name = name
+        self._classes = classes
+        self._flag = 0
+        self._subtables = []
+        self._contents = None
+
+    def addLookupFlag(self, rightToLeft=False, ignoreBaseGlyphs=False, ignoreLigatures=False, ignoreMarks=False, markAttachmentType=None):
+        self._flag = lookupFlagValue(rightToLeft, ignoreBaseGlyphs, ignoreLigatures, ignoreMarks, markAttachmentType)
+
+    def addGSUBSubtable(self, target, substitution, type, backtrack=[], lookahead=[]):
+        self._subtables.append((type, target, substitution, backtrack, lookahead))
+
+    def _getContents(self):
+        """
+        Get the flag and the subtables with the class references
+        expanded. This is also used to find identical lookups.
+        """
+        if self._contents is None:
+            classes = self._classes
+            subtables = []
+            for type, target, substitution, backtrack, lookahead in self._subtables:
+                rules = []
+                for index, targetSequence in enumerate(target):
+                    if index < len(substitution):
+                        substitutionSequence = expandSequence(substitution[index], classes)
+                    else:
+                        substitutionSequence = None
+                    rules.append((expandSequence(targetSequence, classes), substitutionSequence))
+                subtables.append((type, expandSequence(backtrack, classes), expandSequence(lookahead, classes), tuple(rules)))
+            self._contents = (self._flag, tuple(subtables))
+            self._subtables = None
+        return self._contents
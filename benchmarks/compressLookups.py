@@ -0,0 +1,62 @@
+"""
+Time lookup compression on synthetic tables.
+
+    python benchmarks/compressLookups.py 500 1000 2000 4000
+
+Each table has 30 features. The lookups are spread over the
+features and every third lookup also appears in a second
+feature, so there are lookups to promote to global lookups.
+"""
+
+import sys
+import time
+from feaTools2.objects import Table
+
+featureCount = 30
+
+
+def makeTable(lookupCount):
+    table = Table()
+    table.tag = "GSUB"
+    featureLookups = [[] for i in range(featureCount)]
+    for index in range(lookupCount):
+        featureLookups[index % featureCount].append(index)
+        if index % 3 == 0:
+            featureLookups[(index + 1) % featureCount].append(index)
+    for featureIndex, lookupIndexes in enumerate(featureLookups):
+        feature = table.addFeature("f%03d" % featureIndex)
+        feature.addScript("latn")
+        feature.addLanguage(None)
+        for index in lookupIndexes:
+            lookup = feature.addLookup(None)
+            target = [[["g%05d" % index, "h%05d" % index]]]
+            substitution = [[["g%05d.alt" % index, "h%05d.alt" % index]]]
+            lookup.addGSUBSubtable(target, substitution, 1)
+    return table
+
+
+def timeCompression(lookupCount, repeat=3):
+    best = None
+    for i in range(repeat):
+        table = makeTable(lookupCount)
+        start = time.time()
+        table._compressLookups()
+        duration = time.time() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    if not args:
+        args = ["500", "1000", "2000", "4000"]
+    for lookupCount in args:
+        lookupCount = int(lookupCount)
+        duration = timeCompression(lookupCount)
+        print("%6d lookups %8.3f seconds" % (lookupCount, duration))
+
+
+if __name__ == "__main__":
+    main()
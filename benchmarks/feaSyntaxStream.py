@@ -0,0 +1,74 @@
+"""
+Compare the peak memory of FeaSyntaxWriter.write
+with the streaming output of FeaSyntaxWriter.
+
+    python benchmarks/feaSyntaxStream.py 50 200
+
+Each table has the given number of features. Every feature
+has 50 lookups with a contextual substitution for 50 glyphs.
+Each mode is run in a separate process so that the peak
+resident memory can be compared. The text is written to
+the null device.
+"""
+
+import os
+import sys
+import time
+import resource
+import subprocess
+from feaTools2.objects import Table
+from feaTools2.writers.feaSyntaxWriter import FeaSyntaxWriter
+
+lookupCount = 50
+glyphCount = 50
+
+
+def makeTable(featureCount):
+    table = Table()
+    table.tag = "GSUB"
+    glyphNames = ["g%03d" % index for index in range(glyphCount)]
+    for featureIndex in range(featureCount):
+        feature = table.addFeature("f%03d" % featureIndex)
+        feature.addScript("latn")
+        feature.addLanguage(None)
+        for lookupIndex in range(lookupCount):
+            lookup = feature.addLookup("f%03d_%d" % (featureIndex, lookupIndex))
+            target = [[[glyphName]] for glyphName in glyphNames]
+            substitution = [[[glyphName + ".f%03d" % featureIndex]] for glyphName in glyphNames]
+            lookup.addGSUBSubtable(target, substitution, 6, backtrack=[glyphNames], lookahead=[glyphNames])
+    return table
+
+
+def run(featureCount, mode):
+    table = makeTable(featureCount)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    with open(os.devnull, "w") as f:
+        if mode == "write":
+            writer = FeaSyntaxWriter(filterRedundancies=True)
+            table.write(writer)
+            f.write(writer.write())
+        else:
+            writer = FeaSyntaxWriter(filterRedundancies=True, stream=f)
+            table.write(writer)
+            writer.finish()
+    duration = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("%5d features %-6s %8.3f seconds %8d KB over the table" % (featureCount, mode, duration, peak - baseline))
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    if len(args) == 2 and args[1] in ("write", "stream"):
+        run(int(args[0]), args[1])
+        return
+    if not args:
+        args = ["50", "200"]
+    for featureCount in args:
+        for mode in ("write", "stream"):
+            subprocess.check_call([sys.executable, __file__, featureCount, mode])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Time FeaSyntaxWriter with filterRedundancies on synthetic
+features.
+
+    python benchmarks/filterRedundancies.py 1000 4000 16000
+
+The argument is the number of languages in the feature.
+Each language has a lookup flag and a lookup reference,
+like the language specific lookups of a font that supports
+many languages.
+"""
+
+import sys
+import time
+from feaTools2.writers.feaSyntaxWriter import FeaSyntaxWriter
+
+
+def writeFeature(writer, languageCount):
+    feature = writer.addFeature("locl")
+    for index in range(languageCount):
+        if index % 100 == 0:
+            feature.addScript("s%03d" % (index // 100))
+        feature.addLanguage("L%03d" % (index % 100))
+        feature.addLookupFlag(ignoreMarks=bool(index % 2))
+        feature.addLookupReference("lookup%d" % index)
+
+
+def timeFiltering(languageCount, repeat=3):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        writer = FeaSyntaxWriter(filterRedundancies=True)
+        writeFeature(writer, languageCount)
+        writer.write()
+        duration = time.time() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    if not args:
+        args = ["1000", "4000", "16000"]
+    for languageCount in args:
+        languageCount = int(languageCount)
+        duration = timeFiltering(languageCount)
+        print("%6d languages %8.3f seconds" % (languageCount, duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Time the glyph closure on synthetic tables.
+
+    python benchmarks/glyphClosure.py 5000 10000 30000
+
+Each table has single substitutions for every glyph spread
+over 20 features, like the vertical and width forms in CJK
+fonts, and ligatures for a tenth of the glyphs. The closure
+of a third of the glyphs is computed with the NumPy engine
+and with the pure Python implementation, with the glyphs
+stored as names and as glyph IDs.
+"""
+
+import sys
+import time
+import random
+from feaTools2.objects import Table
+from feaTools2.closure import GlyphClosure
+
+featureCount = 20
+
+
+def makeTable(glyphCount):
+    table = Table()
+    table.tag = "GSUB"
+    for featureIndex in range(featureCount):
+        feature = table.addFeature("f%03d" % featureIndex)
+        feature.addScript("hani")
+        feature.addLanguage(None)
+        lookup = feature.addLookup(None)
+        glyphNames = ["cid%05d" % index for index in range(featureIndex, glyphCount, featureCount)]
+        alternates = ["%s.f%03d" % (glyphName, featureIndex) for glyphName in glyphNames]
+        lookup.addGSUBSubtable([[glyphNames]], [[alternates]], 1)
+    feature = table.addFeature("liga")
+    feature.addScript("hani")
+    feature.addLanguage(None)
+    lookup = feature.addLookup(None)
+    for index in range(0, glyphCount - 1, 10):
+        target = [["cid%05d" % index], ["cid%05d" % (index + 1)]]
+        substitution = [["cid%05d_cid%05d" % (index, index + 1)]]
+        lookup.addGSUBSubtable([target], [substitution], 4)
+    return table
+
+
+def pythonClosure(table, glyphNames):
+    # the pure Python implementation
+    module = sys.modules["feaTools2.closure"]
+    sys.modules["feaTools2.closure"] = None
+    try:
+        return table.glyphClosure(glyphNames)
+    finally:
+        sys.modules["feaTools2.closure"] = module
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    if not args:
+        args = ["5000", "10000", "30000"]
+    for glyphCount in args:
+        glyphCount = int(glyphCount)
+        glyphNames = random.Random(glyphCount).sample(["cid%05d" % index for index in range(glyphCount)], glyphCount // 3)
+        for glyphIDs in (False, True):
+            table = makeTable(glyphCount)
+            if glyphIDs:
+                table.useGlyphIDs()
+            start = time.time()
+            engine = GlyphClosure(table)
+            compileDuration = time.time() - start
+            start = time.time()
+            closure = engine.close(glyphNames)
+            closeDuration = time.time() - start
+            start = time.time()
+            expected = pythonClosure(table, glyphNames)
+            pythonDuration = time.time() - start
+            assert closure == expected
+            mode = "glyph IDs" if glyphIDs else "names"
+            print("%6d glyphs %-9s compile %7.3f close %7.3f python %7.3f seconds" % (glyphCount, mode, compileDuration, closeDuration, pythonDuration))
+
+if __name__ == "__main__":
+    main()
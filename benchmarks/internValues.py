@@ -0,0 +1,84 @@
+"""
+Compare tables with and without interned values.
+
+    python benchmarks/internValues.py 1000 5000 20000
+
+Each table has contextual substitutions that use a small
+number of large context classes, like the joining rules
+in Arabic fonts. The table is built once through the
+writer API of the table, which interns the classes and
+sequences, and once through the languages directly, which
+doesn't. The number of group objects, their size and the
+time to compress the table are reported.
+"""
+
+import sys
+import time
+import random
+from feaTools2.objects import Table
+
+classCount = 20
+classSize = 200
+
+
+def makeTable(ruleCount, intern):
+    random.seed(ruleCount)
+    contextClasses = [["c%02d_%03d" % (classIndex, index) for index in range(classSize)] for classIndex in range(classCount)]
+    table = Table()
+    table.tag = "GSUB"
+    feature = table.addFeature("calt")
+    feature.addScript("arab")
+    feature.addLanguage(None)
+    for index in range(ruleCount):
+        if intern:
+            lookup = feature.addLookup(None)
+        else:
+            lookup = feature.scripts[-1].languages[-1].addLookup(None)
+        backtrack = [random.choice(contextClasses)]
+        lookahead = [random.choice(contextClasses)]
+        target = [[["g%05d" % index]]]
+        substitution = [[["g%05d.alt" % index]]]
+        lookup.addGSUBSubtable(target, substitution, 6, backtrack=backtrack, lookahead=lookahead)
+    return table
+
+
+def measureGroups(table):
+    groups = {}
+    total = 0
+    for lookup in table._uniqueLookups():
+        for subtable in lookup.subtables:
+            for sequence in subtable._sequences():
+                for group in sequence:
+                    total += 1
+                    groups[id(group)] = group
+    size = sum([sys.getsizeof(group) for group in groups.values()])
+    return total, len(groups), size
+
+
+def timeCompression(ruleCount, intern, repeat=3):
+    best = None
+    for i in range(repeat):
+        table = makeTable(ruleCount, intern)
+        start = time.time()
+        table.compress()
+        duration = time.time() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    if not args:
+        args = ["1000", "5000", "20000"]
+    for ruleCount in args:
+        ruleCount = int(ruleCount)
+        for intern in (False, True):
+            total, unique, size = measureGroups(makeTable(ruleCount, intern))
+            duration = timeCompression(ruleCount, intern)
+            print("%6d rules interned=%-5s %7d groups %7d objects %10d bytes compress %7.3f seconds" % (ruleCount, intern, total, unique, size, duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare making many subsets of one table with copies
+of the table and with copy-on-write subsets.
+
+    python benchmarks/multiSubset.py NotoSansCJK-Regular.otf 50
+
+Each subset keeps a random half of the glyphs. The copies
+are made by decompiling the font again, since the tables
+can't be deep copied when they store glyph IDs.
+"""
+
+import sys
+import time
+import random
+from fontTools.ttLib import TTFont
+from feaTools2 import decompileBinaryToObject
+from feaTools2.objects import Lookup, GSUBSubtable
+
+
+def makeGlyphSets(path, count):
+    glyphOrder = TTFont(path).getGlyphOrder()
+    randomizer = random.Random(count)
+    return [randomizer.sample(glyphOrder, len(glyphOrder) // 2) for i in range(count)]
+
+
+def countObjects(tables):
+    # the number of distinct lookups and subtables
+    lookups = set()
+    subtables = set()
+    for table in tables:
+        for lookup in table._uniqueLookups():
+            if not isinstance(lookup, Lookup):
+                continue
+            lookups.add(id(lookup))
+            for subtable in lookup.subtables:
+                subtables.add(id(subtable))
+    return len(lookups), len(subtables)
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    path = args[0]
+    count = 20
+    if len(args) > 1:
+        count = int(args[1])
+    glyphSets = makeGlyphSets(path, count)
+    # copies
+    start = time.time()
+    copies = []
+    for glyphNames in glyphSets:
+        table = decompileBinaryToObject(path, compress=True)["GSUB"]
+        table.subset(glyphNames, compress=False)
+        copies.append(table)
+    copyDuration = time.time() - start
+    # copy-on-write
+    source = decompileBinaryToObject(path, compress=True)["GSUB"]
+    start = time.time()
+    subsets = [subset for subset, keepGlyphs in source.iterSubsets(glyphSets)]
+    subsetDuration = time.time() - start
+    print("%d subsets" % count)
+    print("  copies         %7.3f seconds %6d lookups %7d subtables" % ((copyDuration,) + countObjects(copies)))
+    print("  copy-on-write  %7.3f seconds %6d lookups %7d subtables" % ((subsetDuration,) + countObjects([source] + subsets)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Report the memory used by the object model for a font.
+
+    python benchmarks/objectMemory.py NotoSansCJK-Regular.otf
+
+The objects in the decompiled GSUB are counted by class.
+For each class the size of an instance is compared to the
+size of an equivalent instance that has a __dict__.
+"""
+
+import sys
+import gc
+from feaTools2 import decompileBinaryToObject
+from feaTools2 import objects
+
+slottedClasses = [
+    objects.Script,
+    objects.Language,
+    objects.Lookup,
+    objects.LookupReference,
+    objects.LookupFlag,
+    objects.GSUBSubtable,
+    objects.ClassReference,
+]
+
+
+def instanceSize(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def makeDictInstance(cls):
+    # an instance of the class without __slots__
+    # that holds the same attributes
+    class DictInstance(object):
+        pass
+    obj = DictInstance()
+    source = cls()
+    for name in cls.__slots__:
+        obj.__dict__[name] = getattr(source, name)
+    return obj
+
+
+def countObjects():
+    counts = dict.fromkeys(slottedClasses, 0)
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if cls in counts:
+            counts[cls] += 1
+    return counts
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    for path in args:
+        tables = decompileBinaryToObject(path, compress=False)
+        counts = countObjects()
+        print(path)
+        totalSlotted = 0
+        totalDict = 0
+        for cls in slottedClasses:
+            count = counts[cls]
+            slottedSize = instanceSize(cls())
+            dictSize = instanceSize(makeDictInstance(cls))
+            totalSlotted += count * slottedSize
+            totalDict += count * dictSize
+            print("  %-16s %8d objects %4d bytes each (%4d with __dict__)" % (cls.__name__, count, slottedSize, dictSize))
+        print("  total %d bytes (%d with __dict__), saved %d bytes" % (totalSlotted, totalDict, totalDict - totalSlotted))
+        del tables
+
+
+if __name__ == "__main__":
+    main()
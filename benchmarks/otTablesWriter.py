@@ -0,0 +1,84 @@
+"""
+Compare building a GSUB table with OTTablesWriter to writing
+.fea with FeaSyntaxWriter and compiling it with feaLib.
+
+    python benchmarks/otTablesWriter.py 2 4 6
+
+The argument is the number of features in the table. Every
+feature has 10 lookups with a contextual substitution for
+20 glyphs. Both tables are compiled to binary data so that
+the time includes everything that is needed to rebuild the
+font.
+"""
+
+import sys
+import time
+from fontTools.ttLib import TTFont
+from fontTools.feaLib.builder import addOpenTypeFeaturesFromString
+from feaTools2.objects import Table
+from feaTools2.writers.feaSyntaxWriter import FeaSyntaxWriter
+from feaTools2.writers.otTablesWriter import OTTablesWriter
+
+lookupCount = 10
+glyphCount = 20
+
+
+def makeTable(featureCount):
+    table = Table()
+    table.tag = "GSUB"
+    glyphNames = ["g%03d" % index for index in range(glyphCount)]
+    for featureIndex in range(featureCount):
+        feature = table.addFeature("f%03d" % featureIndex)
+        feature.addScript("latn")
+        feature.addLanguage(None)
+        for lookupIndex in range(lookupCount):
+            lookup = feature.addLookup("f%03d_%d" % (featureIndex, lookupIndex))
+            target = [[[glyphName]] for glyphName in glyphNames]
+            substitution = [[[glyphName + ".f%03d" % featureIndex]] for glyphName in glyphNames]
+            lookup.addGSUBSubtable(target, substitution, 6, backtrack=[glyphNames], lookahead=[glyphNames[lookupIndex:]])
+    return table
+
+
+def makeFont(featureCount):
+    glyphNames = [".notdef"]
+    for index in range(glyphCount):
+        glyphName = "g%03d" % index
+        glyphNames.append(glyphName)
+        glyphNames += [glyphName + ".f%03d" % featureIndex for featureIndex in range(featureCount)]
+    font = TTFont()
+    font.setGlyphOrder(glyphNames)
+    return font
+
+
+def buildWithFeaLib(table, font):
+    writer = FeaSyntaxWriter()
+    table.write(writer)
+    addOpenTypeFeaturesFromString(font, writer.write())
+    return font["GSUB"].compile(font)
+
+
+def buildWithOTTablesWriter(table, font):
+    writer = OTTablesWriter(font.getGlyphOrder())
+    table.write(writer)
+    font["GSUB"] = writer.getTable()
+    return font["GSUB"].compile(font)
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    if not args:
+        args = ["2", "4", "6"]
+    for featureCount in args:
+        featureCount = int(featureCount)
+        table = makeTable(featureCount)
+        for name, build in (("feaLib", buildWithFeaLib), ("otTables", buildWithOTTablesWriter)):
+            font = makeFont(featureCount)
+            start = time.time()
+            data = build(table, font)
+            duration = time.time() - start
+            print("%5d features %-8s %8.3f seconds %9d bytes" % (featureCount, name, duration, len(data)))
+
+
+if __name__ == "__main__":
+    main()
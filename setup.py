@@ -15,4 +15,9 @@ setup(name = "feaTools2",
               "feaTools2.parsers",
       ],
       package_dir = {"":"Lib"},
+      entry_points = {
+              "console_scripts": [
+                      "feaTools2-batch = feaTools2.batch:main",
+              ]
+      },
 )